@@ -0,0 +1,151 @@
+import threading
+
+import wx
+
+
+_executors = {}
+
+
+def shared_executor(_processes=False, _max_workers=4):
+    """
+    :return: The executor shared by every computation that does not bring its own, a thread pool
+    or with _processes a process pool. None if concurrent.futures is not installed, computations
+    then get a thread each.
+    """
+    executor = _executors.get(_processes)
+    if executor is None:
+        # Imported the first time a computation needs it, it is slow to import
+        try:
+            from concurrent import futures
+        except ImportError:
+            return None
+
+        if _processes:
+            executor = futures.ProcessPoolExecutor(_max_workers)
+        else:
+            executor = futures.ThreadPoolExecutor(_max_workers)
+        _executors[_processes] = executor
+    return executor
+
+
+class BackgroundComputation(object):
+    def __init__(self, _func, _callback, _executor=None, _errback=None):
+        """
+        Runs _func(value, *args, **kwargs) off the main loop every time a scrubber's value
+        changes, and hands the result of the newest value to _callback on the main thread. The
+        extra arguments are given with set_args, the same way as for a Data.
+
+        At most one evaluation is running at a time. Values submitted meanwhile replace each
+        other, only the newest one is run next, and a result that a newer value has made stale
+        is thrown away instead of delivered. Every dropped value or result counts as dropped.
+        Everything but _func itself runs on the main thread, so no locking is needed.
+        :param _func: The expensive function, it must be picklable for a process pool
+        :param _callback: Called with the result, on the main thread
+        :param _executor: A concurrent.futures executor, the shared thread pool if None
+        :param _errback: Called with the exception if _func raises, otherwise it is raised on
+        the main thread
+        """
+        self.func = _func
+        self.callback = _callback
+        self.errback = _errback
+        self.executor = _executor if _executor is not None else shared_executor()
+        self.args = ()
+        self.kwargs = {}
+
+        # Every submitted value gets the next generation, only the newest one is delivered
+        self.generation = 0
+        self.running = None
+        self.pending = None
+        self.closed = False
+
+        self.submitted = 0
+        self.delivered = 0
+        self.dropped = 0
+
+    def set_args(self, *args, **kwargs):
+        """
+        Changes the extra arguments _func is called with, from the next value on.
+        """
+        self.args = args
+        self.kwargs = kwargs
+
+    def submit(self, _value):
+        """
+        Asks for _func to be run on _value. Returns straight away.
+        """
+        if self.closed:
+            return
+
+        self.generation += 1
+        self.submitted += 1
+        if self.running is None:
+            self._start(self.generation, _value)
+        else:
+            if self.pending is not None:
+                self.dropped += 1
+            self.pending = (self.generation, _value)
+
+    def _start(self, _generation, _value):
+        self.running = _generation
+        if self.executor is None:
+            thread = threading.Thread(target=self._run_thread, args=(_generation, _value))
+            thread.daemon = True
+            thread.start()
+        else:
+            future = self.executor.submit(self.func, _value, *self.args, **self.kwargs)
+            future.add_done_callback(lambda done: self._on_done(_generation, done))
+
+    def _run_thread(self, _generation, _value):
+        try:
+            result = self.func(_value, *self.args, **self.kwargs)
+        except Exception as error:
+            wx.CallAfter(self._finished, _generation, None, error)
+        else:
+            wx.CallAfter(self._finished, _generation, result, None)
+
+    def _on_done(self, _generation, _future):
+        """
+        Called on a worker thread, everything else happens back on the main thread.
+        """
+        error = _future.exception()
+        wx.CallAfter(self._finished, _generation, None if error else _future.result(), error)
+
+    def _finished(self, _generation, _result, _error):
+        self.running = None
+        # The newest value starts before this result is handled, even if handling it raises
+        if self.pending is not None and not self.closed:
+            generation, value = self.pending
+            self.pending = None
+            self._start(generation, value)
+
+        if self.closed or _generation != self.generation:
+            # A newer value came in while this one was running
+            self.dropped += 1
+        elif _error is not None:
+            if self.errback is None:
+                raise _error
+            self.errback(_error)
+        else:
+            self.delivered += 1
+            self.callback(_result)
+
+    def queue_depth(self):
+        """
+        :return: How many values are running or waiting to run, at most 2
+        """
+        return (self.running is not None) + (self.pending is not None)
+
+    def stats(self):
+        return {'submitted': self.submitted,
+                'delivered': self.delivered,
+                'dropped': self.dropped,
+                'queue_depth': self.queue_depth()}
+
+    def close(self):
+        """
+        Stops delivering results, a running evaluation finishes but is thrown away.
+        """
+        self.closed = True
+        if self.pending is not None:
+            self.pending = None
+            self.dropped += 1
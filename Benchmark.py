@@ -0,0 +1,473 @@
+"""
+Benchmarks for the scrub pipeline. The model benchmarks need nothing but python, the widget ones
+drive the real wx controls and need a display (Xvfb works).
+
+    python Benchmark.py                      model only
+    python Benchmark.py --widgets            the wx controls as well
+    python Benchmark.py --trace drag.trace   replay a recorded trace instead of a synthetic one
+    python Benchmark.py --imports            cold import times, fails over --import-budget
+"""
+import argparse
+import os
+import random
+import subprocess
+import sys
+import timeit
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+from ScrubModel import SentenceModel
+from ValueSequence import ValueRange
+
+wx = None
+
+
+def _import_wx():
+    """
+    wx is only imported for the widget benchmarks, so the model ones run headless.
+    """
+    global wx, DynamicSentence, ScrubLabel, ScrubLabelEvent
+    import wx
+    from DynamicText import DynamicSentence, ScrubLabel, ScrubLabelEvent
+
+
+SCRUB_SIZES = [10, 1000, 100000, 10000000]
+
+
+def _make_sentence():
+    """
+    Builds a hidden frame holding an empty DynamicSentence to run the benchmarks against.
+    """
+    frame = wx.Frame(None, wx.ID_ANY, 'Benchmark')
+    panel = wx.Panel(frame, wx.ID_ANY)
+    sentence = DynamicSentence(frame, panel)
+    return frame, sentence
+
+
+def _scrub_event(_label, _delta):
+    evt = ScrubLabelEvent(ScrubLabel.myEVT_LABEL_SCRUBBED, _label.GetId())
+    evt.SetEventObject(_label)
+    evt.delta = _delta
+    return evt
+
+
+def _build_sentence(_sentence, _tokens):
+    """
+    Fills a sentence with _tokens words, every fifth one a scrubber.
+    """
+    for i in range(_tokens):
+        if i % 5 == 4:
+            _sentence.add_scrubber(range(100), 50)
+        else:
+            _sentence.add_text('word', split_words=False)
+
+
+def bench_construction(tokens=500, repeat=3):
+    """
+    Time to build a sentence of `tokens` words, one add call at a time versus inside a batch.
+    :return: (seconds unbatched, seconds batched)
+    """
+    frame, sentence = _make_sentence()
+    frame.Show()
+    font = wx.Font(10, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL, wx.FONTWEIGHT_BOLD)
+
+    def unbatched():
+        # Build with the parent's font and restyle afterwards, as before fonts could be preset
+        sentence.clear()
+        sentence.static_font = sentence.dyn_font = None
+        _build_sentence(sentence, tokens)
+        sentence.set_dyn_font(font)
+        sentence.set_static_font(font)
+
+    def batched():
+        sentence.clear()
+        sentence.set_dyn_font(font)
+        sentence.set_static_font(font)
+        with sentence.batch():
+            _build_sentence(sentence, tokens)
+
+    results = (min(timeit.repeat(unbatched, number=1, repeat=repeat)),
+               min(timeit.repeat(batched, number=1, repeat=repeat)))
+    frame.Destroy()
+    return results
+
+
+def bench_scrub_index(sizes=SCRUB_SIZES, events=10000):
+    """
+    Per event cost of DynamicSentence._value_scrubbed with the default value in the middle of
+    the list. The cost should stay flat no matter how long the list is.
+    """
+    frame, sentence = _make_sentence()
+    results = []
+    for size in sizes:
+        values = list(range(size))
+        label = sentence.add_scrubber(values, values[size // 2])
+        up = _scrub_event(label, 1)
+        down = _scrub_event(label, -1)
+
+        def scrub():
+            sentence._value_scrubbed(up)
+            sentence._value_scrubbed(down)
+
+        seconds = min(timeit.repeat(scrub, number=events // 2, repeat=3))
+        results.append((size, seconds / events * 1e6))
+        sentence.delete_word()
+        del values
+
+    frame.Destroy()
+    return results
+
+
+# Motion traces
+# ----------------------------------------------------------------------------------------------
+def synthetic_trace(events=100000, seed=0):
+    """
+    Drags back and forth with the jittery deltas of a real mouse, sometimes in fine mode.
+    :return: A list of (delta, cmd_down)
+    """
+    rng = random.Random(seed)
+    trace = []
+    direction = 1
+    while len(trace) < events:
+        cmd_down = rng.random() < 0.2
+        for _ in range(rng.randint(20, 400)):
+            trace.append((direction * rng.randint(1, 12), cmd_down))
+        direction = -direction
+    return trace[:events]
+
+
+def save_trace(_trace, _path):
+    with open(_path, 'w') as trace_file:
+        for delta, cmd_down in _trace:
+            trace_file.write('%d %d\n' % (delta, cmd_down))
+
+
+def load_trace(_path):
+    """
+    Reads a trace written by save_trace or TraceRecorder, one 'delta cmd_down' per line.
+    """
+    trace = []
+    with open(_path) as trace_file:
+        for line in trace_file:
+            if line.strip():
+                delta, cmd_down = line.split()
+                trace.append((int(delta), cmd_down == '1'))
+    return trace
+
+
+class TraceRecorder(object):
+    def __init__(self, _window):
+        """
+        Records the scrub events that reach _window (a frame or panel holding sentences) so real
+        drags can be replayed later. Call save() when done.
+        """
+        _import_wx()
+        self.trace = []
+        _window.Bind(ScrubLabel.EVT_LABEL_SCRUBBED, self._on_scrub)
+
+    def _on_scrub(self, event):
+        self.trace.append((event.get_delta(), event.CmdDown()))
+        event.Skip()
+
+    def save(self, _path):
+        save_trace(self.trace, _path)
+
+
+# Replaying
+# ----------------------------------------------------------------------------------------------
+def _percentile(_sorted, _fraction):
+    return _sorted[min(len(_sorted) - 1, int(len(_sorted) * _fraction))]
+
+
+def replay(_step, _trace):
+    """
+    Feeds every (delta, cmd_down) of _trace to _step, once timing each event and again
+    measuring memory, so the tracing does not skew the timings.
+    :return: A dict of events_per_sec, the p50, p90 and p99 latency in usec, the memory blocks
+    retained per event (allocated and never freed), the fraction of events that allocate at all
+    and the most bytes one event allocated
+    """
+    timer = timeit.default_timer
+    latencies = []
+    append = latencies.append
+
+    start = timer()
+    for delta, cmd_down in _trace:
+        before = timer()
+        _step(delta, cmd_down)
+        append(timer() - before)
+    total = timer() - start
+    latencies.sort()
+
+    # What the loop itself leaves behind is measured with a step that does nothing
+    blocks = None
+    if hasattr(sys, 'getallocatedblocks'):
+        blocks = _retained_blocks(_step, _trace) - _retained_blocks(lambda delta, cmd_down: None,
+                                                                    _trace)
+
+    allocating = None
+    if tracemalloc is not None and hasattr(tracemalloc, 'reset_peak'):
+        allocating = _allocating_events(_step, _trace)
+
+    return {'events_per_sec': len(_trace) / total,
+            'p50': _percentile(latencies, 0.5) * 1e6,
+            'p90': _percentile(latencies, 0.9) * 1e6,
+            'p99': _percentile(latencies, 0.99) * 1e6,
+            'blocks_per_event': float(blocks) / len(_trace) if blocks is not None else None,
+            'allocating_events': (float(allocating[0]) / len(_trace)
+                                  if allocating is not None else None),
+            'max_event_bytes': allocating[1] if allocating is not None else None}
+
+
+def _retained_blocks(_step, _trace):
+    """
+    :return: How many more memory blocks are allocated after feeding _trace to _step than
+    before, anything a steady state event allocates and does not free again. One pass is run
+    first to let the allocator's free lists settle.
+    """
+    for delta, cmd_down in _trace:
+        _step(delta, cmd_down)
+
+    before = sys.getallocatedblocks()
+    for delta, cmd_down in _trace:
+        _step(delta, cmd_down)
+    return sys.getallocatedblocks() - before
+
+
+def _allocating_events(_step, _trace):
+    """
+    Traces every event on its own: one that allocates anything raises the traced peak above
+    where it started, even if it frees it again before returning. A pass is run first so that
+    caches filled by the first events don't count.
+    :return: (how many events allocated, the most bytes one event had allocated at once), or
+    None if something else is already tracing
+    """
+    if tracemalloc.is_tracing():
+        return None
+    for delta, cmd_down in _trace:
+        _step(delta, cmd_down)
+
+    allocating = 0
+    most = 0
+    get_traced_memory = tracemalloc.get_traced_memory
+    reset_peak = tracemalloc.reset_peak
+    tracemalloc.start()
+    try:
+        for delta, cmd_down in _trace:
+            reset_peak()
+            start = get_traced_memory()[0]
+            _step(delta, cmd_down)
+            allocated = get_traced_memory()[1] - start
+            if allocated > 0:
+                allocating += 1
+                most = max(most, allocated)
+    finally:
+        tracemalloc.stop()
+    return allocating, most
+
+
+def bench_model(_trace, size=1000000):
+    """
+    Replays a trace against a SentenceModel holding one scrubber of `size` values.
+    """
+    model = SentenceModel()
+    model.add_control('scrubber', ValueRange(0, size), size // 2)
+    scrub = model.scrub
+
+    def step(delta, cmd_down):
+        scrub('scrubber', delta, cmd_down)
+
+    return replay(step, _trace)
+
+
+def bench_traversal(sizes=SCRUB_SIZES, delta=40):
+    """
+    Counts the events a fast drag of `delta` pixels per event takes to cross lists of each size.
+    With the acceleration curve it stays bounded however long the list is.
+    """
+    results = []
+    for size in sizes:
+        model = SentenceModel()
+        control = model.add_control('scrubber', ValueRange(0, size), 0)
+        events = 0
+        while control.index < size - 1:
+            model.scrub('scrubber', delta, False)
+            events += 1
+        results.append((size, events))
+    return results
+
+
+def bench_widgets(_trace, size=1000000):
+    """
+    Replays a trace against a real ScrubLabel in a DynamicSentence, from the posted
+    ScrubLabelEvent through the label update and layout.
+    """
+    _import_wx()
+    frame, sentence = _make_sentence()
+    frame.Show()
+    label = sentence.add_scrubber(ValueRange(0, size), size // 2)
+    handler = label.GetEventHandler()
+    evt = _scrub_event(label, 0)
+
+    def step(delta, cmd_down):
+        evt.delta = delta
+        evt.cmd_down = cmd_down
+        handler.ProcessEvent(evt)
+
+    result = replay(step, _trace)
+    frame.Destroy()
+    return result
+
+
+def bench_motion(_trace, size=1000):
+    """
+    Replays a trace through ScrubLabel._on_mouse_motion itself, from the motion event through
+    the scrub event, the model and the label update. The values are few enough for every label
+    to be measured during the timed pass, so the memory passes see a steady state drag where no
+    event should retain anything. Events that move the value still allocate the numbers of
+    the new position, which python makes for each one.
+    """
+    _import_wx()
+    frame, sentence = _make_sentence()
+    frame.Show()
+    label = sentence.add_scrubber(ValueRange(0, size), size // 2)
+
+    motion = wx.MouseEvent(wx.wxEVT_MOTION)
+    motion.SetEventObject(label)
+    label._on_left_down(motion)
+    anchor = label.anchor_point[0]
+    handle = label._on_mouse_motion
+
+    # Phoenix has setters for the mouse state, Classic exposes the members
+    if hasattr(motion, 'SetLeftDown'):
+        motion.SetLeftDown(True)
+        motion.SetY(label.anchor_point[1])
+
+        def step(delta, cmd_down):
+            motion.SetX(anchor + delta)
+            motion.SetControlDown(cmd_down)
+            handle(motion)
+    else:
+        motion.m_leftDown = True
+        motion.m_y = label.anchor_point[1]
+
+        def step(delta, cmd_down):
+            motion.m_x = anchor + delta
+            motion.m_controlDown = cmd_down
+            handle(motion)
+
+    result = replay(step, _trace)
+    label._on_left_up(motion)
+    frame.Destroy()
+    return result
+
+
+# The modules tooling imports, and what importing them must not pull in
+IMPORT_MODULES = ['ScrubModel', 'DynamicText', 'DrawnSentence', 'SentenceList']
+HEAVY_IMPORTS = ['ObjectListView', 'wx.lib.inspection', 'concurrent.futures']
+
+_IMPORT_PROBE = """
+import sys, timeit
+start = timeit.default_timer()
+import %s
+print(timeit.default_timer() - start)
+print(','.join(name for name in %r if name in sys.modules))
+"""
+
+
+def bench_imports(modules=IMPORT_MODULES, repeat=5):
+    """
+    Times importing each module in a new interpreter, as a cold start does.
+    :return: A list of (module, median seconds, heavy modules it pulled in, error), the error
+    is the last line python printed if the import failed
+    """
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = []
+    for module in modules:
+        times = []
+        heavy = []
+        error = None
+        for _ in range(repeat):
+            probe = subprocess.Popen([sys.executable, '-c', _IMPORT_PROBE % (module,
+                                                                             HEAVY_IMPORTS)],
+                                     cwd=here, stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+                                     universal_newlines=True)
+            out, err = probe.communicate()
+            if probe.returncode != 0:
+                error = (err.strip().splitlines() or ['exit status %d' % probe.returncode])[-1]
+                break
+            elapsed, pulled = out.splitlines()[-2:]
+            times.append(float(elapsed))
+            heavy = [name for name in pulled.split(',') if name]
+
+        times.sort()
+        results.append((module, times[len(times) // 2] if times else None, heavy, error))
+    return results
+
+
+def _print_replay(_title, _result):
+    print(_title)
+    print('  %12.0f events/sec' % _result['events_per_sec'])
+    print('  latency usec  p50 %.2f  p90 %.2f  p99 %.2f' % (_result['p50'], _result['p90'],
+                                                           _result['p99']))
+    if _result['blocks_per_event'] is not None:
+        print('  %12.4f blocks retained per event' % _result['blocks_per_event'])
+    if _result['allocating_events'] is not None:
+        print('  %12.4f of events allocate, at most %d bytes' % (_result['allocating_events'],
+                                                                 _result['max_event_bytes']))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument('--widgets', action='store_true', help='benchmark the wx controls too')
+    parser.add_argument('--trace', help='replay a recorded trace file')
+    parser.add_argument('--events', type=int, default=100000, help='synthetic trace length')
+    parser.add_argument('--imports', action='store_true',
+                        help='only time cold imports, exits with 1 if one is over budget')
+    parser.add_argument('--import-budget', type=float, default=0.5,
+                        help='seconds each module may take to import, wx included')
+    options = parser.parse_args()
+
+    if options.imports:
+        failed = False
+        print('Cold import, budget %.0f ms' % (options.import_budget * 1000))
+        for module, seconds, heavy, error in bench_imports():
+            if error is not None:
+                failed = True
+                print('  %-14s failed: %s' % (module, error))
+                continue
+
+            over = seconds > options.import_budget
+            failed = failed or over or bool(heavy)
+            print('  %-14s %8.1f ms%s%s' % (module, seconds * 1000, '  OVER BUDGET' if over else '',
+                                            '  pulled in ' + ', '.join(heavy) if heavy else ''))
+        sys.exit(1 if failed else 0)
+
+    if options.trace:
+        trace = load_trace(options.trace)
+    else:
+        trace = synthetic_trace(options.events)
+
+    _print_replay('Model, %d events' % len(trace), bench_model(trace))
+
+    print('Events for a fast drag to cross the values')
+    for size, events in bench_traversal():
+        print('  %10d values: %6d events' % (size, events))
+
+    if options.widgets:
+        _import_wx()
+        app = wx.App(False)
+        _print_replay('Widgets, %d events' % len(trace), bench_widgets(trace))
+        _print_replay('Motion handler, %d events' % len(trace), bench_motion(trace))
+
+        print('Scrub event cost by value list length')
+        for size, usec in bench_scrub_index():
+            print('  %10d values: %8.2f usec/event' % (size, usec))
+
+        unbatched, batched = bench_construction()
+        print('Building a 500 word sentence')
+        print('  one layout per add: %8.1f ms' % (unbatched * 1000))
+        print('  inside batch():     %8.1f ms' % (batched * 1000))
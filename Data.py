@@ -1,23 +1,175 @@
+import numbers
+import sys
 
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
 
-class Data:
-    TYPE_ALIAS = {"<class 'pandas.core.frame.DataFrame'>": 'DataFrame',
-                  "<type 'unicode'>": 'String',
-                  "<type 'int'>": 'Integer',
-                  "<type 'float'>": 'Float',
-                  "<type 'list'>": 'List',
-                  "<type 'str'>": 'String'}
+try:
+    string_types = basestring
+except NameError:
+    string_types = (str, bytes)
+
+
+# Number of items looked at to estimate the memory of a long list
+MEMORY_SAMPLE = 1000
+
+
+def estimate_size(_values):
+    """
+    :return: About how many bytes _values takes up, its items included for a list or tuple.
+    Long lists are estimated from MEMORY_SAMPLE of their items, spread evenly over them.
+    """
+    size = sys.getsizeof(_values)
+    if isinstance(_values, (list, tuple)) and _values:
+        step = max(1, len(_values) // MEMORY_SAMPLE)
+        sample = _values[::step]
+        size += sum(sys.getsizeof(item) for item in sample) * len(_values) // len(sample)
+    return size
+
+
+def _class_names(_value):
+    """
+    :return: The dotted names of the class of _value and of its bases
+    """
+    return set('%s.%s' % (cls.__module__, cls.__name__) for cls in type(_value).__mro__)
+
+
+class Data(object):
+    # What kind of data is held, the first entry that matches names it. An entry is a type (or
+    # tuple of types) checked with isinstance, or the dotted name of a class so that pandas and
+    # numpy never have to be imported. Use register_type to add more.
+    TYPES = [('pandas.core.frame.DataFrame', 'DataFrame'),
+             ('pandas.core.series.Series', 'Series'),
+             ('numpy.ndarray', 'Array'),
+             (bool, 'Boolean'),
+             (numbers.Integral, 'Integer'),
+             (numbers.Real, 'Float'),
+             (string_types, 'String'),
+             (list, 'List'),
+             (tuple, 'Tuple'),
+             (Sequence, 'Sequence')]
 
     def __init__(self, _data, _title):
         #dataframe, numpy array, single value
-        self.data = _data
         self.title = _title
-        self.value_title = Data.TYPE_ALIAS[str(type(_data))]
+        self.data = _data
 
         self.args = None
         self.kwargs = None
 
+    @classmethod
+    def register_type(cls, _type, _alias):
+        """
+        Names another kind of data, checked before the ones already known so that it can be
+        more specific than them.
+        :param _type: A type, a tuple of types, or the dotted name of a class
+        :param _alias: The name shown for it
+        """
+        cls.TYPES.insert(0, (_type, _alias))
+
+    @classmethod
+    def alias_of(cls, _data):
+        """
+        :return: The name of the kind of _data, its class name if nothing registered matches
+        """
+        names = None
+        for kind, alias in cls.TYPES:
+            if isinstance(kind, string_types):
+                if names is None:
+                    names = _class_names(_data)
+                if kind in names:
+                    return alias
+            elif isinstance(_data, kind):
+                return alias
+        return type(_data).__name__
+
+    @property
+    def data(self):
+        return self._data
+
+    @data.setter
+    def data(self, _data):
+        """
+        Replacing the data names it again and forgets everything worked out about the old data.
+        """
+        self._data = _data
+        self.value_title = Data.alias_of(_data)
+        self.summaries = {}
+
+    def _summary(self, _name, _compute):
+        """
+        Works a summary out the first time it is asked for, and remembers it until the data is
+        replaced.
+        """
+        if _name not in self.summaries:
+            self.summaries[_name] = _compute()
+        return self.summaries[_name]
+
+    def _is_collection(self):
+        return hasattr(self._data, '__len__') and not isinstance(self._data, string_types)
+
+    def length(self):
+        """
+        :return: How many values a scrubber gets from the data, 1 for a single value
+        """
+        return self._summary('length',
+                             lambda: len(self._data) if self._is_collection() else 1)
+
+    def dtype(self):
+        """
+        :return: The dtype of an array or Series as a string, the dtypes of a DataFrame's
+        columns, or None for other data
+        """
+        def compute():
+            if hasattr(self._data, 'dtypes') and not hasattr(self._data, 'dtype'):
+                return [str(dtype) for dtype in self._data.dtypes]
+            if hasattr(self._data, 'dtype'):
+                return str(self._data.dtype)
+            return None
+        return self._summary('dtype', compute)
+
+    def _extreme(self, _func, _method):
+        if not self._is_collection():
+            return self._data
+        if self.length() == 0:
+            return None
+        if hasattr(self._data, _method):
+            return getattr(self._data, _method)()
+        try:
+            return _func(self._data)
+        except TypeError:
+            # Values that can't be compared with each other
+            return None
+
+    def min(self):
+        """
+        :return: The smallest value, None if the values can't be compared or there are none
+        """
+        return self._summary('min', lambda: self._extreme(min, 'min'))
+
+    def max(self):
+        """
+        :return: The largest value, None if the values can't be compared or there are none
+        """
+        return self._summary('max', lambda: self._extreme(max, 'max'))
+
+    def memory(self):
+        """
+        :return: About how many bytes the data takes up. Arrays and pandas objects report their
+        own, long lists are estimated from a sample of their items.
+        """
+        def compute():
+            data = self._data
+            if hasattr(data, 'memory_usage'):
+                usage = data.memory_usage(deep=True)
+                return int(usage.sum()) if hasattr(usage, 'sum') else int(usage)
+            if hasattr(data, 'nbytes'):
+                return int(data.nbytes)
+            return estimate_size(data)
+        return self._summary('memory', compute)
+
     def set_args(self, *args, **kwargs):
         self.args = args
         self.kwargs = kwargs
-        print 'Setting kwargs for %s' %self.title
\ No newline at end of file
@@ -0,0 +1,186 @@
+"""
+The demo of the scrub widgets: a sentence of scrubbers and clickers, and a list of Data that can
+be dragged onto them. Needs ObjectListView, the widgets themselves don't.
+
+    python Demo.py
+"""
+import wx
+
+from Data import Data
+from DynamicText import DynamicSentence, drag_payload
+from ValueSequence import AffixRange, FunctionSequence, ValueRange
+
+
+class ProportionalSplitter(wx.SplitterWindow):
+        def __init__(self, parent, _id=-1, proportion=0.66, size=wx.DefaultSize, **kwargs):
+                wx.SplitterWindow.__init__(self, parent, _id, wx.Point(0, 0), size, **kwargs)
+
+                # the minimum size of a pane.
+                self.SetMinimumPaneSize(50)
+                self.proportion = proportion
+                if not 0 < self.proportion < 1:
+                        raise ValueError("proportion value for ProportionalSplitter "
+                                         "must be between 0 and 1.")
+                self.ResetSash()
+                self.Bind(wx.EVT_SIZE, self.OnReSize)
+                self.Bind(wx.EVT_SPLITTER_SASH_POS_CHANGED, self.OnSashChanged, id=_id)
+                # # hack to set sizes on first paint event
+                self.Bind(wx.EVT_PAINT, self.OnPaint)
+                self.firstpaint = True
+
+        def SplitHorizontally(self, win1, win2):
+                if self.GetParent() is None: return False
+                return wx.SplitterWindow.SplitHorizontally(self, win1, win2,
+                        int(round(self.GetParent().GetSize().GetHeight() * self.proportion)))
+
+        def SplitVertically(self, win1, win2):
+                if self.GetParent() is None: return False
+                return wx.SplitterWindow.SplitVertically(self, win1, win2,
+                        int(round(self.GetParent().GetSize().GetWidth() * self.proportion)))
+
+        def GetExpectedSashPosition(self):
+                if self.GetSplitMode() == wx.SPLIT_HORIZONTAL:
+                        tot = max(self.GetMinimumPaneSize(), self.GetParent().GetClientSize().height)
+                else:
+                        tot = max(self.GetMinimumPaneSize(), self.GetParent().GetClientSize().width)
+                return int(round(tot * self.proportion))
+
+        def ResetSash(self):
+                self.SetSashPosition(self.GetExpectedSashPosition())
+
+        def OnReSize(self, event):
+                """
+                Window has been resized, so we need to adjust the sash based on self.proportion.
+                """
+                self.ResetSash()
+                event.Skip()
+
+        def OnSashChanged(self, event):
+                """
+                We'll change self.proportion now based on where user dragged the sash.
+                """
+                pos = float(self.GetSashPosition())
+                if self.GetSplitMode() == wx.SPLIT_HORIZONTAL:
+                        tot = max(self.GetMinimumPaneSize(), self.GetParent().GetClientSize().height)
+                else:
+                        tot = max(self.GetMinimumPaneSize(), self.GetParent().GetClientSize().width)
+                self.proportion = pos / tot
+                event.Skip()
+
+        def OnPaint(self, event):
+                if self.firstpaint:
+                        if self.GetSashPosition() != self.GetExpectedSashPosition():
+                                self.ResetSash()
+                        self.firstpaint = False
+                event.Skip()
+
+
+class TestAppFrame(wx.Frame):
+    def __init__(self, *args, **kwds):
+        kwds["style"] = wx.DEFAULT_FRAME_STYLE
+        wx.Frame.__init__(self, *args, **kwds)
+        # Only the demo needs ObjectListView, the widgets never import it
+        import ObjectListView as lv
+
+        self.split = ProportionalSplitter(self, wx.ID_ANY)
+        self.panel1 = wx.Panel(self.split, wx.ID_ANY)
+        self.panel2 = wx.Panel(self.split, wx.ID_ANY)
+
+        self.steps_list = lv.ObjectListView(self.split, -1,
+                                                    style=wx.LC_REPORT | wx.SUNKEN_BORDER,
+                                                    sortable=False,
+                                                    cellEditMode=lv.ObjectListView.CELLEDIT_DOUBLECLICK)
+
+        step_cols = [lv.ColumnDefn('Operation', 'left', 120, 'title'),
+                     lv.ColumnDefn('Type', 'left', 100, 'value_title'),
+                     lv.ColumnDefn('Length', 'right', 60, 'length')]
+
+        self.steps_list.SetColumns(step_cols)
+        # TEMP FOR DRAG TESTING
+        self.steps_list.Bind(wx.EVT_LIST_BEGIN_DRAG, self.on_list_drag)
+
+        d1 = Data(list(range(43)), 'Up to meaning of life')
+        d2 = Data(list(range(100)), 'Centennial')
+        d1.value_title = 'List of Ints'
+        d2.value_title = 'List of Ints'
+
+        states = ["AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DC", "DE", "FL", "GA",
+                  "HI", "ID", "IL", "IN", "IA", "KS", "KY", "LA", "ME", "MD",
+                  "MA", "MI", "MN", "MS", "MO", "MT", "NE", "NV", "NH", "NJ",
+                  "NM", "NY", "NC", "ND", "OH", "OK", "OR", "PA", "RI", "SC",
+                  "SD", "TN", "TX", "UT", "VT", "VA", "WA", "WV", "WI", "WY"]
+
+        d3 = Data(states, 'State Abbreviations')
+        d4 = Data('I only have a single value', 'Simple string')
+        d5 = Data(154, 'Constant Int')
+        d3.value_title = 'List of Strings'
+
+        self.steps_list.SetObjects([d1, d2, d3, d4, d5])
+
+        self.test = DynamicSentence(self, self.panel2)
+        self.test.change_rate = .5
+        self.test.set_seek()
+        self.test.set_dyn_font(wx.Font(10, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL,
+                                       wx.FONTWEIGHT_BOLD))
+        self.test.set_static_font(wx.Font(9, wx.FONTFAMILY_DEFAULT, wx.FONTSTYLE_NORMAL,
+                                          wx.FONTWEIGHT_NORMAL))
+
+        with self.test.batch():
+            self.test.add_text('Suppose that an extra ')
+            # Ranges so that typing a number seeks them, without the $ or %
+            charge = self.test.add_scrubber(AffixRange(ValueRange(0, 51), '$'), '$25',
+                                            can_drop=True, reserve_width=True)
+            self.test.add_text(' was charged to ')
+            percent = self.test.add_scrubber(AffixRange(ValueRange(0, 101), '', '%'),
+                                             '25%', can_drop=True)
+            self.test.add_text(' of ')
+            self.test.add_clicker(['California taxpayers', 'vehicle vegistrations'],
+                                  'California taxpayers')
+            self.test.add_text('. Park admission would be ')
+
+            to_add = FunctionSequence(lambda x: '$' + str(x) if x else 'free', 26)
+            self.test.add_scrubber(to_add, '$10')
+            self.test.add_text(' for ')
+            self.test.add_clicker(['everyone', ' those who paid the charge'], 'everyone',
+                                  can_drop=True)
+            self.test.add_text('. That is ')
+
+            def per_head(_charge, _percent):
+                # Anything can be dropped on the charge and percent
+                try:
+                    share = float(str(_charge).strip('$')) * float(str(_percent).strip('%')) / 100
+                except ValueError:
+                    return 'an unknown amount'
+                return '$%.2f' % share
+            self.test.add_derived(per_head, [charge, percent])
+            self.test.add_text(' a head on average.')
+
+        # Uncomment for wx inspection tool of different widgets
+        # import wx.lib.inspection
+        # wx.lib.inspection.InspectionTool().Show()
+
+        self.__set_properties()
+        self.__do_layout()
+
+    def __set_properties(self):
+        self.SetTitle("Testbed Framework")
+        self.SetSize((800, 300))
+
+        self.panel1.SetBackgroundColour('GRAY')
+        # self.panel2.SetBackgroundColour('CYAN')
+
+    def __do_layout(self):
+        self.split.SplitVertically(self.steps_list, self.panel2)
+
+    def on_list_drag(self, event):
+        # The Data object itself is dragged, the drop target looks it up by key
+        drag_payload(self, event.GetEventObject().GetSelectedObject())
+
+
+if __name__ == "__main__":
+    app = wx.App(False)
+    # wx.InitAllImageHandlers()
+    frame_1 = TestAppFrame(None, wx.ID_ANY, "")
+    app.SetTopWindow(frame_1)
+    frame_1.Show()
+    app.MainLoop()
@@ -0,0 +1,609 @@
+import bisect
+
+import wx
+
+from DynamicText import (ScrubLabel, ScrubLabelEvent, DynDropTarget, SentenceModelView,
+                         BatchLayout, TypeToSeek, text_extents, sample_values, stock_cursor,
+                         PHOENIX)
+from LabelFormat import formatter_for
+from ScrubModel import SentenceModel
+from ScrubProfiler import timer
+
+
+class SentenceToken(object):
+    STATIC = 'static'
+    SCRUB = 'scrub'
+    CLICK = 'click'
+    DERIVED = 'derived'
+
+    # Set through set_formatter, None shows values with str
+    formatter = None
+
+    def __init__(self, _sentence, _kind, _value, _id=wx.ID_ANY, _index=0):
+        """
+        A single word, scrubber or clicker of a DrawnSentence. Holds what a label window would
+        hold, but is only drawn, so it costs no native handle.
+        :param _sentence: The DrawnSentence the token belongs to, used to measure it
+        :param _kind: One of STATIC, SCRUB, CLICK or DERIVED
+        :param _value: The value to display
+        :param _id: The id scrub events are sent with
+        :param _index: The position of _value in the list of values
+        """
+        self.sentence = _sentence
+        self.kind = _kind
+        self.id = _id
+        self.cur_value = _value
+        self.cur_index = _index
+        self.text = str(_value)
+
+        self.scroll_dir = 0
+        # Pixels of drift before the pointer is warped back, None warps after every event
+        self.warp_threshold = None
+        self.can_drop = False
+        self.reserved_width = 0
+
+        # Position in the window, filled in by DrawnSentence.Layout
+        self.rect = (0, 0, 0, 0)
+        self.width, self.height = self.sentence._measure(self, self.text)
+
+    def GetId(self):
+        return self.id
+
+    def _text_of(self, _value):
+        if self.formatter is None:
+            return str(_value)
+        return self.formatter(_value)
+
+    def set_formatter(self, _formatter):
+        """
+        Same as DynamicLabel.set_formatter.
+        """
+        self.formatter = _formatter
+
+    def is_dynamic(self):
+        return self.kind != SentenceToken.STATIC
+
+    def set_label(self, _label, _index=None):
+        """
+        Same as DynamicLabel.set_label, and repaints just this token when its width is unchanged.
+        :return: True if the width of the token changed, meaning the sentence needs a layout
+        """
+        self.text = self._text_of(_label)
+        self.cur_value = _label
+        if _index is not None:
+            self.cur_index = _index
+
+        old_width = self.width
+        self.width, self.height = self.sentence._measure(self, self.text)
+        resized = self.width != old_width
+        if not resized:
+            self.sentence.refresh_token(self)
+        return resized
+
+    def reserve_width(self, _values):
+        """
+        Holds the width of the widest of _values (sampled on long lists) for the token.
+        """
+        self.reserved_width = 0
+        if _values is not None and len(_values) > 0:
+            self.reserved_width = max(self.sentence._measure(self, self._text_of(value))[0]
+                                      for value in sample_values(_values, 1000))
+        self.width, self.height = self.sentence._measure(self, self.text)
+
+    def contains(self, _point):
+        x, y, w, h = self.rect
+        return x <= _point[0] < x + w and y <= _point[1] < y + h
+
+
+class DrawnDropTarget(DynDropTarget):
+    def __init__(self, _frame, _dyn_sent):
+        """
+        One drop target for the whole DrawnSentence, the token being dropped on is found by
+        hit testing the drop point.
+        """
+        DynDropTarget.__init__(self, _frame, _dyn_sent, None)
+
+    def drop_payload(self, x, y, _payload):
+        token = self.dyn_sentence.hit_test((x, y))
+        if token is None or not token.can_drop:
+            return False
+
+        self.obj_id = token.id
+        return DynDropTarget.drop_payload(self, x, y, _payload)
+
+
+class DrawnSentence(wx.Window, SentenceModelView, BatchLayout, TypeToSeek):
+    def __init__(self, _frame, _parent):
+        """
+        The same sentence as a DynamicSentence, but drawn into one double buffered window with its
+        own word wrap instead of using a native control per word. Meant for long paragraphs where
+        hundreds of StaticText windows get slow to build and lay out.
+        :param _frame: The frame that contains the sentence
+        :param _parent: The parent that contains the control
+        """
+        wx.Window.__init__(self, _parent, wx.ID_ANY, style=wx.FULL_REPAINT_ON_RESIZE)
+        self.SetBackgroundStyle(getattr(wx, 'BG_STYLE_PAINT', wx.BG_STYLE_CUSTOM))
+
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(self, 1, wx.EXPAND)
+        _parent.SetSizer(sizer)
+
+        self.frame = _frame
+        self.parent = _parent
+        self.model = SentenceModel()
+
+        self.dyn_text = []
+        self.static_text = []
+        self.sentence = []
+        self.tokens_by_id = {}
+
+        self.static_font = self.GetFont()
+        self.dyn_font = self.GetFont()
+        self.font_keys = {}
+        self.measure_dc = None
+
+        # Wrapped lines as (top, bottom, token x positions, tokens), used for hit testing
+        self.lines = []
+        self.line_bottoms = []
+        self.wrap_width = 0
+
+        # The token being scrubbed and where the pointer is held during the drag
+        self.scrubbing = None
+        self.anchor_point = (0, 0)
+
+        # Relative motion, the same as ScrubLabel.set_warp_threshold describes
+        self.last_pos = 0
+        self.warp_pending = False
+        self.real_events = 0
+        self.suppressed_events = 0
+
+        # The scrubber or clicker under the pointer, typed keys seek in it
+        self.hover_token = None
+
+        self.cursors = {SentenceToken.STATIC: stock_cursor(wx.CURSOR_DEFAULT),
+                        SentenceToken.DERIVED: stock_cursor(wx.CURSOR_DEFAULT),
+                        SentenceToken.SCRUB: stock_cursor(wx.CURSOR_SIZEWE),
+                        SentenceToken.CLICK: stock_cursor(wx.CURSOR_HAND),
+                        None: stock_cursor(wx.CURSOR_BLANK)}
+        self.cur_cursor = SentenceToken.STATIC
+
+        # Sent for every scrub of any token, refilled each time
+        self.scrub_event = ScrubLabelEvent(ScrubLabel.myEVT_LABEL_SCRUBBED, wx.ID_ANY)
+        self.scrub_event.SetEventObject(self)
+
+        self.SetDropTarget(DrawnDropTarget(_frame, self))
+
+        self.Bind(wx.EVT_PAINT, self._on_paint)
+        self.Bind(wx.EVT_SIZE, self._on_size)
+        self.Bind(wx.EVT_MOTION, self._on_mouse_motion)
+        self.Bind(wx.EVT_LEAVE_WINDOW, self._on_leave)
+        self.Bind(wx.EVT_LEFT_DOWN, self._on_left_down)
+        self.Bind(wx.EVT_LEFT_UP, self._on_left_up)
+        self.Bind(wx.EVT_MOUSE_CAPTURE_LOST, self._on_capture_lost)
+
+    # Building the sentence
+    # ------------------------------------------------------------------------------------------
+    def clear(self):
+        """
+        Erases the whole sentence
+        """
+        # A drag in progress lets go of the mouse first
+        self._end_scrub()
+        for token in self.dyn_text:
+            self.stop_computing(token.id)
+            self.stop_streaming(token.id)
+        self.model.clear()
+        self.derived_views = None
+        self.dyn_text = []
+        self.static_text = []
+        self.sentence = []
+        self.tokens_by_id = {}
+        self.hover_token = None
+        self._relayout()
+
+    def delete_word(self):
+        """
+        Deletes the last item in the list from the sentence.
+        """
+        to_delete = self.sentence.pop()
+
+        # Words are appended in order, so the last word is also last in its own list
+        if to_delete.is_dynamic():
+            if to_delete is self.scrubbing:
+                self._end_scrub()
+            self.dyn_text.pop()
+            self.model.remove_control(to_delete.id)
+            self._remove_derived_view(to_delete.id)
+            self.stop_computing(to_delete.id)
+            self.stop_streaming(to_delete.id)
+            del self.tokens_by_id[to_delete.id]
+            if to_delete is self.hover_token:
+                self.hover_token = None
+        else:
+            self.static_text.pop()
+
+        self._relayout()
+
+    def _add_token(self, _token):
+        self.sentence.append(_token)
+        if _token.is_dynamic():
+            self.dyn_text.append(_token)
+            self.tokens_by_id[_token.id] = _token
+        else:
+            self.static_text.append(_token)
+
+    def add_text(self, _text, split_words=True):
+        """
+        Adds a static text next in the sequence.
+        :param _text: The text that will be displayed.
+        """
+        if split_words:
+            words = _text.split()
+            words[0] = ' ' + words[0]
+            for word in words:
+                self._add_token(SentenceToken(self, SentenceToken.STATIC, word + ' '))
+        else:
+            self._add_token(SentenceToken(self, SentenceToken.STATIC, _text))
+
+        self._relayout()
+
+    def add_scrubber(self, _values, _default_value, scroll_horz=True, can_drop=False,
+                     max_rate=None, reserve_width=False, warp_threshold=None, label_format=None):
+        """
+        Same as DynamicSentence.add_scrubber. max_rate is accepted for compatibility but not
+        needed, a scrub here only repaints the token that changed.
+        """
+        _id = wx.NewId()
+        control = self.model.add_control(_id, _values, _default_value)
+
+        to_add = SentenceToken(self, SentenceToken.SCRUB, control.value, _id, control.index)
+        if label_format is not None:
+            self._set_format(to_add, control, label_format)
+            self._show(to_add, _id)
+        to_add.scroll_dir = 0 if scroll_horz else 1
+        to_add.warp_threshold = warp_threshold
+        to_add.can_drop = can_drop
+        if reserve_width:
+            to_add.reserve_width(control.values)
+
+        self._add_token(to_add)
+        self._relayout()
+        return to_add
+
+    def add_clicker(self, _values, _default_value, can_drop=False, label_format=None):
+        """
+        Same as DynamicSentence.add_clicker.
+        """
+        _id = wx.NewId()
+        control = self.model.add_control(_id, _values, _default_value)
+
+        to_add = SentenceToken(self, SentenceToken.CLICK, control.value, _id, control.index)
+        if label_format is not None:
+            self._set_format(to_add, control, label_format)
+            self._show(to_add, _id)
+        to_add.can_drop = can_drop
+
+        self._add_token(to_add)
+        self._relayout()
+        return to_add
+
+    def add_derived(self, _func, _inputs, label_format=None):
+        """
+        Same as DynamicSentence.add_derived.
+        """
+        to_add = SentenceToken(self, SentenceToken.DERIVED, '', wx.NewId())
+        to_add.set_formatter(formatter_for(label_format))
+        self._add_derived_view(to_add, _func, _inputs)
+
+        self._add_token(to_add)
+        self._relayout()
+        return to_add
+
+    def new_scrub_vals(self, _id, vals):
+        """
+        Updates the values for an existing scrub control
+        :param _id: The id of the token
+        :param vals: A sequence of string convertible items, or a single item
+        """
+        if _id in self.model.controls:
+            self.model.set_values(_id, vals)
+
+            token = self.tokens_by_id[_id]
+            if token.reserved_width:
+                token.reserve_width(self.model.controls[_id].values)
+            self._show(token, _id)
+            self._show_derived(_id)
+            self._relayout()
+
+    def set_static_font(self, _font):
+        """
+        Changes the font of all static text.
+        """
+        self.static_font = _font
+        self._remeasure(self.static_text)
+
+    def set_dyn_font(self, _font):
+        """
+        Changes the font of the scrubbers and clickers.
+        """
+        self.dyn_font = _font
+        self._remeasure(self.dyn_text)
+
+    def _remeasure(self, _tokens):
+        self.font_keys = {}
+        for token in _tokens:
+            values = self.model.controls[token.id].values if token.reserved_width else None
+            token.reserve_width(values)
+        self._relayout()
+
+    # Measuring, wrapping and hit testing
+    # ------------------------------------------------------------------------------------------
+    def _font_for(self, _token):
+        if _token.is_dynamic():
+            return self.dyn_font
+        return self.static_font
+
+    def _measure(self, _token, _text):
+        """
+        :return: The (width, height) _token takes up when showing _text.
+        """
+        font = self._font_for(_token)
+        font_key = self.font_keys.get(_token.is_dynamic())
+        if font_key is None:
+            font_key = font.GetNativeFontInfoDesc()
+            self.font_keys[_token.is_dynamic()] = font_key
+
+        if self.measure_dc is None:
+            self.measure_dc = wx.MemoryDC()
+            self.measure_dc.SelectObject(wx.Bitmap(1, 1) if PHOENIX else wx.EmptyBitmap(1, 1))
+        self.measure_dc.SetFont(font)
+        width, height = text_extents.get_extent(self.measure_dc, font_key, _text)
+        return max(width, _token.reserved_width), height
+
+    def Layout(self):
+        """
+        Word wraps the tokens to the width of the window and repaints.
+        """
+        width = self.GetClientSize()[0]
+        self.wrap_width = width
+
+        self.lines = []
+        self.line_bottoms = []
+        x, y = 0, 0
+        line = []
+        for token in self.sentence:
+            if line and x + token.width > width:
+                y = self._finish_line(line, y)
+                line = []
+                x = 0
+            token.rect = (x, y, token.width, token.height)
+            line.append(token)
+            x += token.width
+        if line:
+            y = self._finish_line(line, y)
+
+        # Let the parent know how tall the wrapped text is
+        if self.GetMinSize()[1] != y:
+            self.SetMinSize((-1, y))
+            self.parent.Layout()
+
+        self.Refresh()
+        return True
+
+    def _finish_line(self, _line, _top):
+        """
+        Sets the height of every token in a wrapped line to the tallest one and records the line.
+        :return: The top of the next line
+        """
+        height = max(token.height for token in _line)
+        for token in _line:
+            x, y, w, h = token.rect
+            token.rect = (x, _top, w, height)
+
+        self.lines.append((_top, _top + height, [token.rect[0] for token in _line], _line))
+        self.line_bottoms.append(_top + height)
+        return _top + height
+
+    def hit_test(self, _point):
+        """
+        :return: The token under _point, or None
+        """
+        line_index = bisect.bisect_right(self.line_bottoms, _point[1])
+        if line_index >= len(self.lines):
+            return None
+
+        top, bottom, starts, tokens = self.lines[line_index]
+        token_index = bisect.bisect_right(starts, _point[0]) - 1
+        if token_index < 0:
+            return None
+
+        token = tokens[token_index]
+        if token.contains(_point):
+            return token
+        return None
+
+    # Painting
+    # ------------------------------------------------------------------------------------------
+    def refresh_token(self, _token):
+        """
+        Repaints only the rectangle of a single token.
+        """
+        self.RefreshRect(wx.Rect(*_token.rect), False)
+
+    def _on_size(self, event):
+        if self.GetClientSize()[0] != self.wrap_width:
+            self.Layout()
+        event.Skip()
+
+    def set_profiler(self, _profiler):
+        """
+        Records stage timings into a ScrubProfiler, None turns it off. Tokens are timed under
+        their ids, and since one window paints them all, 'paint' is recorded under the id of the
+        sentence as the time spent in the paint handler.
+        """
+        self.profiler = _profiler
+
+    def _on_paint(self, event):
+        profiler = self.profiler
+        if profiler is not None:
+            start = timer()
+        self._paint()
+        if profiler is not None:
+            profiler.record(self.GetId(), 'paint', timer() - start)
+
+    def _paint(self):
+        dc = wx.BufferedPaintDC(self)
+        dirty = self.GetUpdateRegion().GetBox()
+
+        dc.SetBrush(wx.Brush(self.GetBackgroundColour()))
+        dc.SetPen(wx.TRANSPARENT_PEN)
+        dc.DrawRectangle(dirty.x, dirty.y, dirty.width, dirty.height)
+        dc.SetTextForeground(self.GetForegroundColour())
+
+        # Only the lines and tokens that overlap the dirty rectangle get drawn
+        first = bisect.bisect_right(self.line_bottoms, dirty.y)
+        for top, bottom, starts, tokens in self.lines[first:]:
+            if top >= dirty.y + dirty.height:
+                break
+            for token in tokens:
+                x, y, w, h = token.rect
+                if x + w <= dirty.x or x >= dirty.x + dirty.width:
+                    continue
+                dc.SetFont(self._font_for(token))
+                dc.DrawText(token.text, x, y)
+
+    # Scrubbing and clicking
+    # ------------------------------------------------------------------------------------------
+    def _set_cursor(self, _kind):
+        if _kind != self.cur_cursor:
+            self.cur_cursor = _kind
+            self.SetCursor(self.cursors[_kind])
+
+    def _on_left_down(self, event):
+        token = self.hit_test(event.GetPosition())
+        if token is None:
+            event.Skip()
+            return
+
+        if token.kind == SentenceToken.CLICK:
+            self.model.click(token.id)
+            self._update(token, token.id)
+
+        elif token.kind == SentenceToken.SCRUB:
+            x, y, w, h = token.rect
+            self.anchor_point = (x + w // 2, y + h // 2)
+            self.last_pos = (event.GetX(), event.GetY())[token.scroll_dir]
+            self.warp_pending = False
+            self.scrubbing = token
+            self._set_cursor(None)
+            self.CaptureMouse()
+
+        event.Skip()
+
+    def _on_mouse_motion(self, event):
+        profiler = self.profiler
+        if profiler is None:
+            self._handle_motion(event)
+        else:
+            start = timer()
+            self._handle_motion(event)
+            if self.scrubbing is not None:
+                profiler.record(self.scrubbing.id, 'motion', timer() - start)
+
+    def _handle_motion(self, event):
+        token = self.scrubbing
+        if token is None:
+            over = self.hit_test(event.GetPosition())
+            self._set_cursor(SentenceToken.STATIC if over is None else over.kind)
+            self.hover_token = over if over is not None and over.kind in (
+                SentenceToken.SCRUB, SentenceToken.CLICK) else None
+            return
+
+        if not event.Dragging():
+            self._end_scrub()
+            return
+
+        if self.warp_pending:
+            self.warp_pending = False
+            if event.GetX() == self.anchor_point[0] and event.GetY() == self.anchor_point[1]:
+                # The event made by our own WarpPointer, the pointer did not really move
+                self.suppressed_events += 1
+                return
+        self.real_events += 1
+
+        if token.scroll_dir == 0:
+            pos = event.GetX()
+        else:
+            pos = event.GetY()
+        if token.warp_threshold is None:
+            delta = pos - self.anchor_point[token.scroll_dir]
+        else:
+            delta = pos - self.last_pos
+            self.last_pos = pos
+
+        if delta != 0:
+            timestamp = event.GetTimestamp()
+            scrubbed = self.model.scrub(token.id, delta, event.CmdDown(),
+                                        timestamp / 1000.0 if timestamp else None)
+            if scrubbed:
+                self._update(token, token.id)
+                # The token may have moved, keep the pointer anchored on it
+                x, y, w, h = token.rect
+                self.anchor_point = (x + w // 2, y + h // 2)
+
+            # Let anyone listening know, the same as a ScrubLabel would
+            evt = self.scrub_event
+            evt.SetId(token.id)
+            evt.set_scrub(delta, event.CmdDown(), 1, timestamp)
+            if self.profiler is None:
+                self.GetEventHandler().ProcessEvent(evt)
+            else:
+                start = timer()
+                self.GetEventHandler().ProcessEvent(evt)
+                self.profiler.record(token.id, 'dispatch', timer() - start)
+
+        anchor = self.anchor_point[token.scroll_dir]
+        if delta != 0 and (token.warp_threshold is None or
+                           abs(pos - anchor) > token.warp_threshold):
+            # Set the cursor back to the original point so it doesn't run away
+            self.WarpPointer(self.anchor_point[0], self.anchor_point[1])
+            self.last_pos = anchor
+            self.warp_pending = True
+
+    def motion_counts(self):
+        """
+        :return: A dict of the 'real' motion events handled while dragging and the warp echoes
+        that were 'suppressed', for every token together
+        """
+        return {'real': self.real_events, 'suppressed': self.suppressed_events}
+
+    def reset_motion_counts(self):
+        self.real_events = 0
+        self.suppressed_events = 0
+
+    def _on_leave(self, event):
+        if self.scrubbing is None:
+            self.hover_token = None
+        event.Skip()
+
+    def _seek_target(self):
+        token = self.hover_token
+        if token is None:
+            return None
+        return token, token.id
+
+    def _on_left_up(self, event):
+        self._end_scrub()
+        event.Skip()
+
+    def _on_capture_lost(self, event):
+        self.scrubbing = None
+        self._set_cursor(SentenceToken.STATIC)
+
+    def _end_scrub(self):
+        if self.scrubbing is not None:
+            self.scrubbing = None
+            self._end_history_run()
+            if self.HasCapture():
+                self.ReleaseMouse()
+            self._set_cursor(SentenceToken.SCRUB)
@@ -1,17 +1,44 @@
+from contextlib import contextmanager
+
+try:
+    from collections.abc import Mapping
+except ImportError:
+    from collections import Mapping
+
 import wx
-import wx.lib.inspection
-import ObjectListView as lv
-from Data import Data
+from BackgroundCompute import BackgroundComputation
+from LabelFormat import formatter_for
+from ScrubHistory import ScrubHistory
+from ScrubModel import SentenceModel
+from ScrubProfiler import timer
+from StreamSource import StreamFeed
+
+# wxPython Phoenix (4 and later) renamed some of the Classic names used by the widgets
+PHOENIX = 'phoenix' in wx.PlatformInfo
 
 
 class ScrubLabelEvent(wx.PyCommandEvent):
     def __init__(self, evtType, _id):
         """
-        The event sent when a ScrubLabel is scrubbed.
+        The event sent when a ScrubLabel is scrubbed. Each label sends the same event object
+        every time with new values filled in by set_scrub, so listeners should copy out what they
+        need rather than keep the event.
         """
         wx.PyCommandEvent.__init__(self, evtType, _id)
         self.delta = 0
         self.cmd_down = False
+        # Number of raw motion events that were summed into this one
+        self.coalesced = 1
+
+    def set_scrub(self, _delta, _cmd_down, _coalesced=1, _timestamp=0):
+        """
+        Fills in the event for the next scrub.
+        :param _timestamp: The timestamp of the (last) motion event, in milliseconds
+        """
+        self.delta = _delta
+        self.cmd_down = _cmd_down
+        self.coalesced = _coalesced
+        self.SetTimestamp(_timestamp)
 
     def get_delta(self):
         """
@@ -19,6 +46,12 @@ class ScrubLabelEvent(wx.PyCommandEvent):
         """
         return self.delta
 
+    def get_coalesced(self):
+        """
+        :return: How many motion events were folded into this event when the label is coalescing.
+        """
+        return self.coalesced
+
     def increasing(self):
         if self.delta > 0:
             return True
@@ -35,7 +68,194 @@ class ScrubLabelEvent(wx.PyCommandEvent):
         return self.cmd_down
 
 
-class ScrubLabel(wx.StaticText):
+class TextExtentCache(object):
+    def __init__(self, _max_size=20000):
+        """
+        Remembers the pixel extent of strings so that a label that is set to a string it has
+        shown before (with the same font) does not have to be measured again.
+        :param _max_size: Number of extents kept before the cache is emptied and starts over
+        """
+        self.max_size = _max_size
+        self.extents = {}
+
+    def get_extent(self, _window, _font_key, _text):
+        """
+        :param _window: The window whose font is used to measure _text on a miss
+        :param _font_key: A hashable description of the window's current font
+        :return: The (width, height) of _text
+        """
+        key = (_font_key, _text)
+        extent = self.extents.get(key)
+        if extent is None:
+            if len(self.extents) >= self.max_size:
+                self.extents.clear()
+            extent = tuple(_window.GetTextExtent(_text))
+            self.extents[key] = extent
+        return extent
+
+    def clear(self):
+        self.extents.clear()
+
+
+# Shared by every label so that common strings are measured once per font
+text_extents = TextExtentCache()
+
+_stock_cursors = {}
+
+
+def stock_cursor(_stock_id):
+    """
+    :return: The shared wx.Cursor for a stock cursor id such as wx.CURSOR_HAND, made only once
+    """
+    cursor = _stock_cursors.get(_stock_id)
+    if cursor is None:
+        cursor = wx.Cursor(_stock_id) if PHOENIX else wx.StockCursor(_stock_id)
+        _stock_cursors[_stock_id] = cursor
+    return cursor
+
+
+def sample_values(_values, _count):
+    """
+    Picks up to about _count values spread evenly over _values, always including both ends. Used
+    to find the widest value of a list without measuring every entry of a long one.
+    """
+    last = len(_values) - 1
+    step = max(1, last // _count)
+    indexes = set(range(0, last, step))
+    indexes.add(last)
+    return [_values[i] for i in indexes]
+
+
+class DynamicLabel(wx.StaticText):
+    # Number of values looked at when reserving the width of a long value list
+    RESERVE_SAMPLE = 1000
+
+    # Set through set_profiler, None keeps every timing hook switched off
+    profiler = None
+    paint_requested = None
+    # Set through set_formatter, None shows values with str
+    formatter = None
+
+    def __init__(self, _parent, _id, _value, *args, **kwds):
+        """
+        Base for the labels whose value is set by a DynamicSentence. Stores the value that is not
+        just a string along with its position in the value list, and keeps track of the width the
+        label takes up so that the sentence only has to re-layout when it changes. Any other
+        arguments are passed on to wx.StaticText.
+        :param _parent: The parent that it is contained within
+        :param _id: The wx id for this object
+        :param _value: The value to display
+        :param _index: Keyword only, the position of _value in the list of values
+        """
+        index = kwds.pop('_index', 0)
+        wx.StaticText.__init__(self, _parent, _id, str(_value), *args, **kwds)
+
+        self.cur_value = _value
+        # Cursor into the value list, kept up to date so a change never has to search the list
+        self.cur_index = index
+
+        # Width that is held for the label no matter how short the current value is, and the
+        # values it was measured from
+        self.reserved_width = 0
+        self.reserved_values = None
+        self.font_key = None
+        self.label_width = self._text_width(str(_value))
+
+    def _text_width(self, _text):
+        if self.font_key is None:
+            self.font_key = self.GetFont().GetNativeFontInfoDesc()
+        return max(self.reserved_width, text_extents.get_extent(self, self.font_key, _text)[0])
+
+    def _text_of(self, _value):
+        if self.formatter is None:
+            return str(_value)
+        return self.formatter(_value)
+
+    def set_formatter(self, _formatter):
+        """
+        :param _formatter: A LabelFormatter (see formatter_for) the values are shown with, or
+        None for str. The label is not redrawn until it is next set.
+        """
+        self.formatter = _formatter
+
+    def SetFont(self, *args, **kwargs):
+        """
+        Changing the font changes every extent, so they are measured again from here on,
+        including the reserved width.
+        """
+        result = wx.StaticText.SetFont(self, *args, **kwargs)
+        self.font_key = None
+        if self.reserved_values is not None:
+            self.reserve_width(self.reserved_values)
+        else:
+            self.label_width = self._text_width(self.GetLabel())
+        return result
+
+    def set_label(self, _label, _index=None):
+        """
+        Wrapper for setting the label, which allows a non string object to be set.
+        :param _index: The position of _label in the value list, leaves the cursor alone if None
+        :return: True if the width of the label changed, meaning the sentence needs a layout
+        """
+        text = self._text_of(_label)
+        self.SetLabel(text)
+        self.cur_value = _label
+        if _index is not None:
+            self.cur_index = _index
+
+        if self.profiler is not None and self.paint_requested is None:
+            self.paint_requested = timer()
+
+        old_width = self.label_width
+        self.label_width = self._text_width(text)
+        return self.label_width != old_width
+
+    def set_profiler(self, _profiler):
+        """
+        Starts (or with None stops) recording stage timings into a ScrubProfiler. The paint
+        handler is only bound while profiling.
+        """
+        if _profiler is self.profiler:
+            return
+
+        self.profiler = _profiler
+        self.Unbind(wx.EVT_PAINT)
+        if _profiler is not None:
+            self.Bind(wx.EVT_PAINT, self._on_paint_profiled)
+
+    def _on_paint_profiled(self, event):
+        """
+        Records how long it took from a new label being set until it is painted.
+        """
+        event.Skip()
+        if self.paint_requested is not None:
+            self.profiler.record(self.GetId(), 'paint', timer() - self.paint_requested)
+            self.paint_requested = None
+
+    def reserve_width(self, _values):
+        """
+        Measures the widest of _values once and holds that much room for the label, so moving
+        through the values never changes its width. Long value lists are sampled evenly (ends
+        included); a wider value that was not sampled still gets laid out correctly.
+        :param _values: The values the label will show, or None to stop reserving
+        :return: True if the width of the label changed
+        """
+        self.reserved_width = 0
+        if _values is not None and len(_values) > 0:
+            self.reserved_values = _values
+            self.reserved_width = max(self._text_width(self._text_of(value))
+                                      for value in sample_values(_values, self.RESERVE_SAMPLE))
+            self.SetMinSize((self.reserved_width, -1))
+        else:
+            self.reserved_values = None
+            self.SetMinSize((-1, -1))
+
+        old_width = self.label_width
+        self.label_width = self._text_width(self.GetLabel())
+        return self.label_width != old_width
+
+
+class ScrubLabel(DynamicLabel):
     myEVT_LABEL_SCRUBBED = wx.NewEventType()
     EVT_LABEL_SCRUBBED = wx.PyEventBinder(myEVT_LABEL_SCRUBBED, 1)
 
@@ -43,79 +263,271 @@ class ScrubLabel(wx.StaticText):
     def __init__(self, _parent, _id, _value, _scroll_horz=True, *args, **kwds):
         """
         A label that will hold the mouse in place when left clicked, allowing it to be scrubbed
-        either left or right (up or down)
+        either left or right (up or down). The options below are keyword only, any other
+        arguments are passed on to wx.StaticText.
         :param _parent: The container that
         :param _id: A unique wxpython ID
         :param _value: The text that is going to be displayed
+        :param _index: The position of _value in the list of values being scrubbed through
+        :param _max_rate: If given, motion is coalesced and at most this many scrub events are
+        sent per second
+        :param _warp_threshold: If given, scrubs with relative motion and only warps the pointer
+        back once it is this many pixels from the anchor, see set_warp_threshold
         """
-        wx.StaticText.__init__(self, _parent, _id, str(_value), *args, **kwds)
+        max_rate = kwds.pop('_max_rate', None)
+        warp_threshold = kwds.pop('_warp_threshold', None)
+        DynamicLabel.__init__(self, _parent, _id, _value, *args, **kwds)
 
         self.parent = _parent
-
-        if _scroll_horz:
-            self.scroll_dir = 0
-        else:
-            self.scroll_dir = 1
-
-        self.cur_value = _value
+        self.set_scroll_horz(_scroll_horz)
 
         # Flag that is true if a drag is happening after a left click
         self.changing_value = False
 
+        # The stock cursor being shown, it is only set again when it has to change
+        self.cursor_id = None
+        self._set_cursor(wx.CURSOR_SIZEWE)
+
+        # Sent for every scrub, refilled each time rather than made anew
+        self.scrub_event = ScrubLabelEvent(ScrubLabel.myEVT_LABEL_SCRUBBED, _id)
+        self.scrub_event.SetEventObject(self)
+
         # The point in which the cursor gets anchored to during the drag event
         self.anchor_point = (0, 0)
 
+        # Relative motion: where the pointer was at the last event, and whether the next event
+        # may be the echo of our own WarpPointer
+        self.warp_threshold = None
+        self.warp_distance = 0
+        self.last_pos = 0
+        self.warp_pending = False
+        self.set_warp_threshold(warp_threshold)
+
+        # Motion events that were handled, and warp echoes that were dropped
+        self.real_events = 0
+        self.suppressed_events = 0
+
+        # Motion that has been summed up but not yet sent out while coalescing
+        self.max_rate = None
+        self.frame_time = 0.0
+        self.pending_delta = 0
+        self.pending_count = 0
+        self.pending_cmd_down = False
+        self.pending_timestamp = 0
+        self.last_flush = 0.0
+        self.flush_timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self._on_flush_timer, self.flush_timer)
+        self.set_max_rate(max_rate)
+
         self.Bind(wx.EVT_MOTION, self._on_mouse_motion)
         self.Bind(wx.EVT_LEAVE_WINDOW, self._on_win_leave)
         self.Bind(wx.EVT_LEFT_DOWN, self._on_left_down, self)
         self.Bind(wx.EVT_LEFT_UP, self._on_left_up, self)
 
+    def set_scroll_horz(self, _scroll_horz):
+        """
+        :param _scroll_horz: True to scrub left and right, False for up and down
+        """
+        if _scroll_horz:
+            self.scroll_dir = 0
+        else:
+            self.scroll_dir = 1
+
+    def set_warp_threshold(self, _warp_threshold):
+        """
+        Most backends send a motion event for every WarpPointer, which comes back into the motion
+        handler and doubles the events of a drag. Those echoes are always dropped. With a
+        threshold the label also scrubs by relative motion, each event moving by how far the
+        pointer went since the last one, and only warps once the pointer has drifted more than
+        _warp_threshold pixels from the anchor, so most events cause no warp (and no echo) at all.
+        :param _warp_threshold: Pixels, or None to warp back after every event as before. It is
+        capped to stay inside the label.
+        """
+        self.warp_threshold = _warp_threshold
+
+    def motion_counts(self):
+        """
+        :return: A dict of the 'real' motion events handled while dragging and the warp echoes
+        that were 'suppressed'
+        """
+        return {'real': self.real_events, 'suppressed': self.suppressed_events}
+
+    def reset_motion_counts(self):
+        self.real_events = 0
+        self.suppressed_events = 0
+
+    def set_profiler(self, _profiler):
+        """
+        Also swaps in a timed motion handler while profiling, so there is no cost when it is off.
+        """
+        if _profiler is self.profiler:
+            return
+
+        DynamicLabel.set_profiler(self, _profiler)
+        self.Unbind(wx.EVT_MOTION)
+        if _profiler is None:
+            self.Bind(wx.EVT_MOTION, self._on_mouse_motion)
+        else:
+            self.Bind(wx.EVT_MOTION, self._on_mouse_motion_profiled)
+
+    def _on_mouse_motion_profiled(self, event):
+        start = timer()
+        self._on_mouse_motion(event)
+        self.profiler.record(self.GetId(), 'motion', timer() - start)
+
+    def _set_cursor(self, _stock_id):
+        if _stock_id != self.cursor_id:
+            self.cursor_id = _stock_id
+            self.SetCursor(stock_cursor(_stock_id))
+
     def _on_mouse_motion(self, event):
         """
         When the mouse moves, it check to see if it is a drag, or if left down had happened.
         If neither of those cases are true then it will cancel the action.
         If they are true then it calculates the change in position of the mouse, then changes
-        the position of the cursor back to where the left click event happened.
+        the position of the cursor back to where the left click event happened. No wx objects
+        are made here while dragging and nothing is retained, the cursor only changes when the
+        drag starts or ends.
         """
-        # Changes the cursor
-        if self.changing_value:
-            self.SetCursor(wx.StockCursor(wx.CURSOR_BLANK))
-        else:
-            self.SetCursor(wx.StockCursor(wx.CURSOR_SIZEWE))
+        if not (self.changing_value and event.Dragging()):
+            # Case where the mouse is moving over the control, but has no
+            # intent to actually change the value
+            if self.changing_value:
+                self.changing_value = False
+                self.parent.SetDoubleBuffered(False)
+            self._set_cursor(wx.CURSOR_SIZEWE)
+            return
+
+        self._set_cursor(wx.CURSOR_BLANK)
+
+        if self.warp_pending:
+            self.warp_pending = False
+            if event.GetX() == self.anchor_point[0] and event.GetY() == self.anchor_point[1]:
+                # The event made by our own WarpPointer, the pointer did not really move
+                self.suppressed_events += 1
+                return
+        self.real_events += 1
 
         # Calculate the change in mouse position
-        cur_point = event.GetPosition()
-        delta = cur_point[self.scroll_dir] - self.anchor_point[self.scroll_dir]
-
-        # If the cursor is being moved and dragged left or right over the label
-        if delta != 0 and event.Dragging() and self.changing_value:
-
-            # Set the parameters of the event that will be posted
-            evt = ScrubLabelEvent(ScrubLabel.myEVT_LABEL_SCRUBBED, self.GetId())
-            evt.SetEventObject(self)
-            evt.delta = delta
-            evt.cmd_down = event.CmdDown()
-            # Send out the event
+        if self.scroll_dir == 0:
+            pos = event.GetX()
+        else:
+            pos = event.GetY()
+        anchor = self.anchor_point[self.scroll_dir]
+
+        if self.warp_threshold is None:
+            delta = pos - anchor
+        else:
+            delta = pos - self.last_pos
+            self.last_pos = pos
+
+        if delta != 0:
+            if self.max_rate is None:
+                self._send_scrub(delta, event.CmdDown(), 1, event.GetTimestamp())
+            else:
+                self._queue_scrub(delta, event.CmdDown(), event.GetTimestamp())
+
+        if self.warp_threshold is None or abs(pos - anchor) > self.warp_distance:
+            self._warp_to_anchor()
+
+    def _warp_to_anchor(self):
+        """
+        Set the cursor back to the original point so it doesn't run away
+        """
+        self.WarpPointer(self.anchor_point[0], self.anchor_point[1])
+        self.last_pos = self.anchor_point[self.scroll_dir]
+        self.warp_pending = True
+
+    def _send_scrub(self, _delta, _cmd_down, _count, _timestamp):
+        """
+        Sends the scrub event to whoever is listening to this label.
+        :param _timestamp: The timestamp of the (last) motion event, in milliseconds
+        """
+        evt = self.scrub_event
+        evt.set_scrub(_delta, _cmd_down, _count, _timestamp)
+
+        profiler = self.profiler
+        if profiler is None:
             self.GetEventHandler().ProcessEvent(evt)
+        else:
+            start = timer()
+            self.GetEventHandler().ProcessEvent(evt)
+            profiler.record(self.GetId(), 'dispatch', timer() - start)
 
-        if event.Dragging() and self.changing_value:
-            self.SetCursor(wx.StockCursor(wx.CURSOR_BLANK))
-            # Set the cursor back to the original point so it doesn't run away
-            self.WarpPointer(self.anchor_point[0], self.anchor_point[1])
+    def _queue_scrub(self, _delta, _cmd_down, _timestamp):
+        """
+        Adds a motion delta to the pending total. It is sent straight away if a frame has passed
+        since the last update, otherwise the timer sends it at the start of the next frame.
+        """
+        self.pending_delta += _delta
+        self.pending_count += 1
+        self.pending_cmd_down = _cmd_down
+        self.pending_timestamp = _timestamp
 
-        # Case where the mouse is moving over the control, but has no
-        # intent to actually change the value
-        if self.changing_value and not event.Dragging():
+        if self.flush_timer.IsRunning():
+            return
+
+        wait = self.frame_time - (timer() - self.last_flush)
+        if wait <= 0:
+            self.flush_scrub()
+        else:
+            self.flush_timer.Start(max(1, int(wait * 1000)), wx.TIMER_ONE_SHOT)
+
+    def _on_flush_timer(self, event):
+        self.flush_scrub()
+
+    def flush_scrub(self):
+        """
+        Sends out any motion that has been coalesced but not yet applied, as a single event.
+        """
+        if self.flush_timer.IsRunning():
+            self.flush_timer.Stop()
+
+        delta, count = self.pending_delta, self.pending_count
+        self.pending_delta = 0
+        self.pending_count = 0
+        self.last_flush = timer()
+
+        # Deltas in opposite directions can cancel each other out within a frame
+        if delta != 0:
+            self._send_scrub(delta, self.pending_cmd_down, count, self.pending_timestamp)
+
+    def cancel_scrub(self):
+        """
+        Drops any coalesced motion without sending it and ends the drag, used when the label is
+        taken out of its sentence.
+        """
+        if self.flush_timer.IsRunning():
+            self.flush_timer.Stop()
+        self.pending_delta = 0
+        self.pending_count = 0
+        if self.changing_value:
             self.changing_value = False
             self.parent.SetDoubleBuffered(False)
+        self._set_cursor(wx.CURSOR_SIZEWE)
+
+    def set_max_rate(self, _max_rate):
+        """
+        Turns coalescing on or off. While on, the motion deltas are summed and sent as one scrub
+        event per frame, so the label and layout are updated at most _max_rate times a second.
+        :param _max_rate: Updates per second, or None to send an event for every mouse motion
+        """
+        if self.pending_count:
+            self.flush_scrub()
+
+        self.max_rate = _max_rate
+        if _max_rate is not None:
+            self.frame_time = 1.0 / _max_rate
 
     def _on_left_up(self, event):
         """
         Cancels the changing event, and turns off the optimization buffering
         """
+        if self.pending_count:
+            self.flush_scrub()
         self.changing_value = False
         self.parent.SetDoubleBuffered(False)
-        self.SetCursor(wx.StockCursor(wx.CURSOR_SIZEWE))
+        self._set_cursor(wx.CURSOR_SIZEWE)
 
     def _on_left_down(self, event):
         """
@@ -123,11 +535,19 @@ class ScrubLabel(wx.StaticText):
         Also turns on the doublebuffering which eliminates the flickering when rapidly changing
         values.
         """
-        width, height = self.GetSizeTuple()
-
-        self.anchor_point = (width/2, height/2)
+        width, height = self.GetSize()
+
+        self.anchor_point = (width // 2, height // 2)
+        if self.warp_threshold is not None:
+            # Relative motion starts from where the button went down, and warps back before
+            # the pointer can leave the label
+            self.last_pos = (event.GetX(), event.GetY())[self.scroll_dir]
+            self.warp_distance = min(self.warp_threshold,
+                                     max(1, self.anchor_point[self.scroll_dir] - 2))
+        self.warp_pending = False
         self.changing_value = True
         self.parent.SetDoubleBuffered(True)
+        self._set_cursor(wx.CURSOR_BLANK)
 
     def _on_win_leave(self, event):
         """
@@ -136,44 +556,110 @@ class ScrubLabel(wx.StaticText):
         happened
         """
         if self.changing_value:
-            self.WarpPointer(self.anchor_point[0], self.anchor_point[1])
+            self._warp_to_anchor()
+
 
-    def set_label(self, _label):
+class DragPayloads(object):
+    def __init__(self):
         """
-        Wrapper for setting the label, which allows a non string object to be set.
+        The objects being dragged, by key. Only the key goes through the native drag and drop,
+        so a dragged Data is never copied or serialized however big it is, and the drop target
+        gets the very same object.
         """
-        self.SetLabel(str(_label))
-        self.cur_value = _label
+        self.objects = {}
+        self.last_key = 0
+
+    def register(self, _obj):
+        """
+        :return: The key that stands for _obj until it is released
+        """
+        self.last_key += 1
+        key = str(self.last_key)
+        self.objects[key] = _obj
+        return key
+
+    def get(self, _key):
+        return self.objects.get(_key)
+
+    def release(self, _key):
+        self.objects.pop(_key, None)
+
+
+# Shared by every drag source and drop target in the process
+drag_payloads = DragPayloads()
+
+_payload_format = None
+
+
+def payload_data_object(_key=None):
+    """
+    :return: A data object of the drag payload format, holding _key if given
+    """
+    global _payload_format
+    if _payload_format is None:
+        name = 'wx_scrub_widget.payload'
+        _payload_format = wx.DataFormat(name) if PHOENIX else wx.CustomDataFormat(name)
+
+    data_object = wx.CustomDataObject(_payload_format)
+    if _key is not None:
+        data_object.SetData(_key.encode('ascii'))
+    return data_object
 
 
-#  Define Dynamic Test Drop Target class
-class DynDropTarget(wx.TextDropTarget):
-    """ This object implements Drop Target functionality for Text """
+def drag_payload(_source, _obj):
+    """
+    Drags _obj (a Data, or the values themselves) from the window _source onto any scrubber
+    that can take drops. Blocks until the drop is done, like DoDragDrop.
+    :return: The result of DoDragDrop
+    """
+    key = drag_payloads.register(_obj)
+    try:
+        drop_source = wx.DropSource(_source)
+        drop_source.SetData(payload_data_object(key))
+        return drop_source.DoDragDrop(True)
+    finally:
+        drag_payloads.release(key)
+
+
+class DynDropTarget(wx.DropTarget):
     def __init__(self, _frame, _dyn_sent, _id):
-        """ Initialize the Drop Target, passing in the Object Reference to
-            indicate what should receive the dropped text """
-        #  Initialize the wx.TextDropTarget Object
-        wx.TextDropTarget.__init__(self)
+        """
+        Lets a control take the values of an object dragged with drag_payload.
+        :param _frame: The frame that contains the drag and drops
+        :param _dyn_sent: The sentence the control belongs to
+        :param _id: The id of the control the values are dropped on
+        """
+        wx.DropTarget.__init__(self)
 
-        # The frame that is used to contain the drag and drops
         self.frame = _frame
         self.dyn_sentence = _dyn_sent
-
-        #  Store the Object Reference for dropped text
         self.obj_id = _id
 
-    def OnDropText(self, x, y, data):
-        """ Implement Text Drop """
-        #  When text is dropped, write it into the object specified
-        source_id = int(data.split()[0])
-        source_index = int(data.split()[1])
+        self.data_object = payload_data_object()
+        self.SetDataObject(self.data_object)
 
-        source = self.frame.FindWindowById(source_id)
-        to_set = source.GetObjectAt(source_index).data
-        self.dyn_sentence.new_scrub_vals(self.obj_id, to_set)
+    def OnData(self, x, y, result):
+        if not self.GetData():
+            return wx.DragNone
 
+        key = bytes(self.data_object.GetData()).decode('ascii')
+        payload = drag_payloads.get(key)
+        if payload is None or not self.drop_payload(x, y, payload):
+            return wx.DragNone
+        return result
 
-class ClickLabel(wx.StaticText):
+    def drop_payload(self, x, y, _payload):
+        """
+        Hands the dropped values to the control. A Data's data is used as it is, arrays and
+        Series are viewed by the scrubber without a copy.
+        :param _payload: The dragged object
+        :return: True if the drop was taken
+        """
+        self.dyn_sentence.new_scrub_vals(self.obj_id, getattr(_payload, 'data', _payload))
+        return True
+
+
+class ClickLabel(DynamicLabel):
     def __init__(self,  _parent, _id, _value, *args, **kwds):
         """
         Simple wrapper for a statictext. The actual changing of the label is NOT handled here.
@@ -181,70 +667,605 @@ class ClickLabel(wx.StaticText):
         :param _parent: The parent that it is contained within
         :param _id: The wx id for this object
         :param _value: The value to display
+        :param _index: Keyword only, the position of _value in the list of values being clicked
+        through
         """
-        wx.StaticText.__init__(self, _parent, _id, str(_value), *args, **kwds)
+        DynamicLabel.__init__(self, _parent, _id, _value, *args, **kwds)
 
-        self.cur_value = _value
+        # The window shows its cursor whenever the pointer is over it, so it is set once
+        self.SetCursor(stock_cursor(wx.CURSOR_HAND))
+
+
+class ControlValues(Mapping):
+    def __init__(self, _sentence):
+        """
+        The values of every control of a sentence by its id, read from its model. Setting the
+        values of a control goes through new_scrub_vals, so the labels show them; controls are
+        only added and removed through the sentence.
+        """
+        self.sentence = _sentence
+
+    def __getitem__(self, _id):
+        return self.sentence.model.controls[_id].values
+
+    def __setitem__(self, _id, _values):
+        if _id not in self.sentence.model.controls:
+            raise KeyError(_id)
+        self.sentence.new_scrub_vals(_id, _values)
+
+    def __iter__(self):
+        return iter(self.sentence.model.controls)
+
+    def __len__(self):
+        return len(self.sentence.model.controls)
+
+
+class SentenceModelView(object):
+    """
+    Shared by the sentence classes, which are views of the SentenceModel held in self.model. The
+    model's settings are exposed as attributes of the sentence, as they always have been.
+    """
+    @property
+    def change_rate(self):
+        return self.model.change_rate
 
-        self.Bind(wx.EVT_ENTER_WINDOW, self._on_win_enter)
+    @change_rate.setter
+    def change_rate(self, _rate):
+        self.model.change_rate = _rate
 
-    def _on_win_enter(self, event):
-        self.SetCursor(wx.StockCursor(wx.CURSOR_HAND))
+    @property
+    def change_value(self):
+        return self.model.change_value
 
-    def set_label(self, _label):
+    @change_value.setter
+    def change_value(self, _value):
+        self.model.change_value = _value
+
+    @property
+    def dyn_text_vals(self):
         """
-        Wrapper for setting the label, which allows a non string object to be set.
+        The values of every control by its id. Setting the values of a control updates it.
         """
-        self.SetLabel(str(_label))
-        self.cur_value = _label
+        return ControlValues(self)
+
+    # Set through set_profiler
+    profiler = None
+    # BackgroundComputations by control id, made by compute
+    computations = None
+    # The labels (or tokens) of derived values by key, made by add_derived
+    derived_views = None
+    # StreamFeeds by control id, made by stream
+    streams = None
+
+    def _show(self, _label, _key):
+        """
+        Makes a label show the current value of its control in the model, and starts its
+        background computation on the new value if it has one.
+        :return: True if the label changed width
+        """
+        control = self.model.controls[_key]
+        if self.computations and _key in self.computations:
+            self.computations[_key].submit(control.value)
+        return _label.set_label(control.value, control.index)
+
+    @staticmethod
+    def _set_format(_label, _control, _label_format):
+        """
+        Gives a label and its control the shared formatter of _label_format, the control uses it
+        to seek by the shown text.
+        """
+        formatter = formatter_for(_label_format)
+        _label.set_formatter(formatter)
+        _control.formatter = formatter
+
+    def _show_derived(self, _key):
+        """
+        Shows the derived values that changed because the value of _key did. Only those
+        downstream of it are recomputed, see SentenceModel.propagate.
+        :return: True if any of their labels changed width
+        """
+        if not self.derived_views:
+            return False
+
+        resized = False
+        for key in self.model.propagate(_key):
+            value = self.model.derived[key].value
+            if self.computations and key in self.computations:
+                self.computations[key].submit(value)
+            if self.derived_views[key].set_label(value):
+                resized = True
+        return resized
+
+    def _add_derived_view(self, _view, _func, _inputs):
+        """
+        Adds a derived value to the model and remembers the view that shows it.
+        """
+        if self.derived_views is None:
+            self.derived_views = {}
+
+        key = _view.GetId()
+        node = self.model.add_derived(key, _func, [control.GetId() for control in _inputs])
+        self.derived_views[key] = _view
+        _view.set_label(node.value)
+        return key
+
+    def _remove_derived_view(self, _key):
+        if self.derived_views:
+            self.derived_views.pop(_key, None)
+
+    def compute(self, _control, _func, _callback, executor=None, errback=None, args=(),
+                kwargs=None):
+        """
+        Evaluates _func(value, *args, **kwargs) off the main loop whenever the value of _control
+        changes, and calls _callback(result) on the main thread with the result for the newest
+        value. Results made stale by a newer value are dropped, so scrubbing never waits on it.
+        :param _control: A scrubber, clicker or derived value of this sentence, it is evaluated
+        right away
+        :param executor: A concurrent.futures thread or process pool, a shared thread pool if None
+        :return: The BackgroundComputation, for its stats and set_args
+        """
+        if self.computations is None:
+            self.computations = {}
+
+        key = _control.GetId()
+        self.stop_computing(key)
+        computation = BackgroundComputation(_func, _callback, executor, errback)
+        computation.set_args(*args, **(kwargs or {}))
+        self.computations[key] = computation
+        computation.submit(self.model.value_of(key))
+        return computation
+
+    def stop_computing(self, _key):
+        """
+        Drops the background computation of a control, if it has one. Done for every control
+        that is deleted.
+        :param _key: The id of the control
+        """
+        if self.computations and _key in self.computations:
+            self.computations.pop(_key).close()
+
+    def stream(self, _control, capacity=10000, max_rate=20):
+        """
+        Makes a scrubber or clicker show values that keep arriving, such as samples of a time
+        series. Put them with put or extend of the StreamFeed, from any thread. They are added
+        to a ring buffer of capacity values on the main thread when it is idle, and the label is
+        updated at most max_rate times a second.
+
+        The control keeps its values until the first one arrives, then starts on the newest. A
+        control left on the newest value follows new ones, anywhere else it stays on the value
+        it is on until that is pushed out of the buffer.
+        :return: The StreamFeed
+        """
+        if self.streams is None:
+            self.streams = {}
+
+        key = _control.GetId()
+        self.stop_streaming(key)
+        feed = StreamFeed(self.parent, lambda appended: self._on_stream(key), capacity,
+                          max_rate)
+        self.streams[key] = feed
+        return feed
+
+    def stop_streaming(self, _key):
+        """
+        Stops feeding a control, if it has a stream. Done for every control that is deleted.
+        The control keeps the values it has.
+        """
+        if self.streams and _key in self.streams:
+            self.streams.pop(_key).close()
+
+    def _on_stream(self, _key):
+        control = self.model.controls.get(_key)
+        if control is None:
+            return
+
+        stream = self.streams[_key].stream
+        if control.values is not stream:
+            self.model.set_values(_key, stream)
+            control.move_to(len(stream) - 1)
+            changed = True
+        else:
+            changed = self.model.values_appended(_key)
+
+        if changed:
+            self._update(self._views_by_key()[_key], _key)
+
+    def _update(self, _label, _key):
+        """
+        Shows the new value of a control and lays out the sentence if the label changed width,
+        timing both when profiling.
+        """
+        profiler = self.profiler
+        if profiler is None:
+            resized = self._show(_label, _key)
+            # Every label is set before the one layout, derived ones included
+            if self._show_derived(_key) or resized:
+                self._relayout()
+            return
+
+        start = timer()
+        resized = self._show(_label, _key)
+        resized = self._show_derived(_key) or resized
+        shown = timer()
+        profiler.record(_key, 'set_label', shown - start)
+        if resized:
+            self._relayout()
+            profiler.record(_key, 'layout', timer() - shown)
+
+    def set_history(self, max_entries=1000):
+        """
+        Turns on undo and redo, keeping the last max_entries changes. None turns it off again.
+        """
+        self.model.set_history(ScrubHistory(max_entries) if max_entries else None)
+
+    def _end_history_run(self):
+        """
+        Called when a drag ends, the next scrub is undone separately.
+        """
+        if self.model.history is not None:
+            self.model.history.end_run()
+
+    def _views_by_key(self):
+        return dict((view.GetId(), view) for view in self.dyn_text)
+
+    def _step_history(self, _key):
+        if _key is None:
+            return False
+        self._update(self._views_by_key()[_key], _key)
+        return True
+
+    def undo(self):
+        """
+        Undoes the last change of a scrubber or clicker, a whole drag at a time.
+        :return: False if there was nothing to undo
+        """
+        return self._step_history(self.model.undo())
+
+    def redo(self):
+        """
+        :return: False if there was nothing to redo
+        """
+        return self._step_history(self.model.redo())
+
+    def _control_keys(self):
+        return [view.GetId() for view in self.dyn_text if view.GetId() in self.model.controls]
+
+    def snapshot(self, with_values=True):
+        """
+        :param with_values: Include the values of the controls, otherwise a restore keeps the
+        values the controls have then
+        :return: A SentenceSnapshot of every scrubber and clicker, see its to_json and to_bytes
+        """
+        return self.model.snapshot(self._control_keys(), with_values)
+
+    def restore(self, _snapshot):
+        """
+        Puts every scrubber and clicker back where _snapshot has them, in a single layout. The
+        sentence must have the same controls, in the same order, as the one it was taken of.
+        """
+        views = self._views_by_key()
+        with self.batch():
+            for key in self.model.restore(_snapshot, self._control_keys()):
+                view = views[key]
+                if view.reserved_width:
+                    view.reserve_width(self.model.controls[key].values)
+                self._update(view, key)
+
+    def set_profiler(self, _profiler):
+        """
+        Records how long each stage of scrubbing and clicking takes into a ScrubProfiler, for
+        every control of the sentence including ones added later. None turns it off again.
+        """
+        self.profiler = _profiler
+        for control in self.dyn_text:
+            control.set_profiler(_profiler)
+
+
+class BatchLayout(object):
+    """
+    Lets a sentence be changed many times with a single layout at the end. Sentence classes
+    call _relayout instead of Layout, and need a parent attribute.
+    """
+    batch_depth = 0
+    layout_pending = False
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager that freezes the parent and holds back every layout until the outermost
+        batch exits, which then lays out and refreshes once. Building a sentence of N words
+        inside a batch costs one layout instead of N.
+        """
+        if self.batch_depth == 0:
+            self.parent.Freeze()
+        self.batch_depth += 1
+        try:
+            yield self
+        finally:
+            self.batch_depth -= 1
+            if self.batch_depth == 0:
+                if self.layout_pending:
+                    self.layout_pending = False
+                    self.Layout()
+                self.parent.Thaw()
+                self.parent.Refresh()
+
+    def _relayout(self):
+        """
+        Lays out now, or at the end of the batch if one is open.
+        """
+        if self.batch_depth:
+            self.layout_pending = True
+        else:
+            self.Layout()
+
+
+try:
+    unichr
+except NameError:
+    unichr = chr
+
+# Numpad keys are typed as the characters on them
+_NUMPAD_CHARS = dict([(getattr(wx, 'WXK_NUMPAD%d' % digit), str(digit)) for digit in range(10)] +
+                     [(wx.WXK_NUMPAD_DECIMAL, '.'), (wx.WXK_NUMPAD_SUBTRACT, '-'),
+                      (wx.WXK_NUMPAD_ADD, '+')])
+# Keys go to these when they have the focus, even over a scrubber
+_TEXT_ENTRIES = tuple(getattr(wx, name) for name in ('TextEntry', 'TextCtrl', 'ComboBox')
+                      if hasattr(wx, name))
+
+
+class TypeToSeek(object):
+    """
+    Type to seek: while the pointer is over a scrubber or clicker, typing jumps it to the value
+    nearest to what was typed, the closest number for numeric values or otherwise the first value
+    starting with it. Sentence classes provide _seek_target and need frame and model attributes.
+    """
+    # Seconds without a key after which typing starts a new search
+    SEEK_TIMEOUT = 1.0
+
+    seek_enabled = False
+    seek_text = ''
+    seek_time = 0.0
+
+    def set_seek(self, _enabled=True):
+        """
+        Turns type to seek on or off. The keys are caught from the frame, so it works even
+        though the labels never take the focus.
+        """
+        if _enabled == self.seek_enabled:
+            return
+
+        self.seek_enabled = _enabled
+        self.seek_text = ''
+        if _enabled:
+            self.frame.Bind(wx.EVT_CHAR_HOOK, self._on_seek_key)
+        else:
+            self.frame.Unbind(wx.EVT_CHAR_HOOK, handler=self._on_seek_key)
+
+    def _seek_target(self):
+        """
+        :return: The (label, key) of the control under the pointer, or None
+        """
+        raise NotImplementedError
+
+    @staticmethod
+    def _typed_char(_event):
+        """
+        Char hook events are key downs, which carry the key and not what it types. Letters are
+        the same either way since seeking ignores case, but what shift makes of any other key
+        depends on the keyboard layout, so those are not read. Prefixes, suffixes and separators
+        don't need typing to seek a number: '25' finds '$25'.
+        :return: The character a key types, or None for keys that type nothing or are shifted
+        """
+        key = _event.GetKeyCode()
+        if key in _NUMPAD_CHARS:
+            return _NUMPAD_CHARS[key]
+
+        char = _event.GetUnicodeKey()
+        if char == wx.WXK_NONE or char < 32 or char == 127:
+            return None
+        char = unichr(char)
+        if _event.ShiftDown() and not char.isalpha():
+            return None
+        return char.lower()
+
+    def _on_seek_key(self, event):
+        target = self._seek_target()
+        # Shortcuts and keys for text fields are left to the rest of the application
+        if target is None or event.HasModifiers() or event.MetaDown() or \
+                isinstance(wx.Window.FindFocus(), _TEXT_ENTRIES):
+            event.Skip()
+            return
+
+        key = event.GetKeyCode()
+        char = self._typed_char(event)
+        now = timer()
+        if now - self.seek_time > self.SEEK_TIMEOUT:
+            self.seek_text = ''
+
+        if key == wx.WXK_ESCAPE and self.seek_text:
+            self.seek_text = ''
+            return
+        elif key == wx.WXK_BACK and self.seek_text:
+            self.seek_text = self.seek_text[:-1]
+        elif char is not None:
+            self.seek_text += char
+        else:
+            event.Skip()
+            return
+        self.seek_time = now
 
+        if self.seek_text:
+            label, control_key = target
+            if self.model.seek(control_key, self.seek_text):
+                self._update(label, control_key)
 
-class DynamicSentence(wx.WrapSizer):
-    def __init__(self, _frame, _parent):
+
+class WidgetPool(object):
+    def __init__(self, _max_size=500):
+        """
+        Keeps hidden label windows around so they can be handed out again instead of creating new
+        native controls. Pooled windows stay children of the sentence's parent.
+        :param _max_size: Windows past this many are destroyed instead of being pooled
+        """
+        self.max_size = _max_size
+        self.pooled = {}
+        self.size = 0
+
+    def take(self, _cls):
+        """
+        :return: A pooled window of exactly type _cls, or None if there isn't one
+        """
+        widgets = self.pooled.get(_cls)
+        if widgets:
+            self.size -= 1
+            return widgets.pop()
+        return None
+
+    def give(self, _widget):
+        """
+        Hides _widget and keeps it for reuse, or destroys it if the pool is full.
+        """
+        if self.size >= self.max_size:
+            _widget.Destroy()
+            return
+
+        _widget.Hide()
+        self.pooled.setdefault(type(_widget), []).append(_widget)
+        self.size += 1
+
+    def destroy_all(self):
+        for widgets in self.pooled.values():
+            for widget in widgets:
+                widget.Destroy()
+        self.pooled = {}
+        self.size = 0
+
+
+class DynamicSentence(wx.WrapSizer, SentenceModelView, BatchLayout, TypeToSeek):
+    def __init__(self, _frame, _parent, pool=False):
         """
         A 'paragraph' style combination of scrub labels, and static text. The order that they are
         displayed the same as the order in which that they are added to the control.
         :param _parent: The parent that contains the control
+        :param pool: Keep the windows of deleted words and reuse them for new ones, worth it for
+        sentences that get rebuilt often
         """
         wx.WrapSizer.__init__(self, wx.HORIZONTAL)
         _parent.SetSizer(self)
 
         self.frame = _frame
         self.parent = _parent
-        self.change_rate = 1.0
+        self.model = SentenceModel()
 
-        self.change_value = 0
-
-        self.dyn_text_vals = {}
         self.dyn_text = []
         self.static_text = []
         self.sentence = []
 
+        self.pool = WidgetPool() if pool else None
+
+        # Fonts given to words as they are made, None leaves the parent's font
+        self.static_font = None
+        self.dyn_font = None
+
+        # The scrubber or clicker under the pointer, typed keys seek in it
+        self.hover_label = None
+
     def clear(self):
         """
-        Erases the whole sentence
+        Erases the whole sentence, destroying (or pooling) its windows
         """
-        self.dyn_text_vals = {}
+        for to_delete in self.sentence:
+            self._release(to_delete)
+
+        self.model.clear()
+        self.derived_views = None
         self.dyn_text = []
         self.static_text = []
         self.sentence = []
+        self._relayout()
 
     def delete_word(self):
         """
         Deletes the last item in the list from the sentence.
         """
         to_delete = self.sentence.pop()
-        to_delete.Hide()
 
-        if to_delete in self.static_text:
-            self.static_text.remove(to_delete)
-            return
-        elif to_delete in self.dyn_text:
-            self.dyn_text.remove(to_delete)
-            key = to_delete.GetId()
-            del self.dyn_text_vals[key]
+        # Words are appended in order, so the last word is also last in its own list
+        if isinstance(to_delete, DynamicLabel):
+            self.dyn_text.pop()
+            self.model.remove_control(to_delete.GetId())
+            self._remove_derived_view(to_delete.GetId())
+        else:
+            self.static_text.pop()
 
-        self.Layout()
+        self._release(to_delete)
+        self._relayout()
+
+    def _release(self, _widget):
+        """
+        Takes a window out of the sentence and destroys it, or hides it in the pool.
+        """
+        self.Detach(_widget)
+        if isinstance(_widget, ScrubLabel):
+            _widget.cancel_scrub()
+        if _widget is self.hover_label:
+            self.hover_label = None
+        self.stop_computing(_widget.GetId())
+        self.stop_streaming(_widget.GetId())
+
+        if self.pool is None:
+            _widget.Destroy()
+        else:
+            _widget.SetDropTarget(None)
+            if isinstance(_widget, DynamicLabel):
+                # A pooled label must not keep the values it showed alive
+                _widget.reserve_width(None)
+                _widget.set_formatter(None)
+            self.pool.give(_widget)
+
+    def _reuse(self, _cls, _font):
+        """
+        :return: A shown window of type _cls from the pool, or None if a new one has to be made
+        """
+        if self.pool is None:
+            return None
+
+        widget = self.pool.take(_cls)
+        if widget is not None:
+            widget.SetFont(_font if _font is not None else self.parent.GetFont())
+            widget.Show()
+        return widget
+
+    def widget_counts(self):
+        """
+        Counts used to check for leaked windows.
+        :return: A dict of the windows in the sentence ('live'), the hidden ones waiting in the
+        pool ('pooled') and every child window of the parent ('children')
+        """
+        return {'live': len(self.sentence),
+                'pooled': self.pool.size if self.pool is not None else 0,
+                'children': len(self.parent.GetChildren())}
+
+    def empty_pool(self):
+        """
+        Destroys every pooled window.
+        """
+        if self.pool is not None:
+            self.pool.destroy_all()
+
+    def _add_static(self, _text):
+        to_add = self._reuse(wx.StaticText, self.static_font)
+        if to_add is None:
+            to_add = wx.StaticText(self.parent, wx.ID_ANY, _text)
+            if self.static_font is not None:
+                to_add.SetFont(self.static_font)
+        else:
+            to_add.SetLabel(_text)
+
+        self.static_text.append(to_add)
+        self.sentence.append(to_add)
+        self.Add(to_add)
 
     def add_text(self, _text, split_words=True):
         """
@@ -255,36 +1276,58 @@ class DynamicSentence(wx.WrapSizer):
             words = _text.split()
             words[0] = ' ' + words[0]
             for word in words:
-                to_add = wx.StaticText(self.parent, wx.ID_ANY, word + ' ')
-                self.static_text.append(to_add)
-                self.sentence.append(to_add)
-                self.Add(to_add)
+                self._add_static(word + ' ')
         else:
-            to_add = wx.StaticText(self.parent, wx.ID_ANY, _text)
-            self.static_text.append(to_add)
-            self.sentence.append(to_add)
-            self.Add(to_add)
+            self._add_static(_text)
 
-        self.Layout()
+        self._relayout()
 
-    def add_scrubber(self, _values, _default_value, scroll_horz=True, can_drop=False):
+    def add_scrubber(self, _values, _default_value, scroll_horz=True, can_drop=False,
+                     max_rate=None, reserve_width=False, warp_threshold=None, label_format=None):
         """
-        :param _values: A list of values that will be scrubbed through
+        :param _values: A list, ValueSequence, numpy array or pandas Series of values that will be
+        scrubbed through
         :param _default_value: A value from _values that will be displayed initially
+        :param max_rate: Caps the scrub updates per second by coalescing the mouse motion, None
+        updates on every motion event
+        :param reserve_width: Holds the width of the widest value so scrubbing never re-lays out
+        the sentence
+        :param warp_threshold: Scrubs by relative motion and only warps the pointer back after it
+        drifts this many pixels, None warps after every event
+        :param label_format: How values are shown, a format spec such as ',.2f', a template such
+        as '${:,.2f}' or a function. The values themselves are left as they are.
         """
-        _id = wx.NewId()
-        self.dyn_text_vals[_id] = _values
-        to_add = ScrubLabel(self.parent, _id, _default_value, _scroll_horz=scroll_horz)
+        to_add = self._reuse(ScrubLabel, self.dyn_font)
+        if to_add is None:
+            to_add = ScrubLabel(self.parent, wx.NewId(), _default_value, _scroll_horz=scroll_horz,
+                                _max_rate=max_rate, _warp_threshold=warp_threshold)
+            if self.dyn_font is not None:
+                to_add.SetFont(self.dyn_font)
+            to_add.Bind(ScrubLabel.EVT_LABEL_SCRUBBED, self._value_scrubbed)
+            to_add.Bind(wx.EVT_LEFT_UP, self._on_scrub_released)
+            self._track_hover(to_add)
+        else:
+            to_add.reserve_width(None)
+            to_add.set_scroll_horz(scroll_horz)
+            to_add.set_max_rate(max_rate)
+            to_add.set_warp_threshold(warp_threshold)
+            to_add.reset_motion_counts()
+
+        _id = to_add.GetId()
+        control = self.model.add_control(_id, _values, _default_value)
+        self._set_format(to_add, control, label_format)
+        to_add.set_profiler(self.profiler)
+        self._show(to_add, _id)
+        if reserve_width:
+            to_add.reserve_width(control.values)
 
         # Add to local dynamic text list, and to the sizer
         self.dyn_text.append(to_add)
         self.sentence.append(to_add)
         self.Add(to_add)
 
-        to_add.Bind(ScrubLabel.EVT_LABEL_SCRUBBED, self._value_scrubbed)
-
         # Must call layout anytime a control is made or modified.
-        self.Layout()
+        self._relayout()
 
         if can_drop:
             drop_tar = DynDropTarget(self.frame, self, _id)
@@ -292,294 +1335,162 @@ class DynamicSentence(wx.WrapSizer):
 
         return to_add
 
-    def add_clicker(self, _values, _default_value, can_drop=False):
+    def add_clicker(self, _values, _default_value, can_drop=False, label_format=None):
+        """
+        :param _values: A list, ValueSequence, numpy array or pandas Series of values that will be
+        clicked through
+        :param _default_value: A value from _values that will be displayed initially
+        :param label_format: How values are shown, the same as for add_scrubber
+        """
+        to_add = self._reuse(ClickLabel, self.dyn_font)
+        if to_add is None:
+            to_add = ClickLabel(self.parent, wx.NewId(), _default_value)
+            if self.dyn_font is not None:
+                to_add.SetFont(self.dyn_font)
+            to_add.Bind(wx.EVT_LEFT_DOWN, self._value_clicked)
+            self._track_hover(to_add)
+        else:
+            to_add.reserve_width(None)
 
-        _id = wx.NewId()
-        self.dyn_text_vals[_id] = _values
-        to_add = ClickLabel(self.parent, _id, _default_value)
+        _id = to_add.GetId()
+        control = self.model.add_control(_id, _values, _default_value)
+        self._set_format(to_add, control, label_format)
+        to_add.set_profiler(self.profiler)
+        self._show(to_add, _id)
 
         self.dyn_text.append(to_add)
         self.sentence.append(to_add)
         self.Add(to_add)
-        self.Layout()
-
-        to_add.Bind(wx.EVT_LEFT_DOWN, self._value_clicked)
+        self._relayout()
 
         if can_drop:
             drop_tar = DynDropTarget(self.frame, self, _id)
             to_add.SetDropTarget(drop_tar)
 
+        return to_add
+
+    def add_derived(self, _func, _inputs, label_format=None):
+        """
+        Adds a label whose value is worked out from other controls, such as a total from a price
+        and a quantity scrubber. It is recomputed only when one of its inputs changes, and its
+        label is updated together with the control that was changed, in one layout.
+        :param _func: Called with the values of _inputs, in order, returns the value to show
+        :param _inputs: Scrubbers, clickers or derived labels of this sentence
+        :param label_format: How the value is shown, the same as for add_scrubber
+        :return: The label
+        """
+        to_add = self._reuse(DynamicLabel, self.dyn_font)
+        if to_add is None:
+            to_add = DynamicLabel(self.parent, wx.NewId(), '')
+            if self.dyn_font is not None:
+                to_add.SetFont(self.dyn_font)
+        else:
+            to_add.reserve_width(None)
+
+        to_add.set_formatter(formatter_for(label_format))
+        self._add_derived_view(to_add, _func, _inputs)
+        to_add.set_profiler(self.profiler)
+
+        self.dyn_text.append(to_add)
+        self.sentence.append(to_add)
+        self.Add(to_add)
+        self._relayout()
+        return to_add
+
+    def _track_hover(self, _label):
+        _label.Bind(wx.EVT_ENTER_WINDOW, self._on_label_enter)
+        _label.Bind(wx.EVT_LEAVE_WINDOW, self._on_label_leave)
+
+    def _on_label_enter(self, event):
+        self.hover_label = event.GetEventObject()
+        event.Skip()
+
+    def _on_label_leave(self, event):
+        if self.hover_label is event.GetEventObject():
+            self.hover_label = None
+        event.Skip()
+
+    def _seek_target(self):
+        label = self.hover_label
+        if label is None or label.GetId() not in self.model.controls:
+            return None
+        return label, label.GetId()
+
     def _value_clicked(self, event):
         _id = event.GetId()
-        cur_text = event.GetEventObject()
-        cur_index = self.dyn_text_vals[_id].index(cur_text.cur_value)
-
-        # Always goes down through the list, so it will cycle back from the end
-        to_set = self.dyn_text_vals[_id][cur_index - 1]
-        cur_text.set_label(to_set)
+        self.model.click(_id)
 
-        # IMPORTANT is what aligns everything
-        self.Layout()
+        # IMPORTANT is what aligns everything, but only needed when the label changed size
+        self._update(event.GetEventObject(), _id)
 
         # Allows the event to propagate further up to anyone whos listening
         event.Skip()
 
     def _value_scrubbed(self, event):
         """
-        Private function, is listening for when a control is scrubbed, as to change its cursor
-        left or right in the list of values that is associated with the control.
+        Private function, is listening for when a control is scrubbed, as to move its cursor
+        left or right (further the faster the drag) in the list of values of the control.
         :param event: The event given by the event
         """
         _id = event.GetId()
-        cur_text = event.GetEventObject()
-        cur_index = self.dyn_text_vals[_id].index(cur_text.cur_value)
 
-        # If cmd is down, slow the change rate to 1/10 of the current value
-        if event.CmdDown():
-            self.change_value += self.change_rate/10.0
-        else:
-            self.change_value += self.change_rate
-
-        # Only if the floating point change value gets to the first integer value
-        if self.change_value >= 1:
-
-            # Try to avoid any index error on the high end
-            try:
-                # Decide to move up in the index
-                if event.increasing():
-                    to_set = self.dyn_text_vals[_id][cur_index + 1]
-                    cur_text.set_label(to_set)
-                else:
-
-                    # Check to see if negative (if it is it would not throw an exception,
-                    # rather start from the other end of the list)
-                    if (cur_index - 1) >= 0:
-                        to_set = self.dyn_text_vals[_id][cur_index - 1]
-                        cur_text.set_label(to_set)
-            except IndexError:
-                # Hit the edge of the list
-                pass
-
-            # Reset the change value since the value was just changed.
-            self.change_value = 0
-
-        # IMPORTANT is what aligns everything
-        self.Layout()
+        # The velocity is only known if the event came with a timestamp
+        timestamp = event.GetTimestamp()
+        scrubbed = self.model.scrub(_id, event.get_delta(), event.CmdDown(),
+                                    timestamp / 1000.0 if timestamp else None,
+                                    event.get_coalesced())
+
+        # IMPORTANT is what aligns everything, labels that kept their width don't need it
+        if scrubbed:
+            self._update(event.GetEventObject(), _id)
 
         # Allows the event to propagate further up to anyone whos listening
         event.Skip()
 
+    def _on_scrub_released(self, event):
+        self._end_history_run()
+        # The label ends the drag itself
+        event.Skip()
+
     def new_scrub_vals(self, _id, vals):
         """
         Updates the values for an existing scrub control
         :param _id: The wxID of the control
-        :param vals: A list of string convertible items
+        :param vals: A sequence of string convertible items, or a single item
         """
-        if _id in self.dyn_text_vals and type(vals) == list and len(vals) > 0:
-            self.dyn_text_vals[_id] = vals
-            print self.frame.FindWindowById(_id)
+        if _id in self.model.controls:
+            self.model.set_values(_id, vals)
 
             scrub_label = self.frame.FindWindowById(_id)
-            scrub_label.set_label(vals[0])
+            resized = self._show(scrub_label, _id)
+            if scrub_label.reserved_width:
+                resized = scrub_label.reserve_width(self.model.controls[_id].values) or resized
+            resized = self._show_derived(_id) or resized
 
-        elif _id in self.dyn_text_vals:
-            list_vals = [vals]
-            self.dyn_text_vals[_id] = list_vals
+            if resized:
+                self._relayout()
 
-            scrub_label = self.frame.FindWindowById(_id)
-            scrub_label.set_label(list_vals[0])
-        self.Layout()
-
-    def set_static_font(self, *args, **kwargs):
+    def set_static_font(self, _font):
         """
-        Iterates through all static text and changes its font.
+        Iterates through all static text and changes its font. Words added afterwards are made
+        with this font, so it can be set before building the sentence.
         """
+        self.static_font = _font
         for text in self.static_text:
-            text.SetFont(*args, **kwargs)
+            text.SetFont(_font)
 
-        self.Layout()
+        if self.static_text:
+            self._relayout()
 
-    def set_dyn_font(self, *args, **kwargs):
+    def set_dyn_font(self, _font):
         """
-        Iterates through the dynamic elements and calls their setfont function.
+        Iterates through the dynamic elements and calls their setfont function, which measures
+        their reserved widths again. Scrubbers and clickers added afterwards are made with this
+        font.
         """
+        self.dyn_font = _font
         for text in self.dyn_text:
-            text.SetFont(*args, **kwargs)
-
-        self.Layout()
-
-
-# Below is all for testing
-# ----------------------------------------------------------------------------------------
-class ProportionalSplitter(wx.SplitterWindow):
-        def __init__(self, parent, _id=-1, proportion=0.66, size=wx.DefaultSize, **kwargs):
-                wx.SplitterWindow.__init__(self, parent, _id, wx.Point(0, 0), size, **kwargs)
-
-                # the minimum size of a pane.
-                self.SetMinimumPaneSize(50)
-                self.proportion = proportion
-                if not 0 < self.proportion < 1:
-                        raise ValueError("proportion value for ProportionalSplitter "
-                                         "must be between 0 and 1.")
-                self.ResetSash()
-                self.Bind(wx.EVT_SIZE, self.OnReSize)
-                self.Bind(wx.EVT_SPLITTER_SASH_POS_CHANGED, self.OnSashChanged, id=_id)
-                # # hack to set sizes on first paint event
-                self.Bind(wx.EVT_PAINT, self.OnPaint)
-                self.firstpaint = True
-
-        def SplitHorizontally(self, win1, win2):
-                if self.GetParent() is None: return False
-                return wx.SplitterWindow.SplitHorizontally(self, win1, win2,
-                        int(round(self.GetParent().GetSize().GetHeight() * self.proportion)))
-
-        def SplitVertically(self, win1, win2):
-                if self.GetParent() is None: return False
-                return wx.SplitterWindow.SplitVertically(self, win1, win2,
-                        int(round(self.GetParent().GetSize().GetWidth() * self.proportion)))
-
-        def GetExpectedSashPosition(self):
-                if self.GetSplitMode() == wx.SPLIT_HORIZONTAL:
-                        tot = max(self.GetMinimumPaneSize(), self.GetParent().GetClientSize().height)
-                else:
-                        tot = max(self.GetMinimumPaneSize(), self.GetParent().GetClientSize().width)
-                return int(round(tot * self.proportion))
-
-        def ResetSash(self):
-                self.SetSashPosition(self.GetExpectedSashPosition())
-
-        def OnReSize(self, event):
-                """
-                Window has been resized, so we need to adjust the sash based on self.proportion.
-                """
-                self.ResetSash()
-                event.Skip()
-
-        def OnSashChanged(self, event):
-                """
-                We'll change self.proportion now based on where user dragged the sash.
-                """
-                pos = float(self.GetSashPosition())
-                if self.GetSplitMode() == wx.SPLIT_HORIZONTAL:
-                        tot = max(self.GetMinimumPaneSize(), self.GetParent().GetClientSize().height)
-                else:
-                        tot = max(self.GetMinimumPaneSize(), self.GetParent().GetClientSize().width)
-                self.proportion = pos / tot
-                event.Skip()
-
-        def OnPaint(self, event):
-                if self.firstpaint:
-                        if self.GetSashPosition() != self.GetExpectedSashPosition():
-                                self.ResetSash()
-                        self.firstpaint = False
-                event.Skip()
-
-
-class TestAppFrame(wx.Frame):
-    def __init__(self, *args, **kwds):
-        kwds["style"] = wx.DEFAULT_FRAME_STYLE
-        wx.Frame.__init__(self, *args, **kwds)
-        self.split = ProportionalSplitter(self, wx.ID_ANY)
-        self.panel1 = wx.Panel(self.split, wx.ID_ANY)
-        self.panel2 = wx.Panel(self.split, wx.ID_ANY)
-
-        self.steps_list = lv.ObjectListView(self.split, -1,
-                                                    style=wx.LC_REPORT | wx.SUNKEN_BORDER,
-                                                    sortable=False,
-                                                    cellEditMode=lv.ObjectListView.CELLEDIT_DOUBLECLICK)
-
-        step_cols = [lv.ColumnDefn('Operation', 'left', 120, 'title'),
-                     lv.ColumnDefn('Type', 'left', 100, 'value_title')]
-
-        self.steps_list.SetColumns(step_cols)
-        # TEMP FOR DRAG TESTING
-        self.steps_list.Bind(wx.EVT_LIST_BEGIN_DRAG, self.on_list_drag)
-
-        d1 = Data(range(43), 'Up to meaning of life')
-        d2 = Data(range(100), 'Centennial')
-        d1.value_title = 'List of Ints'
-        d2.value_title = 'List of Ints'
-
-        states = ["AL", "AK", "AZ", "AR", "CA", "CO", "CT", "DC", "DE", "FL", "GA",
-                  "HI", "ID", "IL", "IN", "IA", "KS", "KY", "LA", "ME", "MD",
-                  "MA", "MI", "MN", "MS", "MO", "MT", "NE", "NV", "NH", "NJ",
-                  "NM", "NY", "NC", "ND", "OH", "OK", "OR", "PA", "RI", "SC",
-                  "SD", "TN", "TX", "UT", "VT", "VA", "WA", "WV", "WI", "WY"]
-
-        d3 = Data(states, 'State Abbreviations')
-        d4 = Data('I only have a single value', 'Simple string')
-        d5 = Data(154, 'Constant Int')
-        d3.value_title = 'List of Strings'
-
-        self.steps_list.SetObjects([d1, d2, d3, d4, d5])
-
-        self.test = DynamicSentence(self, self.panel2)
-        self.test.add_text('Suppose that an extra ')
-        self.test.add_scrubber(map(lambda x: '$' + str(x), range(51)), '$25', can_drop=True)
-        self.test.add_text(' was charged to ')
-        self.test.add_scrubber(map(lambda x: str(x) + '%', range(101)), '25%', can_drop=True)
-        self.test.add_text(' of ')
-        self.test.add_clicker(['California taxpayers', 'vehicle vegistrations'],
-                               'California taxpayers')
-        self.test.add_text('. Park admission would be ')
-
-        to_add = ['free'] + map(lambda x: '$' + str(x), range(1, 26))
-        self.test.add_scrubber(to_add, '$10')
-        self.test.add_text(' for ')
-        self.test.add_clicker(['everyone', ' those who paid the charge'], 'everyone', can_drop=True)
-        self.test.add_text('.')
-
-        self.test.change_rate = .5
-        self.test.set_dyn_font(wx.Font(10, wx.DEFAULT, wx.NORMAL, wx.BOLD, 0, ""))
-        self.test.set_static_font(wx.Font(9, wx.DEFAULT, wx.NORMAL, wx.NORMAL, 0, ""))
-
-        for item in self.test.dyn_text:
-            print item.GetLabel()
-
-
-        for item in self.test.static_text:
-            print item.GetLabel()
-
-        # Uncomment for wx inspection tool of different widgets
-        # wx.lib.inspection.InspectionTool().Show()
-
-        self.__set_properties()
-        self.__do_layout()
-
-    def __set_properties(self):
-        self.SetTitle("Testbed Framework")
-        self.SetSize((800, 300))
-
-        self.panel1.SetBackgroundColour('GRAY')
-        # self.panel2.SetBackgroundColour('CYAN')
-
-    def __do_layout(self):
-        self.split.SplitVertically(self.steps_list, self.panel2)
-
-    def on_list_drag(self, event):
-        # Build a string only identifier so that the dragtarget can make sense of
-        # what data is getting put into it, and look it up in a view somewhere
-        dataObj = event.GetEventObject().GetSelectedObject()
-        data_index = event.GetEventObject().GetIndexOf(dataObj)
-        olv_id = str(event.GetEventObject().GetId())
-
-        # Id in the form of wxID olv_index
-        id_string = str(olv_id) + ' ' + str(data_index)
-
-        #  Create a Text Data Object, which holds the text that is to be dragged
-        tdo = wx.PyTextDataObject(id_string)
-        #  Create a Drop Source Object, which enables the Drag operation
-        tds = wx.DropSource(self)
-        #  Associate the Data to be dragged with the Drop Source Object
-        tds.SetData(tdo)
-        #  Initiate the Drag Operation
-        tds.DoDragDrop(True)
-
-
-if __name__ == "__main__":
-    app = wx.App(False)
-    # wx.InitAllImageHandlers()
-    frame_1 = TestAppFrame(None, wx.ID_ANY, "")
-    app.SetTopWindow(frame_1)
-    frame_1.Show()
-    app.MainLoop()
+            text.SetFont(_font)
+
+        if self.dyn_text:
+            self._relayout()
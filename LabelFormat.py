@@ -0,0 +1,82 @@
+from collections import OrderedDict
+
+
+class LabelFormatter(object):
+    def __init__(self, _format, _max_size=4096):
+        """
+        Turns raw values into the text of their labels, remembering the most recently rendered
+        strings so scrubbing back and forth over the same values formats each one once. The
+        values themselves stay as they are (numbers stay numbers), only the labels change.
+        :param _format: A function of the value, a str.format template such as '${:,.2f}', or a
+        format spec such as ',.2f' or '.1%'
+        :param _max_size: How many rendered strings are kept, the least recently used go first
+        """
+        if callable(_format):
+            self.format = _format
+        elif '{' in _format:
+            self.format = _format.format
+        else:
+            self.format = lambda value: format(value, _format)
+
+        self.max_size = _max_size
+        self.rendered = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def func(self, _value):
+        """
+        Renders one value. Values the format doesn't fit, such as text dropped on a scrubber of
+        numbers or the placeholder of a failed derived value, are shown with str.
+        """
+        try:
+            return self.format(_value)
+        except (ValueError, TypeError, KeyError, IndexError):
+            return str(_value)
+
+    def __call__(self, _value):
+        # Keyed with the type as well, 1, 1.0 and True are equal but may not format the same
+        key = (type(_value), _value)
+        rendered = self.rendered
+        try:
+            text = rendered.pop(key)
+        except KeyError:
+            self.misses += 1
+            text = self.func(_value)
+            if len(rendered) >= self.max_size:
+                rendered.popitem(last=False)
+        except TypeError:
+            # Values that can't be hashed are formatted every time
+            return self.func(_value)
+        else:
+            self.hits += 1
+
+        # Put back as the most recently used
+        rendered[key] = text
+        return text
+
+    def clear(self):
+        self.rendered.clear()
+
+
+# Formatters by what they were made from, so controls with the same format share rendered text.
+# Functions are keys too, so it only keeps the most recently asked for; a control holds on to
+# its own formatter, one pushed out here is only not shared with new controls any more.
+MAX_FORMATTERS = 64
+_formatters = OrderedDict()
+
+
+def formatter_for(_format):
+    """
+    :param _format: Anything LabelFormatter takes, a LabelFormatter, or None
+    :return: The shared LabelFormatter for _format, or None to show values with str
+    """
+    if _format is None or isinstance(_format, LabelFormatter):
+        return _format
+
+    formatter = _formatters.pop(_format, None)
+    if formatter is None:
+        formatter = LabelFormatter(_format)
+        if len(_formatters) >= MAX_FORMATTERS:
+            _formatters.popitem(last=False)
+    _formatters[_format] = formatter
+    return formatter
@@ -0,0 +1,183 @@
+import collections
+import json
+import struct
+import timeit
+
+from ValueSequence import ValueRange, AffixRange
+
+timer = timeit.default_timer
+
+
+class ScrubHistory(object):
+    # Seconds between two steps of the same control that still count as one scrub
+    MERGE_TIMEOUT = 1.0
+
+    def __init__(self, _max_entries=1000):
+        """
+        Undo and redo for a SentenceModel. Every entry is a (key, from index, to index) delta,
+        never a value, and the entries are kept in a ring buffer of _max_entries that drops the
+        oldest, so a session of any length takes a bounded amount of memory.
+
+        Each scrub event moves a control a step or two, so steps of the same control that follow
+        each other closely are merged into one entry, undoing a drag undoes all of it.
+        :param _max_entries: The number of undoable changes kept
+        """
+        self.undo_entries = collections.deque(maxlen=_max_entries)
+        self.redo_entries = []
+        # When the last entry was recorded, and whether it may be merged with the next
+        self.last_time = None
+        self.mergeable = False
+
+    def record(self, _key, _from_index, _to_index, _merge=False):
+        """
+        Remembers that control _key moved. Anything that was undone can no longer be redone.
+        :param _merge: The change is a step of a scrub (or seek) that is merged into the last
+        entry if that was a step of the same control
+        """
+        now = timer()
+        del self.redo_entries[:]
+        if _merge and self.mergeable and self.undo_entries and \
+                self.undo_entries[-1][0] == _key and now - self.last_time <= self.MERGE_TIMEOUT:
+            key, from_index, _ = self.undo_entries.pop()
+            if from_index == _to_index:
+                # Scrubbed back to where it started, the next step starts a new entry
+                self.mergeable = False
+                return
+            self.undo_entries.append((key, from_index, _to_index))
+        else:
+            self.undo_entries.append((_key, _from_index, _to_index))
+
+        self.last_time = now
+        self.mergeable = _merge
+
+    def end_run(self):
+        """
+        Stops the next step from being merged, called when a drag ends.
+        """
+        self.mergeable = False
+
+    def undo(self):
+        """
+        :return: The (key, index) to move a control back to, or None if there is nothing to undo
+        """
+        if not self.undo_entries:
+            return None
+        entry = self.undo_entries.pop()
+        self.redo_entries.append(entry)
+        self.mergeable = False
+        return entry[0], entry[1]
+
+    def redo(self):
+        """
+        :return: The (key, index) to move a control forward to again, or None
+        """
+        if not self.redo_entries:
+            return None
+        entry = self.redo_entries.pop()
+        self.undo_entries.append(entry)
+        self.mergeable = False
+        return entry[0], entry[2]
+
+    def forget(self, _key):
+        """
+        Drops the entries of a control, done when it is removed or its values are replaced and
+        its old indexes mean nothing any more.
+        """
+        self.undo_entries = collections.deque((entry for entry in self.undo_entries
+                                               if entry[0] != _key), self.undo_entries.maxlen)
+        self.redo_entries = [entry for entry in self.redo_entries if entry[0] != _key]
+        self.mergeable = False
+
+    def clear(self):
+        self.undo_entries.clear()
+        del self.redo_entries[:]
+        self.mergeable = False
+
+    def can_undo(self):
+        return bool(self.undo_entries)
+
+    def can_redo(self):
+        return bool(self.redo_entries)
+
+
+def _encode_values(_values):
+    """
+    :return: _values as something json can write, or None if it can't be. Ranges are written as
+    their definition, not their values.
+    """
+    if isinstance(_values, AffixRange):
+        return {'range': _encode_values(_values.range), 'prefix': _values.prefix,
+                'suffix': _values.suffix, 'decimals': _values.decimals}
+    if isinstance(_values, ValueRange):
+        return {'start': _values.start, 'stop': _values.stop, 'step': _values.step}
+    if isinstance(_values, (list, tuple)):
+        try:
+            json.dumps(_values)
+        except (TypeError, ValueError):
+            return None
+        return list(_values)
+    return None
+
+
+def _decode_values(_values):
+    if isinstance(_values, dict):
+        if 'range' in _values:
+            return AffixRange(_decode_values(_values['range']), _values['prefix'],
+                              _values['suffix'], _values['decimals'])
+        return ValueRange(_values['start'], _values['stop'], _values['step'])
+    return _values
+
+
+class SentenceSnapshot(object):
+    # Written at the start of binary snapshots, followed by the version
+    MAGIC = b'SCRB'
+    VERSION = 1
+    _HEADER = struct.Struct('<4sHdI')
+
+    def __init__(self, _change_value, _indexes, _values=None):
+        """
+        Where every control of a sentence is, by the order the controls were added, so that it
+        can be restored into a sentence rebuilt later.
+        :param _change_value: The scrubbing built up towards the next step
+        :param _indexes: The index of each control
+        :param _values: The values of each control, None for a control whose values are kept as
+        they are when restoring. None for all of them if not given.
+        """
+        self.change_value = _change_value
+        self.indexes = list(_indexes)
+        self.values = list(_values) if _values is not None else [None] * len(self.indexes)
+
+    def to_json(self):
+        """
+        :return: The snapshot as json text, with the values of every control that has lists or
+        ranges of json values
+        """
+        return json.dumps({'version': self.VERSION,
+                           'change_value': self.change_value,
+                           'controls': [{'index': index, 'values': _encode_values(values)}
+                                        for index, values in zip(self.indexes, self.values)]})
+
+    @classmethod
+    def from_json(cls, _text):
+        data = json.loads(_text)
+        if data.get('version') != cls.VERSION:
+            raise ValueError('Unknown snapshot version %r' % (data.get('version'),))
+        controls = data['controls']
+        return cls(data['change_value'], [control['index'] for control in controls],
+                   [_decode_values(control['values']) for control in controls])
+
+    def to_bytes(self):
+        """
+        :return: The snapshot packed into 18 bytes plus 4 per control. Only the indexes are
+        packed, the values are kept as they are when it is restored.
+        """
+        return self._HEADER.pack(self.MAGIC, self.VERSION, self.change_value,
+                                 len(self.indexes)) + \
+            struct.pack('<%dI' % len(self.indexes), *self.indexes)
+
+    @classmethod
+    def from_bytes(cls, _data):
+        magic, version, change_value, count = cls._HEADER.unpack_from(_data)
+        if magic != cls.MAGIC or version != cls.VERSION:
+            raise ValueError('Not a version %d scrub snapshot' % cls.VERSION)
+        return cls(change_value, struct.unpack_from('<%dI' % count, _data, cls._HEADER.size))
@@ -0,0 +1,534 @@
+from ScrubHistory import SentenceSnapshot
+from SeekIndex import SeekIndex
+from ValueSequence import as_sequence, StreamSequence
+from ValueStore import value_store
+
+
+class AccelerationCurve(object):
+    def __init__(self, _threshold=2, _saturation=40, _velocity_threshold=500.0,
+                 _velocity_saturation=10000.0, _traverse_events=100, _exponent=2.0):
+        """
+        Turns how fast the pointer is moving into how many values one scrub event moves. Slow
+        drags move one value per event like they always have. Faster drags move more, up to the
+        whole list in _traverse_events events, however long the list is.
+        :param _threshold: Pixels per event that still count as a slow, precise drag
+        :param _saturation: Pixels per event at which the drag is at full speed
+        :param _velocity_threshold: Pixels per second that still count as a slow drag
+        :param _velocity_saturation: Pixels per second at which the drag is at full speed
+        :param _traverse_events: Events it takes to cross the whole list at full speed
+        :param _exponent: Shape of the curve between slow and full speed, higher stays precise
+        for longer
+        """
+        self.threshold = _threshold
+        self.saturation = _saturation
+        self.velocity_threshold = _velocity_threshold
+        self.velocity_saturation = _velocity_saturation
+        self.traverse_events = _traverse_events
+        self.exponent = _exponent
+
+    def speed(self, _distance, _velocity=None):
+        """
+        :param _distance: Pixels moved in one event
+        :param _velocity: Pixels per second, if known
+        :return: How fast the drag is, from 0 (slow) to 1 (full speed)
+        """
+        speed = (_distance - self.threshold) / float(self.saturation - self.threshold)
+        if _velocity is not None:
+            speed = max(speed, (_velocity - self.velocity_threshold) /
+                        (self.velocity_saturation - self.velocity_threshold))
+        return min(max(speed, 0.0), 1.0)
+
+    def steps(self, _distance, _length, _velocity=None):
+        """
+        :param _length: The number of values of the control being scrubbed
+        :return: The number of values (possibly fractional) one event moves
+        """
+        full_speed_steps = max(1.0, _length / float(self.traverse_events))
+        return 1.0 + (full_speed_steps - 1.0) * self.speed(_distance, _velocity) ** self.exponent
+
+
+class ControlModel(object):
+    def __init__(self, _values, _default_value):
+        """
+        The state of one scrubber or clicker, without any wx: its values and a cursor into them.
+        :param _values: Anything as_sequence accepts
+        :param _default_value: The value shown first, the cursor starts on it if it is in _values
+        """
+        self.values = as_sequence(_values)
+        self.index = ControlModel.index_of(self.values, _default_value)
+        self.value = _default_value
+
+        # When it was last scrubbed, to work out how fast the pointer is moving
+        self.last_time = None
+
+        # Built the first time something is typed, kept until the values are replaced
+        self.seek_index = None
+        # The LabelFormatter the values are shown with, seeking matches the shown text
+        self.formatter = None
+
+        # How many values a StreamSequence had dropped and held when the cursor was last put
+        self.stream_position = None
+        self._watch_stream()
+
+    @staticmethod
+    def index_of(_values, _value):
+        """
+        Finds the starting cursor of a control. Only done once when the control is made, after
+        that the cursor is carried along with the value.
+        """
+        try:
+            return _values.index(_value)
+        except ValueError:
+            return 0
+
+    def set_values(self, _values):
+        """
+        Replaces the values and moves the cursor to the first one.
+        """
+        self.values = as_sequence(_values)
+        self.index = 0
+        self.value = self.values[0]
+        self.seek_index = None
+        self._watch_stream()
+
+    def _watch_stream(self):
+        if isinstance(self.values, StreamSequence):
+            self.stream_position = (self.values.dropped, len(self.values))
+        else:
+            self.stream_position = None
+
+    def values_appended(self):
+        """
+        Keeps the cursor on the value it was on after values were appended to the StreamSequence
+        it is in. A cursor on the newest value follows the new values instead, and one whose
+        value was pushed out of the stream moves to the oldest value left.
+        :return: True if the value changed
+        """
+        values = self.values
+        dropped, length = self.stream_position
+        self.stream_position = (values.dropped, len(values))
+        self.seek_index = None
+
+        if self.index == length - 1:
+            index = len(values) - 1
+        else:
+            index = max(0, self.index - (values.dropped - dropped))
+        self.index = index
+
+        value = values[index]
+        if value is self.value:
+            return False
+        self.value = value
+        return True
+
+    def seek(self, _text):
+        """
+        Moves the cursor to the value nearest to what was typed.
+        :return: True if the cursor moved
+        """
+        if self.seek_index is None:
+            self.seek_index = SeekIndex(self.values, self.formatter)
+        index = self.seek_index.seek(_text)
+        if index is None:
+            return False
+        return self.move_to(index)
+
+    def move_to(self, _index):
+        """
+        Moves the cursor, stopping at the ends of the values.
+        :return: True if the cursor moved
+        """
+        _index = min(max(_index, 0), len(self.values) - 1)
+        if _index == self.index:
+            return False
+
+        self.index = _index
+        self.value = self.values[_index]
+        return True
+
+
+_MISSING = object()
+
+
+def _same_value(_a, _b):
+    """
+    Whether a derived value is unchanged. Arrays and Series don't compare to a single bool, so
+    anything that can't be compared counts as changed.
+    """
+    if _a is _b:
+        return True
+    if type(_a) is not type(_b):
+        return False
+    try:
+        return bool(_a == _b)
+    except Exception:
+        return False
+
+
+class DerivedNode(object):
+    # Results remembered per node, emptied when it holds more
+    MAX_MEMO = 256
+    # Shown instead of the value while the function raises for the current inputs
+    PLACEHOLDER = '?'
+
+    def __init__(self, _func, _inputs, _order):
+        """
+        A value computed from other controls or derived values, shown by a derived token.
+        :param _func: Called with the values of _inputs, in order
+        :param _inputs: Keys of the controls and derived nodes it depends on
+        :param _order: When it was added, since inputs are added first it sorts dependencies
+        before the nodes that use them
+        """
+        self.func = _func
+        self.inputs = _inputs
+        self.order = _order
+        self.value = None
+        self.memo = {}
+        # What the function raised for the current inputs, None if it worked
+        self.error = None
+
+    def evaluate(self, _args):
+        """
+        Computes the value for the input values _args, or remembers it from the last time the
+        inputs were the same. If the function raises, for instance because a value that isn't a
+        number was dropped on an input, the value is PLACEHOLDER and the exception is kept in
+        error, a scrub or drop never fails because of it.
+        :return: True if the value changed
+        """
+        try:
+            try:
+                value = self.memo.get(_args, _MISSING)
+            except TypeError:
+                # Inputs that can't be hashed are never remembered
+                value = self.func(*_args)
+            else:
+                if value is _MISSING:
+                    value = self.func(*_args)
+                    if len(self.memo) >= self.MAX_MEMO:
+                        self.memo.clear()
+                    self.memo[_args] = value
+        except Exception as error:
+            self.error = error
+            value = self.PLACEHOLDER
+        else:
+            self.error = None
+
+        if _same_value(value, self.value):
+            return False
+        self.value = value
+        return True
+
+
+class SentenceModel(object):
+    def __init__(self, _change_rate=1.0, _acceleration=None, _store=None):
+        """
+        Everything a sentence knows about scrubbing and clicking, kept apart from the widgets so
+        it can be tested and benchmarked without a GUI. The sentence classes are views that feed
+        it input and show what it says.
+        :param _change_rate: How much of a step each scrub event is worth, 1 moves every event
+        :param _acceleration: The AccelerationCurve for fast drags, a default one if None
+        :param _store: The ValueStore the values of the controls are shared through, the one
+        shared by every sentence if None
+        """
+        self.change_rate = _change_rate
+        # Set to None to always move by change_rate no matter how fast the drag
+        self.acceleration = _acceleration if _acceleration is not None else AccelerationCurve()
+
+        # Scrubbing builds up here until it is worth a whole step, shared by every control. It is
+        # signed, positive while scrubbing up.
+        self.change_value = 0
+
+        self.store = _store if _store is not None else value_store
+        self.controls = {}
+
+        # Derived values by key, and the keys of the derived nodes using each control or node
+        self.derived = {}
+        self.dependents = {}
+        self.derived_added = 0
+
+        # The ScrubHistory changes are recorded in, set with set_history
+        self.history = None
+
+    def set_history(self, _history):
+        """
+        Records every change of a control's value from now on into _history, a ScrubHistory, so
+        it can be undone. None stops recording.
+        """
+        self.history = _history
+
+    def _record(self, _key, _from_index, _to_index, _merge=False):
+        if self.history is not None and _from_index != _to_index:
+            self.history.record(_key, _from_index, _to_index, _merge)
+
+    def add_control(self, _key, _values, _default_value):
+        """
+        :param _key: Any hashable name for the control, the sentences use the wx id
+        :return: The new ControlModel
+        """
+        control = ControlModel(self.store.acquire(as_sequence(_values)), _default_value)
+        self.controls[_key] = control
+        return control
+
+    def remove_control(self, _key):
+        """
+        Removes a control or derived node. Nothing may still depend on it.
+        """
+        if self.dependents.get(_key):
+            raise ValueError('%r can not be removed while %d derived values depend on it' %
+                             (_key, len(self.dependents[_key])))
+        self.dependents.pop(_key, None)
+
+        node = self.derived.pop(_key, None)
+        if node is None:
+            self.store.release(self.controls.pop(_key).values)
+            if self.history is not None:
+                self.history.forget(_key)
+            return
+        for key in node.inputs:
+            self.dependents[key].remove(_key)
+
+    def clear(self):
+        for control in self.controls.values():
+            self.store.release(control.values)
+        self.controls = {}
+        self.derived = {}
+        self.dependents = {}
+        if self.history is not None:
+            self.history.clear()
+
+    def add_derived(self, _key, _func, _inputs):
+        """
+        Adds a value that is a function of other controls or derived values, kept up to date by
+        propagate.
+        :param _func: Called with the values of _inputs, in order
+        :param _inputs: Keys of existing controls or derived nodes
+        :return: The new DerivedNode, already evaluated
+        """
+        inputs = list(_inputs)
+        for key in inputs:
+            if key not in self.controls and key not in self.derived:
+                raise KeyError('Derived value depends on unknown key %r' % (key,))
+
+        self.derived_added += 1
+        node = DerivedNode(_func, inputs, self.derived_added)
+        self.derived[_key] = node
+        for key in inputs:
+            self.dependents.setdefault(key, []).append(_key)
+        node.evaluate(self._input_values(node))
+        return node
+
+    def value_of(self, _key):
+        """
+        :return: The current value of a control or derived node
+        """
+        control = self.controls.get(_key)
+        if control is not None:
+            return control.value
+        return self.derived[_key].value
+
+    def _input_values(self, _node):
+        return tuple(self.value_of(key) for key in _node.inputs)
+
+    def propagate(self, _key):
+        """
+        Brings the derived values downstream of a changed control up to date. Only the nodes
+        that depend on it are looked at, each once and after its inputs, and a node whose inputs
+        all kept their values is not evaluated at all.
+        :return: The keys of the derived nodes whose value changed, in dependency order
+        """
+        if _key not in self.dependents:
+            return ()
+
+        affected = set()
+        stack = [_key]
+        while stack:
+            for key in self.dependents.get(stack.pop(), ()):
+                if key not in affected:
+                    affected.add(key)
+                    stack.append(key)
+
+        changed_keys = set([_key])
+        changed = []
+        for key in sorted(affected, key=lambda k: self.derived[k].order):
+            node = self.derived[key]
+            if any(key_in in changed_keys for key_in in node.inputs) and \
+                    node.evaluate(self._input_values(node)):
+                changed_keys.add(key)
+                changed.append(key)
+        return changed
+
+    def set_values(self, _key, _values):
+        """
+        Replaces the values of a control, its cursor goes back to the first value.
+        """
+        control = self.controls[_key]
+        values = self.store.acquire(as_sequence(_values))
+        self.store.release(control.values)
+        control.set_values(values)
+        if self.history is not None:
+            self.history.forget(_key)
+
+    def values_appended(self, _key):
+        """
+        Called after values were appended to the StreamSequence a control has as its values.
+        :return: True if the value of the control changed
+        """
+        control = self.controls[_key]
+        dropped = control.stream_position[0]
+        changed = control.values_appended()
+        if self.history is not None and control.stream_position[0] != dropped:
+            # The indexes the history has for it point at other values now
+            self.history.forget(_key)
+        return changed
+
+    def click(self, _key):
+        """
+        Moves a clicked control to its previous value.
+        :return: True, a click always changes the value
+        """
+        control = self.controls[_key]
+
+        # Always goes down through the list, so it will cycle back from the end
+        to_index = control.index - 1
+        if to_index < 0:
+            to_index = len(control.values) - 1
+        self._record(_key, control.index, to_index)
+        control.index = to_index
+        control.value = control.values[to_index]
+        return True
+
+    def seek(self, _key, _text):
+        """
+        Jumps a control to the value nearest to _text: the closest number for numeric values,
+        otherwise the first value starting with _text.
+        :return: True if the value of the control changed
+        """
+        control = self.controls[_key]
+        if control.seek_index is None:
+            # Shared by every control with the same values
+            control.seek_index = self.store.seek_index(control.values, control.formatter)
+        index = control.index
+        # Each key typed seeks again, the whole search is one change
+        if control.seek(_text):
+            self._record(_key, index, control.index, True)
+            return True
+        return False
+
+    def scrub(self, _key, _delta, _cmd_down, _time=None, _count=1):
+        """
+        Moves a scrubbed control through its values. Each event is worth change_rate of a step,
+        more when the drag is fast enough for the acceleration curve, and the whole steps that
+        build up are applied in one jump that stops at the ends of the values.
+        :param _delta: Pixels the pointer moved, the sign is the direction
+        :param _cmd_down: Fine mode, each event is worth a tenth of a step and never accelerates
+        :param _time: When the motion happened in seconds, used for the pointer velocity
+        :param _count: How many motion events were coalesced into _delta
+        :return: True if the value of the control changed
+        """
+        control = self.controls[_key]
+        if _delta == 0:
+            return False
+
+        # If cmd is down, slow the change rate to 1/10 of the current value
+        if _cmd_down:
+            steps = self.change_rate/10.0 * _count
+        else:
+            steps = self.change_rate * _count
+            if self.acceleration is not None:
+                velocity = None
+                if _time is not None and control.last_time is not None and \
+                        _time > control.last_time:
+                    velocity = abs(_delta) / (_time - control.last_time)
+                steps *= self.acceleration.steps(abs(_delta) / float(_count),
+                                                 len(control.values), velocity)
+        control.last_time = _time
+
+        # Turning around throws away what had built up going the other way
+        if _delta > 0:
+            if self.change_value < 0:
+                self.change_value = 0
+            self.change_value += steps
+        else:
+            if self.change_value > 0:
+                self.change_value = 0
+            self.change_value -= steps
+
+        # Only whole steps move the control, the rest carries over to the next event
+        whole = int(self.change_value)
+        if whole == 0:
+            return False
+
+        self.change_value -= whole
+        index = control.index
+        if control.move_to(index + whole):
+            self._record(_key, index, control.index, True)
+            return True
+        return False
+
+    def _step_history(self, _step):
+        if self.history is None:
+            return None
+        step = _step()
+        if step is None:
+            return None
+
+        key, index = step
+        self.change_value = 0
+        self.controls[key].move_to(index)
+        return key
+
+    def undo(self):
+        """
+        Moves the control that changed last back to where it was.
+        :return: The key of the control, or None if there was nothing to undo
+        """
+        return self._step_history(lambda: self.history.undo())
+
+    def redo(self):
+        """
+        Moves the control of the last undo forward again.
+        :return: The key of the control, or None if there was nothing to redo
+        """
+        return self._step_history(lambda: self.history.redo())
+
+    def snapshot(self, _keys, _with_values=True):
+        """
+        :param _keys: The keys of the controls, in the order they will be restored in
+        :param _with_values: Include the values of the controls, otherwise they are kept as they
+        are when restoring
+        :return: A SentenceSnapshot of where the controls are
+        """
+        controls = [self.controls[key] for key in _keys]
+        return SentenceSnapshot(self.change_value, [control.index for control in controls],
+                                [control.values for control in controls] if _with_values
+                                else None)
+
+    def restore(self, _snapshot, _keys):
+        """
+        Moves the controls to where a snapshot has them, giving them its values first if it has
+        them. Nothing is recorded in the history, which is cleared.
+        :param _keys: The keys of the controls in the order of the snapshot
+        :return: The keys of the controls whose value or values changed
+        """
+        if len(_keys) != len(_snapshot.indexes):
+            raise ValueError('Snapshot of %d controls can not be restored into %d' %
+                             (len(_snapshot.indexes), len(_keys)))
+
+        history = self.history
+        self.history = None
+        changed = []
+        try:
+            for key, index, values in zip(_keys, _snapshot.indexes, _snapshot.values):
+                control = self.controls[key]
+                replaced = values is not None and values is not control.values
+                if replaced:
+                    self.set_values(key, values)
+                if control.move_to(index) or replaced:
+                    changed.append(key)
+        finally:
+            self.history = history
+        if history is not None:
+            history.clear()
+
+        self.change_value = _snapshot.change_value
+        return changed
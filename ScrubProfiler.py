@@ -0,0 +1,152 @@
+import collections
+import timeit
+
+import wx
+
+
+timer = timeit.default_timer
+
+
+class LatencyHistogram(object):
+    # Bucket i counts samples under 2**i microseconds, the last bucket takes everything longer
+    BUCKETS = 24
+
+    def __init__(self, _window=1000):
+        """
+        A histogram of the last _window latencies, updated as samples come and go so reading it
+        never has to go over the samples.
+        :param _window: How many of the most recent samples are kept
+        """
+        self.samples = collections.deque(maxlen=_window)
+        self.buckets = [0] * LatencyHistogram.BUCKETS
+        self.total = 0.0
+
+    @staticmethod
+    def _bucket(_seconds):
+        usec = int(_seconds * 1e6)
+        return min(usec.bit_length(), LatencyHistogram.BUCKETS - 1)
+
+    def add(self, _seconds):
+        if len(self.samples) == self.samples.maxlen:
+            oldest = self.samples[0]
+            self.buckets[self._bucket(oldest)] -= 1
+            self.total -= oldest
+
+        self.samples.append(_seconds)
+        self.buckets[self._bucket(_seconds)] += 1
+        self.total += _seconds
+
+    def count(self):
+        return len(self.samples)
+
+    def mean(self):
+        if not self.samples:
+            return 0.0
+        return self.total / len(self.samples)
+
+    def percentile(self, _fraction):
+        """
+        :return: The upper bound in seconds of the bucket holding the _fraction percentile
+        """
+        target = _fraction * len(self.samples)
+        seen = 0
+        for i, count in enumerate(self.buckets):
+            seen += count
+            if count and seen >= target:
+                return (2 ** i) / 1e6
+        return 0.0
+
+    def stats(self):
+        return {'count': self.count(),
+                'mean': self.mean(),
+                'p50': self.percentile(0.5),
+                'p90': self.percentile(0.9),
+                'p99': self.percentile(0.99),
+                'max': max(self.samples) if self.samples else 0.0}
+
+
+class ScrubProfiler(object):
+    # The stages of a scrub, 'dispatch' is the whole ProcessEvent so it contains 'set_label'
+    # and 'layout'. 'paint' is the time from a new label being set until it gets painted.
+    STAGES = ('motion', 'dispatch', 'set_label', 'layout', 'paint')
+
+    def __init__(self, _window=1000):
+        """
+        Collects how long each stage of a scrub takes, per control. Nothing is timed until it
+        is handed to DynamicSentence.set_profiler (or DrawnSentence.set_profiler).
+        :param _window: How many recent samples each histogram keeps
+        """
+        self.window = _window
+        self.histograms = {}
+
+    def record(self, _control_id, _stage, _seconds):
+        key = (_control_id, _stage)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = LatencyHistogram(self.window)
+        histogram.add(_seconds)
+
+    def histogram(self, _control_id, _stage):
+        """
+        :return: The LatencyHistogram of one stage of one control, or None if never recorded
+        """
+        return self.histograms.get((_control_id, _stage))
+
+    def controls(self):
+        return sorted(set(key[0] for key in self.histograms))
+
+    def stats(self, _control_id):
+        """
+        :return: A dict of stage to its stats dict (count, mean, p50, p90, p99 and max, in
+        seconds) for every stage recorded for the control
+        """
+        return dict((stage, self.histograms[(_control_id, stage)].stats())
+                    for stage in ScrubProfiler.STAGES
+                    if (_control_id, stage) in self.histograms)
+
+    def reset(self):
+        self.histograms = {}
+
+    def report(self):
+        """
+        :return: The stats of every control as lines of text, in microseconds
+        """
+        lines = []
+        for control_id in self.controls():
+            lines.append('control %s' % control_id)
+            stats = self.stats(control_id)
+            for stage in ScrubProfiler.STAGES:
+                if stage in stats:
+                    stage_stats = stats[stage]
+                    lines.append('  %-9s n=%-5d mean %8.1f  p50 <%7.0f  p99 <%7.0f  max %8.1f' % (
+                        stage, stage_stats['count'], stage_stats['mean'] * 1e6,
+                        stage_stats['p50'] * 1e6, stage_stats['p99'] * 1e6,
+                        stage_stats['max'] * 1e6))
+        return lines
+
+
+class ProfilerOverlay(wx.Frame):
+    def __init__(self, _parent, _profiler, _interval=500):
+        """
+        A small always on top window that shows a profiler's report, refreshed every _interval
+        milliseconds.
+        """
+        wx.Frame.__init__(self, _parent, wx.ID_ANY, 'Scrub profile',
+                          style=wx.CAPTION | wx.CLOSE_BOX | wx.STAY_ON_TOP |
+                          wx.FRAME_TOOL_WINDOW | wx.RESIZE_BORDER)
+        self.profiler = _profiler
+
+        self.text = wx.StaticText(self, wx.ID_ANY, '')
+        self.text.SetFont(wx.Font(8, wx.FONTFAMILY_MODERN, wx.FONTSTYLE_NORMAL,
+                                  wx.FONTWEIGHT_NORMAL))
+        sizer = wx.BoxSizer(wx.VERTICAL)
+        sizer.Add(self.text, 1, wx.EXPAND | wx.ALL, 4)
+        self.SetSizer(sizer)
+
+        self.timer = wx.Timer(self)
+        self.Bind(wx.EVT_TIMER, self._on_timer, self.timer)
+        self.timer.Start(_interval)
+
+    def _on_timer(self, event):
+        self.text.SetLabel('\n'.join(self.profiler.report()) or 'Nothing scrubbed yet')
+        self.Fit()
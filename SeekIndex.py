@@ -0,0 +1,267 @@
+import bisect
+import math
+import numbers
+import operator
+import re
+from itertools import islice
+
+try:
+    from itertools import imap
+except ImportError:
+    imap = map
+
+from ValueSequence import ValueRange, AffixRange
+
+
+def _parse_number(_text):
+    try:
+        return float(_text)
+    except ValueError:
+        return None
+
+
+def _is_number(_value):
+    return isinstance(_value, numbers.Number) and not isinstance(_value, bool)
+
+
+# A number as a format shows it, such as '$25,000.00' or '12.5%'
+_SHOWN_NUMBER = re.compile(r'^(\D*?)(-?[\d,]*\.?\d+(?:[eE][-+]?\d+)?)(\D*)$')
+
+
+class NumberText(object):
+    def __init__(self, _prefix='', _suffix='', _scale=1.0):
+        """
+        Reads a number back out of typed text the way its values are shown: the prefix and
+        suffix are optional, thousands separators are ignored, and _scale undoes formats such as
+        '.1%' that show 0.25 as 25.0%.
+        """
+        self.prefix = _prefix
+        self.suffix = _suffix
+        self.scale = _scale
+
+    @classmethod
+    def shown_by(cls, _formatter, _sample):
+        """
+        Works out how _formatter shows numbers from how it shows _sample.
+        """
+        match = _SHOWN_NUMBER.match(_formatter(abs(_sample)).strip())
+        if match is None:
+            return cls()
+
+        prefix, digits, suffix = match.groups()
+        number = _parse_number(digits.replace(',', ''))
+        scale = 1.0
+        if number and _sample:
+            # Formats round, only a power of ten is a scale
+            scale = 10.0 ** round(math.log10(number / abs(_sample)))
+        return cls(prefix, suffix, scale)
+
+    def parse(self, _text):
+        """
+        :return: The number in _text, or None if there isn't one
+        """
+        text = _text.strip()
+        sign = 1
+        if text.startswith('-'):
+            sign = -1
+            text = text[1:].lstrip()
+        if self.prefix and text.startswith(self.prefix):
+            text = text[len(self.prefix):]
+        if self.suffix and text.endswith(self.suffix):
+            text = text[:-len(self.suffix)]
+
+        number = _parse_number(text.replace(',', '').replace(' ', ''))
+        if number is None:
+            return None
+        return sign * number / self.scale
+
+
+class RangeSeek(object):
+    def __init__(self, _range, _number_text=None):
+        """
+        Seeks in a ValueRange (or the range under an AffixRange) with arithmetic, nothing is
+        built no matter how long the range is.
+        :param _number_text: The NumberText typed numbers are read with
+        """
+        self.range = _range
+        self.number_text = _number_text or NumberText()
+
+    def seek(self, _text):
+        number = self.number_text.parse(_text)
+        if number is None or len(self.range) == 0:
+            return None
+
+        index = int(round((number - self.range.start) / float(self.range.step)))
+        return min(max(index, 0), len(self.range) - 1)
+
+
+class SortedSeek(object):
+    def __init__(self, _values, _number_text=None):
+        """
+        Seeks the nearest number with bisect. A sequence that is already sorted is searched in
+        place, anything else gets a sorted copy of its (value, index) pairs.
+        :param _number_text: The NumberText typed numbers are read with
+        """
+        self.values = _values
+        self.number_text = _number_text or NumberText()
+        self.keys = None
+        self.indexes = None
+        self.descending = False
+
+        if not self._sorted(_values):
+            pairs = sorted((value, index) for index, value in enumerate(_values))
+            self.keys = [pair[0] for pair in pairs]
+            self.indexes = [pair[1] for pair in pairs]
+
+    def _sorted(self, _values):
+        """
+        Checks whether _values is ascending, or descending in which case it is searched as is
+        through a reversed view.
+        """
+        if all(imap(operator.le, _values, islice(_values, 1, None))):
+            return True
+
+        if all(imap(operator.ge, _values, islice(_values, 1, None))):
+            self.descending = True
+            return True
+        return False
+
+    def _key(self, _position):
+        if self.keys is not None:
+            return self.keys[_position]
+        if self.descending:
+            return self.values[len(self.values) - 1 - _position]
+        return self.values[_position]
+
+    def _index(self, _position):
+        if self.indexes is not None:
+            return self.indexes[_position]
+        if self.descending:
+            return len(self.values) - 1 - _position
+        return _position
+
+    def seek(self, _text):
+        number = self.number_text.parse(_text)
+        if number is None or len(self.values) == 0:
+            return None
+
+        keys = _SortedKeys(self)
+        position = bisect.bisect_left(keys, number)
+
+        # Pick whichever neighbour of the insertion point is closer
+        if position == len(self.values):
+            position -= 1
+        elif position > 0 and number - keys[position - 1] <= keys[position] - number:
+            position -= 1
+        return self._index(position)
+
+
+class _SortedKeys(object):
+    """
+    The keys of a SortedSeek in ascending order, as a sequence bisect can search.
+    """
+    def __init__(self, _seek):
+        self.seek = _seek
+
+    def __len__(self):
+        return len(self.seek.values)
+
+    def __getitem__(self, _position):
+        return self.seek._key(_position)
+
+
+class PrefixSeek(object):
+    def __init__(self, _values, _label=str):
+        """
+        Seeks strings by prefix, case insensitive, through a sorted list of the labels.
+        :param _label: Turns a value into the text shown for it
+        """
+        pairs = sorted((_label(value).lower(), index) for index, value in enumerate(_values))
+        self.keys = [pair[0] for pair in pairs]
+        self.indexes = [pair[1] for pair in pairs]
+
+    def seek(self, _text):
+        """
+        :return: The first value (alphabetically) starting with _text, or if none does the
+        value that comes right after _text alphabetically
+        """
+        if not self.keys:
+            return None
+
+        text = _text.lower()
+        position = bisect.bisect_left(self.keys, text)
+        if position == len(self.keys):
+            position -= 1
+        return self.indexes[position]
+
+
+class SeekIndex(object):
+    # Sequences that are not lists only get a prefix index up to this long, building one means
+    # producing, formatting and sorting every value
+    MAX_VIRTUAL_PREFIX = 100000
+
+    def __init__(self, _values, _formatter=None):
+        """
+        Type to seek for a value sequence. The right kind of index is picked and built the first
+        time it is needed, then kept until the values are replaced.
+        :param _formatter: What the values are shown with, text is matched against it
+        """
+        self.values = _values
+        self.formatter = _formatter
+        self.numeric = None
+        self.prefix = None
+
+    def _number_text(self):
+        """
+        :return: How the numbers are shown, worked out from the formatter
+        """
+        if self.formatter is None:
+            return NumberText()
+        # Zero shows no scale, the other end may not be zero
+        sample = self.values[0] or self.values[len(self.values) - 1]
+        return NumberText.shown_by(self.formatter, sample)
+
+    def _numeric(self):
+        if self.numeric is None:
+            values = self.values
+            if isinstance(values, AffixRange):
+                self.numeric = RangeSeek(values.range, NumberText(values.prefix, values.suffix))
+            elif len(values) == 0 or not _is_number(values[0]):
+                self.numeric = False
+            elif isinstance(values, ValueRange):
+                self.numeric = RangeSeek(values, self._number_text())
+            else:
+                try:
+                    self.numeric = SortedSeek(values, self._number_text())
+                except TypeError:
+                    # Numbers mixed with values they can't be compared with, such as strings
+                    self.numeric = False
+        return self.numeric
+
+    def _prefix(self):
+        if self.prefix is None:
+            values = self.values
+            if isinstance(values, (ValueRange, AffixRange)) or \
+                    (not isinstance(values, (list, tuple)) and
+                     len(values) > self.MAX_VIRTUAL_PREFIX):
+                self.prefix = False
+            else:
+                self.prefix = PrefixSeek(values, self.formatter or str)
+        return self.prefix
+
+    def seek(self, _text):
+        """
+        :param _text: What has been typed
+        :return: The index of the nearest match, or None if nothing can match. Ranges only
+        match numbers, and long virtual sequences only numbers if their values are numbers.
+        """
+        numeric = self._numeric()
+        if numeric:
+            index = numeric.seek(_text)
+            if index is not None or isinstance(numeric, RangeSeek):
+                return index
+
+        prefix = self._prefix()
+        if not prefix:
+            return None
+        return prefix.seek(_text)
@@ -0,0 +1,343 @@
+import wx
+
+from DynamicText import DynamicSentence
+from SentenceTemplate import SentenceTemplate
+
+
+class SentenceRow(object):
+    __slots__ = ('template', 'indexes', 'values_by_name')
+
+    def __init__(self, _template, defaults=None):
+        """
+        One row of a SentenceList, without any wx: the shared compiled template it is made from
+        and where each of its controls is. Only the controls moved away from their default, and
+        the values of controls that had data dropped on them, are stored, so a row that was
+        never scrubbed is three references.
+        :param _template: A SentenceTemplate, or the text of one
+        :param defaults: Optional dict of placeholder name to the value shown
+        """
+        if not isinstance(_template, SentenceTemplate):
+            _template = SentenceTemplate.compile(_template)
+        self.template = _template
+        self.indexes = None
+        # Values that replaced the template's, by placeholder name
+        self.values_by_name = None
+
+        for name, value in (defaults or {}).items():
+            self.set_index(name, _template.tokens[name].values.index(value))
+
+    def index(self, _name):
+        """
+        :return: The position of the control _name in its values
+        """
+        if self.indexes and _name in self.indexes:
+            return self.indexes[_name]
+        return self.template.tokens[_name].default_index
+
+    def set_index(self, _name, _index):
+        if _index == self.template.tokens[_name].default_index:
+            if self.indexes:
+                self.indexes.pop(_name, None)
+        else:
+            if self.indexes is None:
+                self.indexes = {}
+            self.indexes[_name] = _index
+
+    def values_of(self, _name):
+        """
+        :return: The values of the control _name, the template's unless others were dropped on it
+        """
+        if self.values_by_name and _name in self.values_by_name:
+            return self.values_by_name[_name]
+        return self.template.tokens[_name].values
+
+    def set_values(self, _name, _values):
+        """
+        Replaces the values of the control _name, as dropping data on it does. Where it is in
+        the new values is set separately.
+        """
+        if _values is self.template.tokens[_name].values:
+            if self.values_by_name:
+                self.values_by_name.pop(_name, None)
+        else:
+            if self.values_by_name is None:
+                self.values_by_name = {}
+            self.values_by_name[_name] = _values
+
+    def value(self, _name):
+        return self.values_of(_name)[self.index(_name)]
+
+    def values(self):
+        """
+        :return: A dict of placeholder name to the value shown
+        """
+        return dict((name, self.value(name)) for name in self.template.names)
+
+
+class _RowView(object):
+    def __init__(self, _frame, _parent):
+        """
+        The windows of one visible row: a panel holding a DynamicSentence, handed from row to
+        row as the list scrolls.
+        """
+        self.panel = wx.Panel(_parent)
+        self.sentence = DynamicSentence(_frame, self.panel, pool=True)
+        self.template = None
+        # The controls made by the template, by placeholder name
+        self.controls = {}
+        # The values of the row each control was given, and the sequence the model holds for
+        # them, by placeholder name. A control holding anything else had data dropped on it.
+        self.given_values = {}
+        self.held_values = {}
+        # The index of the row shown, None while the view is free
+        self.row = None
+
+    def bind(self, _row):
+        """
+        Shows _row. A view last used for the same template only has its controls moved, and
+        given the row's values if they differ from the ones it holds. Any other template is
+        built again out of the pooled windows.
+        """
+        sentence = self.sentence
+        with sentence.batch():
+            if _row.template is not self.template:
+                sentence.clear()
+                self.template = _row.template
+                self.controls = _row.template.build(sentence)
+                self.given_values = {}
+                self.held_values = {}
+                for name, label in self.controls.items():
+                    self.given_values[name] = _row.template.tokens[name].values
+                    self.held_values[name] = sentence.model.controls[label.GetId()].values
+
+            controls = sentence.model.controls
+            for name, label in self.controls.items():
+                key = label.GetId()
+                values = _row.values_of(name)
+                if values is not self.given_values[name]:
+                    sentence.new_scrub_vals(key, values)
+                    self.given_values[name] = values
+                    self.held_values[name] = controls[key].values
+                if controls[key].move_to(_row.index(name)):
+                    sentence._update(label, key)
+
+    def store(self, _row):
+        """
+        Copies where the controls were scrubbed to, and any values dropped on them, back into
+        _row.
+        """
+        for name, label in self.controls.items():
+            control = self.sentence.model.controls[label.GetId()]
+            if control.values is not self.held_values[name]:
+                _row.set_values(name, control.values)
+                self.given_values[name] = self.held_values[name] = control.values
+            _row.set_index(name, control.index)
+
+
+class SentenceList(wx.Panel):
+    def __init__(self, _frame, _parent, row_height=None, style=0, **kwargs):
+        """
+        A scrolling list of sentences, one per row, for thousands of rows. Every row is a
+        lightweight SentenceRow, only the rows in view have windows. Those windows are recycled
+        as the list scrolls, so memory and the time to build the list grow with the height of
+        the list and not with the number of rows.
+
+        Where a row's controls were scrubbed to is kept in its SentenceRow: it is copied back
+        when the row scrolls out of view, and by row_values.
+        :param _frame: The frame, given to the sentences
+        :param _parent: The parent window
+        :param row_height: Pixels per row, every row is as high. Twice the character height if
+        None.
+        """
+        wx.Panel.__init__(self, _parent, style=style | wx.VSCROLL, **kwargs)
+        self.frame = _frame
+        self.row_height = row_height or 2 * self.GetCharHeight()
+
+        self.rows = []
+        self.views = []
+        # The index of the first row in view
+        self.top = 0
+        # Wheel rotation that doesn't add up to a whole row yet
+        self.wheel_rotation = 0
+        self.refresh_pending = False
+
+        # Fonts given to the sentences, None leaves the list's font
+        self.static_font = None
+        self.dyn_font = None
+
+        self.Bind(wx.EVT_SIZE, self._on_size)
+        self.Bind(wx.EVT_SCROLLWIN, self._on_scroll)
+        self.Bind(wx.EVT_MOUSEWHEEL, self._on_wheel)
+
+    def add_row(self, _template, defaults=None):
+        """
+        Adds a row at the end. Nothing is built until it scrolls into view, and adding many
+        rows in a row refreshes the list once.
+        :param _template: A SentenceTemplate, the text of one, or a SentenceRow
+        :param defaults: Optional dict of placeholder name to the value shown
+        :return: The SentenceRow
+        """
+        row = _template if isinstance(_template, SentenceRow) else SentenceRow(_template,
+                                                                              defaults)
+        self.rows.append(row)
+        self._schedule_refresh()
+        return row
+
+    def set_rows(self, _rows):
+        """
+        Replaces every row, the positions of the old rows are stored in them first.
+        :param _rows: SentenceRows
+        """
+        for view in self.views:
+            self._free(view)
+        self.rows = list(_rows)
+        self.top = 0
+        self._refresh()
+
+    def row_count(self):
+        return len(self.rows)
+
+    def row_values(self, _index):
+        """
+        :return: A dict of placeholder name to the value shown in row _index, including where it
+        is being scrubbed if it is in view
+        """
+        row = self.rows[_index]
+        for view in self.views:
+            if view.row == _index:
+                view.store(row)
+        return row.values()
+
+    def view_count(self):
+        """
+        :return: How many rows have windows, at most one more than fit in the list
+        """
+        return len(self.views)
+
+    def _page_rows(self):
+        return max(1, self.GetClientSize()[1] // self.row_height)
+
+    def scroll_to(self, _row):
+        """
+        Scrolls so that row _row is at the top, or as near as the number of rows allows.
+        """
+        top = min(max(_row, 0), max(0, len(self.rows) - self._page_rows()))
+        if top != self.top:
+            self.top = top
+            self._refresh()
+
+    def _on_size(self, event):
+        self._schedule_refresh()
+        event.Skip()
+
+    def _on_scroll(self, event):
+        kind = event.GetEventType()
+        if kind == wx.wxEVT_SCROLLWIN_LINEUP:
+            top = self.top - 1
+        elif kind == wx.wxEVT_SCROLLWIN_LINEDOWN:
+            top = self.top + 1
+        elif kind == wx.wxEVT_SCROLLWIN_PAGEUP:
+            top = self.top - self._page_rows()
+        elif kind == wx.wxEVT_SCROLLWIN_PAGEDOWN:
+            top = self.top + self._page_rows()
+        elif kind == wx.wxEVT_SCROLLWIN_TOP:
+            top = 0
+        elif kind == wx.wxEVT_SCROLLWIN_BOTTOM:
+            top = len(self.rows)
+        else:
+            # Dragging the thumb
+            top = event.GetPosition()
+        self.scroll_to(top)
+
+    def _on_wheel(self, event):
+        # Fine grained wheels and touchpads send less than a whole notch at a time
+        delta = event.GetWheelDelta() or 120
+        self.wheel_rotation -= event.GetWheelRotation()
+        notches = int(self.wheel_rotation / float(delta))
+        if notches:
+            self.wheel_rotation -= notches * delta
+            self.scroll_to(self.top + notches * event.GetLinesPerAction())
+
+    def _schedule_refresh(self):
+        if not self.refresh_pending:
+            self.refresh_pending = True
+            wx.CallAfter(self._refresh)
+
+    def _free(self, _view):
+        if _view.row is not None:
+            _view.store(self.rows[_view.row])
+            _view.row = None
+
+    def _take_view(self, _free, _template):
+        """
+        :return: A free view, preferably one already showing _template, or a new one if none are
+        free
+        """
+        for i, view in enumerate(_free):
+            if view.template is _template:
+                return _free.pop(i)
+        if _free:
+            return _free.pop()
+
+        view = _RowView(self.frame, self)
+        if self.static_font is not None:
+            view.sentence.set_static_font(self.static_font)
+        if self.dyn_font is not None:
+            view.sentence.set_dyn_font(self.dyn_font)
+        self.views.append(view)
+        return view
+
+    def _refresh(self):
+        """
+        Gives every row in view a view and puts it in place, taking the views of the rows that
+        went out of view.
+        """
+        self.refresh_pending = False
+        if not self:
+            # Destroyed while the refresh was waiting
+            return
+
+        width, height = self.GetClientSize()
+        page = max(1, height // self.row_height)
+        self.top = min(self.top, max(0, len(self.rows) - page))
+        first = self.top
+        # One more than fit, the last one is cut off at the bottom
+        last = min(len(self.rows), first + page + 1)
+        self.SetScrollbar(wx.VERTICAL, first, page, len(self.rows))
+
+        shown = {}
+        free = []
+        for view in self.views:
+            if view.row is not None and first <= view.row < last:
+                shown[view.row] = view
+            else:
+                self._free(view)
+                free.append(view)
+
+        self.Freeze()
+        try:
+            for index in range(first, last):
+                view = shown.get(index)
+                if view is None:
+                    row = self.rows[index]
+                    view = self._take_view(free, row.template)
+                    view.row = index
+                    view.bind(row)
+                    view.panel.Show()
+                view.panel.SetRect(wx.Rect(0, (index - first) * self.row_height, width,
+                                           self.row_height))
+
+            for view in free:
+                view.panel.Hide()
+        finally:
+            self.Thaw()
+
+    def set_static_font(self, _font):
+        self.static_font = _font
+        for view in self.views:
+            view.sentence.set_static_font(_font)
+
+    def set_dyn_font(self, _font):
+        self.dyn_font = _font
+        for view in self.views:
+            view.sentence.set_dyn_font(_font)
@@ -0,0 +1,256 @@
+import re
+
+from ValueSequence import ValueRange, AffixRange
+
+
+# {{ and }} are literal braces, anything else in braces is a placeholder
+_PLACEHOLDER = re.compile(r'\{\{|\}\}|\{([^{}]*)\}')
+# Keyword clauses at the end of a placeholder spec
+_FLAG_CLAUSE = re.compile(r'\s+(drop|reserve)$')
+_STEP_CLAUSE = re.compile(r'\s+step\s+(-?\d+(?:\.\d+)?)$')
+_DEFAULT_CLAUSE = re.compile(r'\s+default\s+')
+# One end of a range, such as '$25', '25%' or '-0.5'
+_RANGE_END = re.compile(r'^(\D*?)(-?\d+(?:\.(\d+))?)(\D*)$')
+_NAMED = re.compile(r'^(\w+)=(.*)$')
+
+
+class TemplateToken(object):
+    def __init__(self, _kind, _name, _values, _default, _can_drop=False, _reserve=False):
+        """
+        A compiled scrubber or clicker placeholder.
+        :param _kind: 'scrub' or 'click'
+        :param _name: The name used to give it a default and to look up its control
+        :param _values: The value sequence, shared by every sentence made from the template
+        :param _default: The value shown when no other default is given
+        """
+        self.kind = _kind
+        self.name = _name
+        self.values = _values
+        self.default = _default
+        self.can_drop = _can_drop
+        self.reserve = _reserve
+        # The default is always one of the values, checked when parsing
+        self.default_index = _values.index(_default)
+
+
+class SentenceTemplate(object):
+    """
+    A sentence written as text with placeholders, parsed once into a plan of add_text,
+    add_scrubber and add_clicker calls.
+
+        an extra {scrub:cost=$0..$50 step 1 default $25 drop} was charged to
+        {click:who=everyone|those who paid the charge}
+
+    A placeholder is {kind:name=values clauses}, kind is scrub or click and the name is optional.
+    Values are either a range 'start..stop' that includes stop, where both ends may have the
+    same prefix and suffix ('$0..$50', '0%..100%'), or options separated by '|'. The clauses
+    come after the values: 'step N' (ranges only), 'default V' (otherwise the first value),
+    'drop' to accept dropped data and 'reserve' to reserve the widest value's width. Options
+    may contain these words, only well formed clauses at the very end are read as clauses.
+    """
+    # Compiled templates by their text, emptied when it holds more than MAX_CACHED
+    MAX_CACHED = 5000
+    _cache = {}
+
+    def __init__(self, _text):
+        """
+        Parses _text. Use SentenceTemplate.compile to share the parsed plan.
+        :param _text: The template
+        """
+        self.text = _text
+        # The plan, strings are static text and TemplateTokens are controls
+        self.plan = []
+        self.names = []
+        self.tokens = {}
+        self._parse(_text)
+
+    @classmethod
+    def compile(cls, _text):
+        """
+        :return: The compiled template for _text, parsed only the first time it is seen.
+        """
+        template = cls._cache.get(_text)
+        if template is None:
+            if len(cls._cache) >= cls.MAX_CACHED:
+                cls._cache.clear()
+            template = cls(_text)
+            cls._cache[_text] = template
+        return template
+
+    def _parse(self, _text):
+        static = []
+        pos = 0
+        for match in _PLACEHOLDER.finditer(_text):
+            static.append(_text[pos:match.start()])
+            pos = match.end()
+
+            if match.group(1) is None:
+                # An escaped brace
+                static.append(match.group(0)[0])
+                continue
+
+            self._add_static(''.join(static))
+            static = []
+            token = self._parse_placeholder(match.group(1), len(self.names))
+            self.names.append(token.name)
+            self.tokens[token.name] = token
+            self.plan.append(token)
+
+        if '{' in _text[pos:] or '}' in _text[pos:]:
+            raise ValueError('Unbalanced brace in sentence template %r' % (_text,))
+        static.append(_text[pos:])
+        self._add_static(''.join(static))
+
+    def _add_static(self, _text):
+        # add_text needs at least one word
+        if _text.strip():
+            self.plan.append(_text)
+
+    def _parse_placeholder(self, _spec, _position):
+        kind, sep, body = _spec.partition(':')
+        kind = kind.strip()
+        if not sep or kind not in ('scrub', 'click'):
+            raise ValueError('Placeholder {%s} must start with scrub: or click:' % _spec)
+
+        body = body.strip()
+        named = _NAMED.match(body)
+        if named:
+            name, body = named.group(1), named.group(2)
+        else:
+            name = '%s%d' % (kind, _position)
+
+        values_spec, step, default, can_drop, reserve = self._split_clauses(body)
+        if '..' in values_spec:
+            values = self._parse_range(values_spec, step)
+        elif step is not None:
+            raise ValueError('Only ranges can have a step, in {%s}' % _spec)
+        else:
+            values = [value.strip() for value in values_spec.split('|')]
+
+        if len(values) == 0:
+            raise ValueError('Placeholder {%s} has no values' % _spec)
+        if default is None:
+            default = values[0]
+        elif default not in values:
+            raise ValueError('Default %r is not one of the values of {%s}' % (default, _spec))
+
+        return TemplateToken(kind, name, values, default, can_drop, reserve)
+
+    @staticmethod
+    def _split_clauses(_body):
+        """
+        Takes the keyword clauses off the end of a placeholder body, one at a time, until what
+        is left doesn't end with one.
+        :return: (values spec, step, default, can_drop, reserve)
+        """
+        values_spec = _body
+        step = None
+        default = None
+        can_drop = False
+        reserve = False
+        while True:
+            flag = _FLAG_CLAUSE.search(values_spec)
+            if flag is not None:
+                if flag.group(1) == 'drop':
+                    can_drop = True
+                else:
+                    reserve = True
+                values_spec = values_spec[:flag.start()]
+                continue
+
+            step_clause = _STEP_CLAUSE.search(values_spec)
+            if step_clause is not None and step is None:
+                step = step_clause.group(1)
+                values_spec = values_spec[:step_clause.start()]
+                continue
+
+            if default is None:
+                default_clause = SentenceTemplate._default_clause(values_spec)
+                if default_clause is not None:
+                    values_spec, default = default_clause
+                    continue
+            break
+        return values_spec.strip(), step, default, can_drop, reserve
+
+    @staticmethod
+    def _default_clause(_text):
+        """
+        Finds a 'default V' clause ending _text. V must be one of the options before it, or a
+        single word after a range, so 'default' inside an option is left alone.
+        :return: (the text before the clause, V), or None if _text doesn't end with one
+        """
+        for match in reversed(list(_DEFAULT_CLAUSE.finditer(_text))):
+            values_spec, value = _text[:match.start()], _text[match.end():].strip()
+            if '..' in values_spec and '|' not in values_spec:
+                found = bool(value) and len(value.split()) == 1
+            else:
+                found = value in [option.strip() for option in values_spec.split('|')]
+            if found:
+                return values_spec, value
+        return None
+
+    @staticmethod
+    def _parse_range(_values_spec, _step):
+        """
+        Makes the value sequence of a 'start..stop' range. Nothing is generated up front.
+        """
+        start_text, _, stop_text = _values_spec.partition('..')
+        start = _RANGE_END.match(start_text.strip())
+        stop = _RANGE_END.match(stop_text.strip())
+        if start is None or stop is None:
+            raise ValueError('Bad range %r in sentence template' % _values_spec)
+
+        prefix, suffix = start.group(1), start.group(4)
+        if (stop.group(1), stop.group(4)) != (prefix, suffix):
+            raise ValueError('Both ends of range %r need the same prefix and suffix' %
+                             _values_spec)
+
+        step_text = _step or '1'
+        decimals = max(len(start.group(3) or ''), len(stop.group(3) or ''),
+                       len(step_text.partition('.')[2]))
+        number = float if decimals else int
+        first, last, step = number(start.group(2)), number(stop.group(2)), number(step_text)
+        if step <= 0:
+            raise ValueError('Range step must be positive in %r' % _values_spec)
+        if last < first:
+            step = -step
+
+        # Half a step past the end so that stop itself is included
+        return AffixRange(ValueRange(first, last + step / 2.0, step), prefix, suffix, decimals)
+
+    def build(self, _sentence, defaults=None):
+        """
+        Adds the template to a sentence in a single batch.
+        :param _sentence: A DynamicSentence or DrawnSentence
+        :param defaults: Optional dict of name to the value shown, instead of the template's
+        :return: A dict of name to the control that was made for it
+        """
+        defaults = defaults or {}
+        controls = {}
+        with _sentence.batch():
+            for token in self.plan:
+                if not isinstance(token, TemplateToken):
+                    _sentence.add_text(token)
+                    continue
+
+                default = defaults.get(token.name, token.default)
+                if default not in token.values:
+                    raise ValueError('Default %r is not one of the values of %s' %
+                                     (default, token.name))
+                if token.kind == 'scrub':
+                    control = _sentence.add_scrubber(token.values, default,
+                                                     can_drop=token.can_drop,
+                                                     reserve_width=token.reserve)
+                else:
+                    control = _sentence.add_clicker(token.values, default,
+                                                    can_drop=token.can_drop)
+                controls[token.name] = control
+        return controls
+
+
+def build_sentence(_sentence, _template, defaults=None):
+    """
+    Compiles _template (or reuses its cached plan) and adds it to _sentence.
+    :return: A dict of placeholder name to control
+    """
+    return SentenceTemplate.compile(_template).build(_sentence, defaults)
@@ -0,0 +1,102 @@
+try:
+    import queue
+except ImportError:
+    import Queue as queue
+
+import wx
+
+from ScrubProfiler import timer
+from ValueSequence import StreamSequence
+
+
+class StreamFeed(object):
+    def __init__(self, _window, _callback, _capacity=10000, _max_rate=20):
+        """
+        Feeds a StreamSequence from any thread. Values are put on a thread safe queue and
+        appended on the main thread when it is idle, at most _max_rate times a second however
+        fast they arrive, and _callback is told after each batch.
+        :param _window: Any window, its idle events drain the queue
+        :param _callback: Called on the main thread with the number of values appended
+        :param _capacity: The most values the stream keeps, the oldest are pushed out
+        :param _max_rate: Most batches per second, None appends whenever the loop is idle
+        """
+        self.stream = StreamSequence(_capacity)
+        self.queue = queue.Queue()
+        self.window = _window
+        self.callback = _callback
+        self.min_interval = 1.0 / _max_rate if _max_rate else 0
+        self.last_drain = 0
+        self.closed = False
+
+        self.received = 0
+        self.batches = 0
+
+        # Drains what arrived too soon after the last batch, once enough time has passed
+        self.timer = wx.Timer(_window, wx.NewId())
+        _window.Bind(wx.EVT_TIMER, self._on_timer, self.timer)
+        _window.Bind(wx.EVT_IDLE, self._on_idle)
+
+    def put(self, _value):
+        """
+        Adds a value to the end of the stream. Safe to call from any thread.
+        """
+        self.extend([_value])
+
+    def extend(self, _values):
+        """
+        Adds values to the end of the stream in one go. Safe to call from any thread.
+        """
+        self.queue.put(list(_values))
+        # Idle events stop when nothing happens, this makes sure one comes
+        wx.WakeUpIdle()
+
+    def _on_idle(self, event):
+        event.Skip()
+        if self.closed or self.queue.empty() or self.timer.IsRunning():
+            return
+
+        wait = self.last_drain + self.min_interval - timer()
+        if wait > 0:
+            self.timer.Start(max(1, int(wait * 1000)), wx.TIMER_ONE_SHOT)
+        else:
+            self.drain()
+
+    def _on_timer(self, event):
+        if not self.closed:
+            self.drain()
+
+    def drain(self):
+        """
+        Appends everything waiting in the queue. Only call it on the main thread.
+        :return: How many values were appended
+        """
+        appended = 0
+        while True:
+            try:
+                values = self.queue.get_nowait()
+            except queue.Empty:
+                break
+            self.stream.extend(values)
+            appended += len(values)
+
+        self.last_drain = timer()
+        if appended:
+            self.received += appended
+            self.batches += 1
+            self.callback(appended)
+        return appended
+
+    def stats(self):
+        return {'received': self.received,
+                'batches': self.batches,
+                'length': len(self.stream),
+                'dropped': self.stream.dropped}
+
+    def close(self):
+        """
+        Stops appending, values put afterwards are ignored.
+        """
+        self.closed = True
+        self.timer.Stop()
+        self.window.Unbind(wx.EVT_IDLE, handler=self._on_idle)
+        self.window.Unbind(wx.EVT_TIMER, self.timer, handler=self._on_timer)
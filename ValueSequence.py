@@ -0,0 +1,281 @@
+import math
+
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+
+try:
+    string_types = basestring
+except NameError:
+    string_types = (str, bytes)
+
+
+class VirtualSequence(Sequence):
+    """
+    Base for value lists that are never materialized. Subclasses give a length and produce the
+    value at a position on demand, so a scrubber over a million steps only ever builds the few
+    values that actually get displayed.
+    """
+    def __len__(self):
+        raise NotImplementedError
+
+    def _get(self, _index):
+        """
+        Produces the value at a non negative, in range index.
+        """
+        raise NotImplementedError
+
+    def __getitem__(self, _index):
+        if isinstance(_index, slice):
+            return [self._get(i) for i in range(*_index.indices(len(self)))]
+
+        length = len(self)
+        if _index < 0:
+            _index += length
+        if not 0 <= _index < length:
+            raise IndexError('%s index out of range' % type(self).__name__)
+        return self._get(_index)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self._get(i)
+
+    def definition(self):
+        """
+        :return: A hashable description that is the same for every sequence with the same
+        values, so that they can be shared (see ValueStore), or None if there is none
+        """
+        return None
+
+
+class ValueRange(VirtualSequence):
+    def __init__(self, _start, _stop, _step=1):
+        """
+        A numeric range that also works with float steps. Like range, _stop is not included.
+        :param _start: The first value
+        :param _stop: The value the range stops before
+        :param _step: The distance between neighbouring values, can be negative
+        """
+        if _step == 0:
+            raise ValueError('ValueRange step must not be zero')
+
+        self.start = _start
+        self.stop = _stop
+        self.step = _step
+        self.length = max(0, int(math.ceil((_stop - _start) / float(_step))))
+
+    def __len__(self):
+        return self.length
+
+    def _get(self, _index):
+        return self.start + _index * self.step
+
+    def index(self, _value, *args):
+        """
+        Works out the position of _value arithmetically instead of searching for it.
+        """
+        try:
+            index = int(round((_value - self.start) / float(self.step)))
+        except TypeError:
+            raise ValueError('%r is not in ValueRange' % (_value,))
+
+        if 0 <= index < self.length and abs(self._get(index) - _value) <= abs(self.step) * 1e-9:
+            return index
+        raise ValueError('%r is not in ValueRange' % (_value,))
+
+    def __contains__(self, _value):
+        try:
+            self.index(_value)
+        except ValueError:
+            return False
+        return True
+
+    def definition(self):
+        # 0 and 0.0 are equal but their ranges don't show the same values
+        return ValueRange, type(self.start), self.start, type(self.step), self.step, self.length
+
+    def __repr__(self):
+        return 'ValueRange(%r, %r, %r)' % (self.start, self.stop, self.step)
+
+
+class FunctionSequence(VirtualSequence):
+    def __init__(self, _func, _length):
+        """
+        A sequence whose values come from calling a function with the position.
+        :param _func: Called as _func(index) to produce the value at index
+        :param _length: The number of positions
+        """
+        self.func = _func
+        self.length = _length
+
+    def __len__(self):
+        return self.length
+
+    def _get(self, _index):
+        return self.func(_index)
+
+    def definition(self):
+        return FunctionSequence, self.func, self.length
+
+    def __repr__(self):
+        return 'FunctionSequence(%r, %r)' % (self.func, self.length)
+
+
+class ArraySequence(VirtualSequence):
+    def __init__(self, _array):
+        """
+        A view over a one dimensional numpy array or pandas Series. Nothing is copied, values are
+        read out of the array by position as they are needed.
+        :param _array: A numpy array or a pandas Series
+        """
+        self.source = _array
+        # A Series is read through its underlying array so that lookups are by position
+        self.array = getattr(_array, 'values', _array)
+
+    def __len__(self):
+        return len(self.array)
+
+    def _get(self, _index):
+        return self.array[_index]
+
+    def index(self, _value, *args):
+        """
+        Finds the first position of _value with a vectorized compare instead of a python loop.
+        """
+        hits = (self.array == _value).nonzero()[0]
+        if len(hits) == 0:
+            raise ValueError('%r is not in ArraySequence' % (_value,))
+        return int(hits[0])
+
+    def definition(self):
+        # The array is kept alive by the sequence, so its id can't be reused while it is shared
+        return ArraySequence, id(self.array)
+
+    def __repr__(self):
+        return 'ArraySequence(%r)' % (self.source,)
+
+
+def _is_array(_values):
+    """
+    Duck types a numpy array or pandas Series so neither has to be imported.
+    """
+    return hasattr(_values, 'dtype') and getattr(_values, 'ndim', None) is not None
+
+
+def as_sequence(_values):
+    """
+    Turns anything that can be handed to a scrubber into a sequence of values. Sequences are
+    used as they are, one dimensional arrays and Series are viewed without a copy, and anything
+    else (strings, numbers, DataFrames, empty lists) becomes a one item list.
+    """
+    if _is_array(_values):
+        if _values.ndim == 1 and len(_values) > 0:
+            return ArraySequence(_values)
+        return [_values]
+
+    if isinstance(_values, string_types) or not isinstance(_values, (Sequence, list, tuple)):
+        return [_values]
+
+    if len(_values) == 0:
+        return [_values]
+
+    return _values
+
+
+class AffixRange(VirtualSequence):
+    def __init__(self, _range, _prefix='', _suffix='', _decimals=0):
+        """
+        The labels of a ValueRange with a fixed prefix and suffix, such as '$25' or '25%'.
+        Labels are built when they are asked for, and looking one up parses the number back out
+        instead of searching.
+        :param _range: The ValueRange of the numbers
+        :param _prefix: Text put before each number
+        :param _suffix: Text put after each number
+        :param _decimals: Digits shown after the decimal point
+        """
+        self.range = _range
+        self.prefix = _prefix
+        self.suffix = _suffix
+        self.decimals = _decimals
+
+    def __len__(self):
+        return len(self.range)
+
+    def _get(self, _index):
+        return '%s%.*f%s' % (self.prefix, self.decimals, self.range._get(_index), self.suffix)
+
+    def index(self, _value, *args):
+        end = len(_value) - len(self.suffix) if isinstance(_value, string_types) else -1
+        if end < len(self.prefix) or not _value.startswith(self.prefix) or \
+                not _value.endswith(self.suffix):
+            raise ValueError('%r is not in AffixRange' % (_value,))
+
+        try:
+            return self.range.index(float(_value[len(self.prefix):end]))
+        except ValueError:
+            raise ValueError('%r is not in AffixRange' % (_value,))
+
+    def __contains__(self, _value):
+        try:
+            self.index(_value)
+        except ValueError:
+            return False
+        return True
+
+    def definition(self):
+        return AffixRange, self.range.definition(), self.prefix, self.suffix, self.decimals
+
+    def __repr__(self):
+        return 'AffixRange(%r, %r, %r, %r)' % (self.range, self.prefix, self.suffix, self.decimals)
+
+
+class StreamSequence(VirtualSequence):
+    def __init__(self, _capacity):
+        """
+        Values that keep arriving, in a ring buffer of fixed size: once it is full each new value
+        pushes out the oldest one, so memory stays the same however long the stream runs.
+        Appending never copies what is already there. Index 0 is the oldest value kept.
+        :param _capacity: The most values kept
+        """
+        if _capacity < 1:
+            raise ValueError('StreamSequence capacity must be at least 1')
+
+        self.capacity = _capacity
+        self.buffer = [None] * _capacity
+        # Where the oldest value is in the buffer, and how many values there are
+        self.start = 0
+        self.length = 0
+        # How many values have been pushed out, ever. Cursors into the stream use it to stay
+        # on the value they point at.
+        self.dropped = 0
+
+    def __len__(self):
+        return self.length
+
+    def _get(self, _index):
+        return self.buffer[(self.start + _index) % self.capacity]
+
+    def append(self, _value):
+        if self.length < self.capacity:
+            self.buffer[(self.start + self.length) % self.capacity] = _value
+            self.length += 1
+        else:
+            self.buffer[self.start] = _value
+            self.start = (self.start + 1) % self.capacity
+            self.dropped += 1
+
+    def extend(self, _values):
+        # Only the last capacity values can end up in the buffer
+        values = list(_values)
+        skipped = max(0, len(values) - self.capacity)
+        if skipped:
+            self.dropped += self.length + skipped
+            self.start = 0
+            self.length = 0
+            values = values[skipped:]
+        for value in values:
+            self.append(value)
+
+    def __repr__(self):
+        return 'StreamSequence(%r)' % (self.capacity,)
@@ -0,0 +1,151 @@
+import sys
+
+from Data import estimate_size
+from SeekIndex import SeekIndex
+from ValueSequence import VirtualSequence, StreamSequence
+
+
+def _same_values(_a, _b):
+    """
+    Lists with the same hash are only the same if their values are, and of the same types: 1,
+    1.0 and True are equal but are not shown the same.
+    """
+    return _a == _b and all(type(a) is type(b) for a, b in zip(_a, _b))
+
+
+class _Entry(object):
+    __slots__ = ('sequence', 'key', 'refs', 'size', 'seek_indexes')
+
+    def __init__(self, _sequence, _key, _size):
+        self.sequence = _sequence
+        self.key = _key
+        self.refs = 1
+        self.size = _size
+        # SeekIndexes by formatter, made by seek_index
+        self.seek_indexes = None
+
+
+class ValueStore(object):
+    # Lists longer than this are only shared with themselves, matching them by content means
+    # copying them into a tuple and comparing them item by item
+    MAX_CONTENT_KEY = 10000
+
+    def __init__(self):
+        """
+        Shares the value sequences of every control. Lists and tuples with the same values, and
+        virtual sequences with the same definition, are all stored once and every control holds
+        the one stored sequence. Entries are counted: one goes away when the last control
+        holding it releases it.
+
+        Stored sequences are shared, so they must not change: lists are stored as tuples of
+        their values, and changing the list given afterwards changes no control. Lists longer
+        than MAX_CONTENT_KEY are stored as they are and matched by identity only, so dropping a
+        long list on a scrubber never copies it, and it must not be changed while held.
+        """
+        # Entries by the id of their sequence, and by what their values are
+        self.by_id = {}
+        self.by_key = {}
+
+    def _key(self, _values):
+        """
+        :return: (what the values of _values are, hashable, and the sequence to store for them),
+        or None if it can't be shared
+        """
+        if isinstance(_values, VirtualSequence):
+            definition = _values.definition()
+            # Without a definition a sequence is only the same as itself
+            return (definition if definition is not None else (id(_values),)), _values
+
+        if isinstance(_values, (list, tuple)):
+            if len(_values) > self.MAX_CONTENT_KEY:
+                return (id(_values),), _values
+            values = _values if isinstance(_values, tuple) else tuple(_values)
+            try:
+                return (len(values), hash(values)), values
+            except TypeError:
+                # Values that can't be hashed are never shared
+                return None
+        return None
+
+    @staticmethod
+    def _size_of(_values):
+        size = estimate_size(_values)
+        if hasattr(_values, '__dict__'):
+            size += sys.getsizeof(vars(_values))
+        return size
+
+    def acquire(self, _values):
+        """
+        :param _values: A sequence, as given by as_sequence
+        :return: The stored sequence with the same values as _values, which is stored if there
+        isn't one yet: a tuple of the values of a list. _values itself if it can't be shared.
+        """
+        entry = self.by_id.get(id(_values))
+        if entry is not None and entry.sequence is _values:
+            entry.refs += 1
+            return _values
+
+        keyed = self._key(_values)
+        if keyed is None:
+            return _values
+        key, values = keyed
+
+        entry = self.by_key.get(key)
+        if entry is not None:
+            if isinstance(values, VirtualSequence) or _same_values(entry.sequence, values):
+                entry.refs += 1
+                return entry.sequence
+            return values
+
+        entry = _Entry(values, key, self._size_of(values))
+        self.by_id[id(values)] = entry
+        self.by_key[key] = entry
+        return values
+
+    def release(self, _values):
+        """
+        Gives back a sequence returned by acquire. Sequences that were never stored are ignored.
+        """
+        entry = self.by_id.get(id(_values))
+        if entry is None or entry.sequence is not _values:
+            return
+
+        entry.refs -= 1
+        if entry.refs == 0:
+            del self.by_id[id(_values)]
+            del self.by_key[entry.key]
+
+    def seek_index(self, _values, _formatter=None):
+        """
+        :return: The SeekIndex of _values shown with _formatter, built once and shared by every
+        control holding the stored sequence. A new one for sequences that aren't stored, and for
+        streams which change under it.
+        """
+        entry = self.by_id.get(id(_values))
+        if entry is None or entry.sequence is not _values or \
+                isinstance(_values, StreamSequence):
+            return SeekIndex(_values, _formatter)
+
+        if entry.seek_indexes is None:
+            entry.seek_indexes = {}
+        index = entry.seek_indexes.get(_formatter)
+        if index is None:
+            index = entry.seek_indexes[_formatter] = SeekIndex(_values, _formatter)
+        return index
+
+    def __len__(self):
+        return len(self.by_id)
+
+    def stats(self):
+        """
+        :return: How many sequences are stored, how many controls hold them, and about how many
+        bytes sharing saves compared to every control holding its own copy
+        """
+        entries = list(self.by_id.values())
+        return {'sequences': len(entries),
+                'references': sum(entry.refs for entry in entries),
+                'bytes_saved': sum((entry.refs - 1) * entry.size for entry in entries)}
+
+
+# The store of every sentence that is not given its own
+value_store = ValueStore()
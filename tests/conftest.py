@@ -0,0 +1,19 @@
+import os
+import sys
+
+import pytest
+
+# The modules live at the top of the repository, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ScrubModel import SentenceModel
+from ValueStore import ValueStore
+
+
+@pytest.fixture
+def model():
+    """
+    A SentenceModel with a store of its own and no acceleration, every event is worth
+    change_rate of a step.
+    """
+    return SentenceModel(_acceleration=None, _store=ValueStore())
@@ -0,0 +1,49 @@
+from ScrubModel import AccelerationCurve, SentenceModel
+from ValueSequence import ValueRange
+from ValueStore import ValueStore
+
+
+def test_slow_drags_move_one_value():
+    curve = AccelerationCurve()
+    assert curve.speed(1) == 0.0
+    assert curve.steps(curve.threshold, 10 ** 7) == 1.0
+
+
+def test_full_speed_crosses_the_list_in_traverse_events():
+    curve = AccelerationCurve()
+    assert curve.speed(1000) == 1.0
+    assert curve.steps(1000, 10 ** 7) == 10 ** 7 / float(curve.traverse_events)
+    # Short lists never move less than a value per event
+    assert curve.steps(1000, 10) == 1.0
+
+
+def test_speed_grows_with_the_distance():
+    curve = AccelerationCurve()
+    speeds = [curve.speed(distance) for distance in range(0, 60, 5)]
+    assert speeds == sorted(speeds)
+    assert 0.0 < curve.speed((curve.threshold + curve.saturation) / 2.0) < 1.0
+
+
+def test_velocity_counts_even_for_short_moves():
+    curve = AccelerationCurve()
+    assert curve.speed(1, curve.velocity_saturation) == 1.0
+    assert curve.speed(1, curve.velocity_threshold) == 0.0
+
+
+def test_fast_drags_cross_long_lists_in_bounded_events():
+    for size in (1000, 10 ** 7):
+        model = SentenceModel(_store=ValueStore())
+        control = model.add_control('a', ValueRange(0, size), 0)
+        events = 0
+        while control.index < size - 1:
+            model.scrub('a', 40, False)
+            events += 1
+        assert events <= 2 * model.acceleration.traverse_events
+
+
+def test_fine_mode_never_accelerates():
+    model = SentenceModel(_store=ValueStore())
+    control = model.add_control('a', ValueRange(0, 10 ** 7), 0)
+    for _ in range(20):
+        model.scrub('a', 1000, True)
+    assert control.index <= 2
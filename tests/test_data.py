@@ -0,0 +1,63 @@
+import pytest
+
+from Data import Data
+
+
+class Celsius(float):
+    pass
+
+
+@pytest.mark.parametrize('value, alias', [(True, 'Boolean'),
+                                          (3, 'Integer'),
+                                          (2.5, 'Float'),
+                                          ('text', 'String'),
+                                          ([1], 'List'),
+                                          ((1,), 'Tuple'),
+                                          (range(3), 'Sequence'),
+                                          ({}, 'dict')])
+def test_alias_of(value, alias):
+    assert Data.alias_of(value) == alias
+
+
+def test_registered_types_come_first():
+    types = list(Data.TYPES)
+    try:
+        Data.register_type(Celsius, 'Temperature')
+        assert Data.alias_of(Celsius(20)) == 'Temperature'
+        assert Data.alias_of(20.0) == 'Float'
+
+        Data.register_type('test_data.Celsius', 'Degrees')
+        assert Data.alias_of(Celsius(20)) == 'Degrees'
+    finally:
+        Data.TYPES[:] = types
+
+
+def test_summaries():
+    data = Data([3, 1, 2], 'numbers')
+    assert data.value_title == 'List'
+    assert (data.length(), data.min(), data.max()) == (3, 1, 3)
+    assert data.dtype() is None
+    assert data.memory() > 0
+
+    single = Data(5, 'one')
+    assert (single.length(), single.min(), single.max()) == (1, 5, 5)
+    assert Data([], 'empty').min() is None
+    assert Data([1, 'a'], 'mixed').max() is None
+
+
+def test_summaries_are_cached_until_the_data_changes():
+    calls = []
+
+    class Counted(list):
+        def __len__(self):
+            calls.append(1)
+            return list.__len__(self)
+
+    data = Data(Counted([1, 2]), 'counted')
+    assert data.length() == 2
+    assert data.length() == 2
+    assert len(calls) == 1
+
+    data.data = ['a']
+    assert data.length() == 1
+    assert data.value_title == 'List'
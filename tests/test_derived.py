@@ -0,0 +1,35 @@
+import pytest
+
+from ScrubModel import DerivedNode
+from ValueSequence import ValueRange
+
+
+def test_derived_values_propagate(model):
+    model.add_control('a', ValueRange(0, 10), 2)
+    model.add_control('b', ValueRange(0, 10), 3)
+    model.add_derived('sum', lambda a, b: a + b, ['a', 'b'])
+    model.add_derived('double', lambda total: total * 2, ['sum'])
+    assert model.value_of('double') == 10
+
+    model.scrub('a', 1, False)
+    assert model.propagate('a') == ['sum', 'double']
+    assert model.value_of('double') == 12
+
+    with pytest.raises(ValueError):
+        model.remove_control('a')
+
+
+def test_derived_errors_show_a_placeholder(model):
+    model.add_control('a', [1, 'x'], 1)
+    node = model.add_derived('inverse', lambda a: 1.0 / a, ['a'])
+    assert node.value == 1.0
+
+    model.scrub('a', 1, False)
+    assert model.propagate('a') == ['inverse']
+    assert node.value == DerivedNode.PLACEHOLDER
+    assert isinstance(node.error, TypeError)
+
+    model.scrub('a', -1, False)
+    model.propagate('a')
+    assert node.value == 1.0
+    assert node.error is None
@@ -0,0 +1,59 @@
+import LabelFormat
+from LabelFormat import LabelFormatter, formatter_for
+from SeekIndex import SeekIndex
+from ValueSequence import ValueRange
+
+
+def test_formatted_numbers():
+    index = SeekIndex(ValueRange(0, 10 ** 6), formatter_for('${:,.2f}'))
+    assert index.seek('$25,000') == 25000
+
+    percent = SeekIndex(ValueRange(0, 1.01, 0.01), formatter_for('{:.1%}'))
+    assert percent.seek('25%') == 25
+
+
+def test_formats():
+    assert LabelFormatter('${:,.2f}')(1234.5) == '$1,234.50'
+    assert LabelFormatter('.1%')(0.25) == '25.0%'
+    assert LabelFormatter(lambda value: '<%s>' % value)(3) == '<3>'
+
+
+def test_values_the_format_does_not_fit_are_shown_with_str():
+    formatter = LabelFormatter(',.2f')
+    assert formatter('?') == '?'
+    assert formatter(None) == 'None'
+
+
+def test_rendered_text_is_kept_by_type_and_value():
+    formatter = LabelFormatter('{!r}')
+    assert formatter(1) == '1'
+    assert formatter(1.0) == '1.0'
+    assert formatter(True) == 'True'
+    formatter(1)
+    assert (formatter.hits, formatter.misses) == (1, 3)
+
+
+def test_least_recently_used_text_goes_first():
+    formatter = LabelFormatter('{}', 2)
+    formatter(1)
+    formatter(2)
+    formatter(1)
+    formatter(3)
+    assert list(formatter.rendered) == [(int, 1), (int, 3)]
+
+
+def test_unhashable_values_are_not_kept():
+    formatter = LabelFormatter('{}')
+    assert formatter([1]) == '[1]'
+    assert len(formatter.rendered) == 0
+
+
+def test_formatters_are_shared_and_bounded():
+    assert formatter_for(None) is None
+    assert formatter_for('.3f') is formatter_for('.3f')
+    formatter = LabelFormatter('{}')
+    assert formatter_for(formatter) is formatter
+
+    for i in range(LabelFormat.MAX_FORMATTERS + 10):
+        formatter_for('{:%d}' % i)
+    assert len(LabelFormat._formatters) == LabelFormat.MAX_FORMATTERS
@@ -0,0 +1,121 @@
+import pytest
+
+from ScrubHistory import ScrubHistory, SentenceSnapshot
+from ScrubModel import SentenceModel
+from ValueSequence import AffixRange, ValueRange
+from ValueStore import ValueStore
+
+
+def test_undo_and_redo():
+    history = ScrubHistory()
+    history.record('a', 0, 1)
+    history.record('b', 2, 3)
+    assert history.undo() == ('b', 2)
+    assert history.undo() == ('a', 0)
+    assert history.undo() is None
+    assert history.redo() == ('a', 1)
+
+    # A new change can't be redone past
+    history.record('a', 1, 5)
+    assert not history.can_redo()
+
+
+def test_steps_of_a_scrub_are_merged():
+    history = ScrubHistory()
+    history.record('a', 0, 1, True)
+    history.record('a', 1, 2, True)
+    history.record('a', 2, 4, True)
+    assert list(history.undo_entries) == [('a', 0, 4)]
+
+    history.end_run()
+    history.record('a', 4, 5, True)
+    assert len(history.undo_entries) == 2
+
+
+def test_steps_of_other_controls_are_not_merged():
+    history = ScrubHistory()
+    history.record('a', 0, 1, True)
+    history.record('b', 0, 1, True)
+    assert len(history.undo_entries) == 2
+
+
+def test_scrubbing_back_to_the_start_drops_the_entry():
+    history = ScrubHistory()
+    history.record('a', 3, 4, True)
+    history.record('a', 4, 3, True)
+    assert not history.can_undo()
+
+
+def test_entries_are_bounded_and_forgotten():
+    history = ScrubHistory(3)
+    for i in range(5):
+        history.record('a' if i % 2 else 'b', i, i + 1)
+    assert len(history.undo_entries) == 3
+
+    history.forget('a')
+    assert [entry[0] for entry in history.undo_entries] == ['b', 'b']
+
+
+def test_snapshot_json_round_trip():
+    values = [ValueRange(0, 10), AffixRange(ValueRange(0, 51), '$'), ['x', 'y'], [object()]]
+    snapshot = SentenceSnapshot(0.5, [1, 2, 0, 0], values)
+    restored = SentenceSnapshot.from_json(snapshot.to_json())
+
+    assert restored.change_value == 0.5
+    assert restored.indexes == [1, 2, 0, 0]
+    assert list(restored.values[0]) == list(range(10))
+    assert restored.values[1][25] == '$25'
+    assert restored.values[2] == ['x', 'y']
+    # Values json can't write are kept as they are
+    assert restored.values[3] is None
+
+
+def test_snapshot_bytes_round_trip():
+    snapshot = SentenceSnapshot(-0.25, [7, 0, 65536])
+    data = snapshot.to_bytes()
+    assert len(data) == 18 + 4 * 3
+
+    restored = SentenceSnapshot.from_bytes(data)
+    assert restored.change_value == -0.25
+    assert restored.indexes == [7, 0, 65536]
+    assert restored.values == [None, None, None]
+
+
+def test_snapshot_rejects_other_versions():
+    with pytest.raises(ValueError):
+        SentenceSnapshot.from_json('{"version": 99}')
+    with pytest.raises(ValueError):
+        SentenceSnapshot.from_bytes(b'XXXX' + SentenceSnapshot(0, []).to_bytes()[4:])
+
+
+def test_model_undo_and_redo(model):
+    model.set_history(ScrubHistory())
+    control = model.add_control('a', ValueRange(0, 10), 0)
+    model.scrub('a', 1, False)
+    model.scrub('a', 1, False)
+    model.history.end_run()
+    model.click('a')
+
+    assert model.undo() == 'a'
+    assert control.value == 2
+    assert model.undo() == 'a'
+    assert control.value == 0
+    assert model.undo() is None
+    assert model.redo() == 'a'
+    assert control.value == 2
+
+
+def test_snapshot_and_restore(model):
+    model.add_control('a', ValueRange(0, 10), 4)
+    model.add_control('b', ['x', 'y'], 'y')
+    snapshot = model.snapshot(['a', 'b'])
+
+    other = SentenceModel(_store=ValueStore())
+    other.add_control(1, ValueRange(0, 10), 0)
+    other.add_control(2, ['x', 'y'], 'x')
+    other.restore(snapshot, [1, 2])
+    assert other.value_of(1) == 4
+    assert other.value_of(2) == 'y'
+
+    with pytest.raises(ValueError):
+        other.restore(snapshot, [1])
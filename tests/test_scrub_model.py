@@ -0,0 +1,28 @@
+from ValueSequence import ValueRange
+
+
+def test_scrub_steps_and_stops_at_the_ends(model):
+    control = model.add_control('a', ValueRange(0, 10), 5)
+    assert model.scrub('a', 3, False)
+    assert control.value == 6
+    for _ in range(10):
+        model.scrub('a', 1, False)
+    assert control.value == 9
+    assert not model.scrub('a', 1, False)
+
+
+def test_fine_mode_builds_up_tenths(model):
+    control = model.add_control('a', ValueRange(0, 10), 5)
+    for _ in range(9):
+        assert not model.scrub('a', 1, True)
+    # Ten tenths may add up to a hair under a step
+    assert sum(model.scrub('a', 1, True) for _ in range(2)) == 1
+    assert control.value == 6
+
+
+def test_click_cycles_backwards(model):
+    control = model.add_control('a', ['x', 'y', 'z'], 'y')
+    model.click('a')
+    assert control.value == 'x'
+    model.click('a')
+    assert control.value == 'z'
@@ -0,0 +1,85 @@
+from SeekIndex import SeekIndex
+from ValueSequence import AffixRange, FunctionSequence, StreamSequence, ValueRange
+from ValueStore import ValueStore
+
+
+def test_sorted_numbers_seek_nearest():
+    index = SeekIndex([1, 5, 10, 50])
+    assert index.seek('6') == 1
+    assert index.seek('8') == 2
+    assert index.seek('1000') == 3
+    assert index.seek('-3') == 0
+
+
+def test_unsorted_and_descending_numbers():
+    assert SeekIndex([30, 10, 20]).seek('19') == 2
+    assert SeekIndex([50, 40, 30, 20]).seek('31') == 2
+
+
+def test_strings_seek_by_prefix():
+    index = SeekIndex(['banana', 'Apple', 'cherry'])
+    assert index.seek('app') == 1
+    assert index.seek('c') == 2
+    # Nothing starts with it, the next one alphabetically
+    assert index.seek('bb') == 2
+
+
+def test_mixed_list_falls_back_to_prefix():
+    index = SeekIndex([3, 'a', 1])
+    assert index.seek('a') == 1
+    assert index.seek('3') == 0
+
+
+def test_range_seeks_arithmetically():
+    assert SeekIndex(ValueRange(0, 10 ** 9, 5)).seek('251') == 50
+    assert SeekIndex(ValueRange(0, 10)).seek('99') == 9
+
+
+def test_range_never_matches_text():
+    assert SeekIndex(ValueRange(0, 10 ** 7)).seek('x') is None
+    index = SeekIndex(ValueRange(0, 10 ** 7))
+    index.seek('x')
+    assert not index.prefix
+
+
+def test_affix_range_reads_prefix_and_suffix():
+    index = SeekIndex(AffixRange(ValueRange(0, 51), '$'))
+    assert index.seek('$25') == 25
+    assert index.seek('25') == 25
+    assert SeekIndex(AffixRange(ValueRange(0, 101), '', '%')).seek('40%') == 40
+
+
+def test_long_virtual_sequences_get_no_prefix_index():
+    words = FunctionSequence(lambda i: 'word%d' % i, SeekIndex.MAX_VIRTUAL_PREFIX + 1)
+    assert SeekIndex(words).seek('word5') is None
+    assert SeekIndex(FunctionSequence(lambda i: 'word%d' % i, 10)).seek('word5') == 5
+
+
+def test_seek(model):
+    control = model.add_control('a', ['apple', 'banana', 'cherry'], 'apple')
+    assert model.seek('a', 'ch')
+    assert control.value == 'cherry'
+    assert not model.seek('a', 'cherry')
+
+
+def test_seek_index_is_shared_by_controls_with_the_same_values(model):
+    model.add_control('a', [3, 1, 2], 3)
+    model.add_control('b', [3, 1, 2], 3)
+    model.seek('a', '2')
+    model.seek('b', '1')
+    assert model.controls['a'].seek_index is model.controls['b'].seek_index
+
+
+def test_seek_index_is_shared_per_formatter():
+    store = ValueStore()
+    values = store.acquire(['a', 'b'])
+    index = store.seek_index(values)
+    assert isinstance(index, SeekIndex)
+    assert store.seek_index(values) is index
+    assert store.seek_index(values, repr) is not index
+
+
+def test_seek_index_of_streams_is_not_shared():
+    store = ValueStore()
+    stream = store.acquire(StreamSequence(10))
+    assert store.seek_index(stream) is not store.seek_index(stream)
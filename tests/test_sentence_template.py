@@ -0,0 +1,123 @@
+from contextlib import contextmanager
+
+import pytest
+
+from SentenceTemplate import SentenceTemplate, TemplateToken
+from ValueSequence import AffixRange
+
+
+def test_plan_of_text_and_tokens():
+    template = SentenceTemplate('a {scrub:cost=$0..$50 default $25} b {click:yes|no} c')
+    assert template.names == ['cost', 'click1']
+    assert [isinstance(token, TemplateToken) for token in template.plan] == \
+        [False, True, False, True, False]
+
+    cost = template.tokens['cost']
+    assert cost.kind == 'scrub'
+    assert isinstance(cost.values, AffixRange)
+    assert cost.values[-1] == '$50'
+    assert cost.default == '$25'
+    assert cost.default_index == 25
+
+    click = template.tokens['click1']
+    assert click.values == ['yes', 'no']
+    assert click.default == 'yes'
+
+
+def test_clauses():
+    token = SentenceTemplate('{scrub:x=0..1 step 0.25 drop reserve}').tokens['x']
+    assert list(token.values) == ['0.00', '0.25', '0.50', '0.75', '1.00']
+    assert token.can_drop
+    assert token.reserve
+
+
+def test_descending_range():
+    token = SentenceTemplate('{scrub:5%..0%}').tokens['scrub0']
+    assert list(token.values) == ['5%', '4%', '3%', '2%', '1%', '0%']
+
+
+def test_escaped_braces():
+    template = SentenceTemplate('{{literal}} {click:a|b}')
+    assert template.plan[0] == '{literal} '
+
+
+def test_compile_shares_templates():
+    text = '{click:shared|template}'
+    assert SentenceTemplate.compile(text) is SentenceTemplate.compile(text)
+
+
+@pytest.mark.parametrize('text', ['{x:a|b}',
+                                  '{scrub:a|b step 2}',
+                                  '{scrub:0..10 default 11}',
+                                  '{scrub:$0..50}',
+                                  '{scrub:0..10 step 0}',
+                                  'unbalanced {click:a'])
+def test_bad_templates(text):
+    with pytest.raises(ValueError):
+        SentenceTemplate(text)
+
+
+@pytest.mark.parametrize('text, values',
+                         [('{click:walk in|just drop by}', ['walk in', 'just drop by']),
+                          ('{click:keep the default setting|off}',
+                           ['keep the default setting', 'off']),
+                          ('{click:one|take a step back}', ['one', 'take a step back']),
+                          ('{click:reserve a table|step 2 left}',
+                           ['reserve a table', 'step 2 left'])])
+def test_options_may_contain_keywords(text, values):
+    token = SentenceTemplate(text).tokens['click0']
+    assert token.values == values
+    assert token.default == values[0]
+    assert not token.can_drop
+    assert not token.reserve
+
+
+def test_clauses_after_options_with_keywords():
+    token = SentenceTemplate('{click:x=walk in|just drop by default just drop by drop}').tokens['x']
+    assert token.values == ['walk in', 'just drop by']
+    assert token.default == 'just drop by'
+    assert token.can_drop
+
+
+def test_clauses_in_any_order():
+    token = SentenceTemplate('{scrub:x=$0..$50 drop default $25 step 5}').tokens['x']
+    assert token.values[-1] == '$50'
+    assert token.default == '$25'
+    assert token.can_drop
+
+
+class _Sentence(object):
+    """
+    Records the calls build makes, in place of a DynamicSentence.
+    """
+    def __init__(self):
+        self.calls = []
+
+    @contextmanager
+    def batch(self):
+        yield
+
+    def add_text(self, _text):
+        self.calls.append(('text', _text))
+
+    def add_scrubber(self, _values, _default, **kwargs):
+        self.calls.append(('scrub', _default))
+        return len(self.calls)
+
+    def add_clicker(self, _values, _default, **kwargs):
+        self.calls.append(('click', _default))
+        return len(self.calls)
+
+
+def test_build_with_defaults():
+    sentence = _Sentence()
+    controls = SentenceTemplate('pay {scrub:cost=$0..$50} {click:yes|no}').build(
+        sentence, {'cost': '$10'})
+    # The space between the placeholders is not a word of its own
+    assert sentence.calls == [('text', 'pay '), ('scrub', '$10'), ('click', 'yes')]
+    assert sorted(controls) == ['click1', 'cost']
+
+
+def test_build_rejects_defaults_that_are_not_values():
+    with pytest.raises(ValueError):
+        SentenceTemplate('{scrub:cost=$0..$50}').build(_Sentence(), {'cost': '$51'})
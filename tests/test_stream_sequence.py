@@ -0,0 +1,47 @@
+import pytest
+
+from ValueSequence import StreamSequence
+
+
+def test_stream_sequence_ring_buffer():
+    stream = StreamSequence(3)
+    stream.extend([1, 2])
+    assert list(stream) == [1, 2]
+
+    stream.append(3)
+    stream.append(4)
+    assert list(stream) == [2, 3, 4]
+    assert stream.dropped == 1
+
+    stream.extend(range(10, 20))
+    assert list(stream) == [17, 18, 19]
+    assert stream.dropped == 11
+
+
+def test_stream_sequence_capacity():
+    with pytest.raises(ValueError):
+        StreamSequence(0)
+
+
+def test_values_appended_keeps_the_cursor_on_its_value(model):
+    stream = StreamSequence(5)
+    stream.extend([1, 2, 3])
+    control = model.add_control('a', stream, 2)
+
+    stream.extend([4, 5, 6])
+    model.values_appended('a')
+    assert control.value == 2
+
+    # Pushed out of the stream, it moves to the oldest value left
+    stream.extend([7, 8])
+    assert model.values_appended('a')
+    assert control.value == 4
+
+
+def test_values_appended_follows_the_newest_value(model):
+    stream = StreamSequence(5)
+    stream.extend([1, 2, 3])
+    control = model.add_control('a', stream, 3)
+    stream.append(4)
+    assert model.values_appended('a')
+    assert control.value == 4
@@ -0,0 +1,58 @@
+import pytest
+
+from ValueSequence import AffixRange, FunctionSequence, ValueRange, as_sequence
+
+
+def test_value_range_matches_range():
+    assert list(ValueRange(0, 10, 3)) == list(range(0, 10, 3))
+    assert list(ValueRange(5, 0, -2)) == [5, 3, 1]
+    assert len(ValueRange(0, 0)) == 0
+
+
+def test_value_range_float_step_and_index():
+    values = ValueRange(0, 1, 0.1)
+    assert len(values) == 10
+    assert values.index(0.3) == 3
+    assert 0.35 not in values
+    with pytest.raises(ValueError):
+        values.index('a')
+
+
+def test_value_range_indexing():
+    values = ValueRange(0, 10 ** 9)
+    assert values[-1] == 10 ** 9 - 1
+    assert list(values[2:5]) == [2, 3, 4]
+    with pytest.raises(IndexError):
+        values[10 ** 9]
+
+
+def test_value_range_zero_step():
+    with pytest.raises(ValueError):
+        ValueRange(0, 10, 0)
+
+
+def test_affix_range_labels_and_index():
+    values = AffixRange(ValueRange(0, 51), '$')
+    assert values[25] == '$25'
+    assert values.index('$25') == 25
+    assert '25' not in values
+    assert '$x' not in values
+
+    percent = AffixRange(ValueRange(0, 1.01, 0.25), '', '%', 2)
+    assert list(percent) == ['0.00%', '0.25%', '0.50%', '0.75%', '1.00%']
+
+
+def test_definitions_tell_ranges_apart():
+    assert ValueRange(0, 10).definition() == ValueRange(0, 10).definition()
+    assert ValueRange(0, 10).definition() != ValueRange(0.0, 10).definition()
+    assert AffixRange(ValueRange(0, 10), '$').definition() != \
+        AffixRange(ValueRange(0, 10), '', '$').definition()
+    assert FunctionSequence(str, 5).definition() is not None
+
+
+def test_as_sequence():
+    values = [1, 2, 3]
+    assert as_sequence(values) is values
+    assert as_sequence('text') == ['text']
+    assert as_sequence(5) == [5]
+    assert as_sequence([]) == [[]]
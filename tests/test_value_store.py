@@ -0,0 +1,88 @@
+from Data import Data, estimate_size
+from ValueSequence import ValueRange
+from ValueStore import ValueStore
+
+
+def test_equal_lists_are_shared():
+    store = ValueStore()
+    first = store.acquire([1, 2, 3])
+    assert first == (1, 2, 3)
+    assert store.acquire([1, 2, 3]) is first
+    assert store.acquire((1, 2, 3)) is first
+    assert len(store) == 1
+    assert store.stats()['references'] == 3
+
+
+def test_changing_a_list_afterwards_changes_no_control():
+    store = ValueStore()
+    a = ['x', 'y']
+    b = ['x', 'y']
+    held_a = store.acquire(a)
+    held_b = store.acquire(b)
+    a.append('z')
+    assert held_b == ('x', 'y')
+    assert held_a is held_b
+    assert store.acquire(['x', 'y']) is held_a
+
+
+def test_values_of_other_types_are_not_shared():
+    store = ValueStore()
+    ints = store.acquire([1, 2])
+    floats = store.acquire([1.0, 2.0])
+    assert floats is not ints
+    assert type(floats[0]) is float
+
+
+def test_ranges_are_shared_by_definition():
+    store = ValueStore()
+    first = store.acquire(ValueRange(0, 100))
+    assert store.acquire(ValueRange(0, 100)) is first
+    assert store.acquire(ValueRange(0.0, 100)) is not first
+
+
+def test_unhashable_values_are_not_stored():
+    store = ValueStore()
+    values = [[1], [2]]
+    assert store.acquire(values) is values
+    assert store.acquire([[1], [2]]) is not values
+    assert len(store) == 0
+
+
+def test_long_lists_are_matched_by_identity():
+    store = ValueStore()
+    values = list(range(store.MAX_CONTENT_KEY + 1))
+    assert store.acquire(values) is values
+    assert store.acquire(list(values)) is not values
+    assert store.acquire(values) is values
+
+
+def test_release_drops_the_last_reference():
+    store = ValueStore()
+    values = store.acquire(['a', 'b'])
+    store.acquire(['a', 'b'])
+    store.release(values)
+    assert len(store) == 1
+    store.release(values)
+    assert len(store) == 0
+    # Releasing what was never stored does nothing
+    store.release(['c'])
+
+
+def test_controls_share_values_through_the_store(model):
+    first = model.add_control('a', ['x', 'y'], 'x')
+    second = model.add_control('b', ['x', 'y'], 'x')
+    assert first.values is second.values
+    assert len(model.store) == 1
+
+    model.remove_control('a')
+    model.remove_control('b')
+    assert len(model.store) == 0
+
+
+def test_bytes_saved_are_estimated_like_data_memory():
+    store = ValueStore()
+    values = list(range(50000))
+    held = store.acquire(values)
+    store.acquire(held)
+    assert store.stats()['bytes_saved'] == estimate_size(values)
+    assert estimate_size(values) == Data(values, 'values').memory()